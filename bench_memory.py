@@ -0,0 +1,141 @@
+"""Bytes per card for the __slots__ card layout versus the baseline __dict__ one.
+
+Usage: python bench_memory.py [count]   (default: 1,000,000 cards)
+
+The "before" cards are a frozen copy of the baseline game's Card classes,
+trimmed to the code that shapes an instance: every stat and class constant
+is set on the instance, in the baseline's order. The benchmark needs
+neither git history nor tkinter.
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from abc import ABC, abstractmethod
+
+import cardgame
+
+
+class BaselineCard(ABC):
+    @abstractmethod
+    def __init__(self, name, attack, defense, health, level):
+        self.name = name
+        self.attack = attack
+        self.defense = defense
+        self.health = health
+        self.level = level
+        self.set_base_stats(self.attack, self.defense, self.health)
+
+    @abstractmethod
+    def set_base_stats(self):
+        pass
+
+
+class BaselineWarrior(BaselineCard):
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+
+    def set_base_stats(self, attack, defense, health):
+        self.attack = attack
+        self.defense = defense
+        self.health = health
+        self.attack_growth = 6
+        self.defense_growth = 0.05
+        self.health_growth = 25
+        self.attack_multiplier = 1.2
+        self.defense_multiplier = 0.8
+
+
+class BaselineArcher(BaselineCard):
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+
+    def set_base_stats(self, attack, defense, health):
+        self.attack = attack
+        self.defense = defense
+        self.health = health
+        self.attack_growth = 8
+        self.defense_growth = 0.03
+        self.health_growth = 15
+        self.attack_multiplier = 1.5
+        self.defense_multiplier = 0.5
+
+
+class BaselineGuardian(BaselineCard):
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+
+    def set_base_stats(self, attack, defense, health):
+        self.attack = attack
+        self.defense = defense
+        self.health = health
+        self.attack_growth = 4
+        self.defense_growth = 0.07
+        self.health_growth = 35
+        self.attack_multiplier = 0.8
+        self.defense_multiplier = 1.2
+
+
+class BaselineAssassin(BaselineCard):
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+
+    def set_base_stats(self, attack, defense, health):
+        self.attack = attack
+        self.defense = defense
+        self.health = health
+        self.attack_growth = 9
+        self.defense_growth = 0.02
+        self.health_growth = 12
+        self.attack_multiplier = 1.7
+        self.defense_multiplier = 0.3
+
+
+BASELINE_CLASSES = {
+    "Warrior": BaselineWarrior,
+    "Archer": BaselineArcher,
+    "Guardian": BaselineGuardian,
+    "Assassin": BaselineAssassin,
+}
+
+
+def measure(factory, count):
+    """Return bytes allocated per object while `count` objects are alive."""
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding the objects is the same for both layouts
+    size -= sys.getsizeof(objects)
+    del objects
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Card memory, baseline vs __slots__")
+    parser.add_argument("count", type=int, nargs="?", default=1_000_000)
+    args = parser.parse_args()
+
+    count = args.count
+    classes = list(cardgame.CARD_CLASSES.values())
+    baseline_classes = [BASELINE_CLASSES[cls.__name__] for cls in classes]
+    # Interned name and stat values so only the card objects are measured
+    name = "Card"
+
+    def slotted(i):
+        return classes[i % len(classes)](name, 15, 0.3, 90, 1)
+
+    def with_dict(i):
+        return baseline_classes[i % len(baseline_classes)](name, 15, 0.3, 90, 1)
+
+    before = measure(with_dict, count)
+    after = measure(slotted, count)
+    print(f"{count:,} cards")
+    print(f"  __dict__ layout: {before:7.1f} bytes/card  ({before * count / 2**20:8.1f} MiB)")
+    print(f"  __slots__ layout: {after:6.1f} bytes/card  ({after * count / 2**20:8.1f} MiB)")
+    print(f"  saved {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""Timing benchmarks for the game's hot paths.
+
+Usage: python benchmark.py [-k FILTER] [--repeats N] [--warmup N]
+                           [--load-sizes 8 1000 ...] [--json OUT]
+                           [--compare BASELINE] [--threshold 0.10]
+
+Each benchmark runs `warmup` untimed samples, then `repeats` timed ones of
+`inner` operations each, with the garbage collector off while timing (as
+timeit does). Results are per operation: min, median, mean, p90, p99 and
+standard deviation, in nanoseconds.
+
+--json writes the results for later runs to --compare against. A benchmark
+whose median is more than --threshold slower than the baseline is reported
+as a regression, and the exit status is 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from catalog import CardCatalog
+import cardgame
+from matchmaking import Matchmaker
+from policies import Policy
+from seeds import SeedTree
+import snapshot
+
+
+DEFAULT_LOAD_SIZES = (8, 1_000, 100_000, 1_000_000)
+FULL_LOAD_SIZES = DEFAULT_LOAD_SIZES + (10_000_000,)
+
+
+class Benchmark:
+    """`run(state)` is timed; `setup()` builds its state outside the timer.
+
+    With per_sample, setup runs before every sample, for benchmarks that
+    consume their state (merging a deck, say).
+    """
+
+    def __init__(self, name, setup, run, inner=1, per_sample=False, repeats=None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.inner = inner
+        self.per_sample = per_sample
+        self.repeats = repeats  # Overrides --repeats for very slow benchmarks
+
+    def sample(self, state):
+        run, inner = self.run, self.inner
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter_ns()
+            for _ in range(inner):
+                run(state)
+            return (time.perf_counter_ns() - started) / inner
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def measure(self, repeats, warmup):
+        repeats = min(repeats, self.repeats) if self.repeats else repeats
+        state = None if self.per_sample else self.setup()
+        samples = []
+        for i in range(warmup + repeats):
+            if self.per_sample:
+                state = self.setup()
+            elapsed = self.sample(state)
+            if i >= warmup:
+                samples.append(elapsed)
+        return summarize(samples, self.inner)
+
+
+def percentile(ordered, fraction):
+    """Linear-interpolated percentile of an already sorted list."""
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(samples, inner):
+    ordered = sorted(samples)
+    return {
+        "samples": len(samples),
+        "inner": inner,
+        "min_ns": ordered[0],
+        "median_ns": statistics.median(ordered),
+        "mean_ns": statistics.fmean(ordered),
+        "p90_ns": percentile(ordered, 0.90),
+        "p99_ns": percentile(ordered, 0.99),
+        "stdev_ns": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+# Benchmark definitions
+
+class _DeclinePolicy(Policy):
+    """Looks at every offer and buys nothing, so buy_card is pure offer generation."""
+
+    def choose_purchase(self, player, offer, game):
+        return None
+
+    def choose_merge(self, player, game):
+        return None
+
+    def choose_battle_card(self, player, game):
+        return player.cards[0]
+
+
+class _FirstPairPolicy(_DeclinePolicy):
+    """Merges the lowest-level pair, one merge per merge_cards call."""
+
+    def choose_merge(self, player, game):
+        return player.merges.pair_at()
+
+
+def battle_benchmarks(game, catalog):
+    """Game.battle for every ordered pairing of card classes."""
+    by_class = {name: catalog.of_class(name)[0] for name in game.CARD_CLASSES
+                if catalog.of_class(name)}
+    benchmarks = []
+    for name1, template1 in by_class.items():
+        for name2, template2 in by_class.items():
+            def setup(template1=template1, template2=template2):
+                player1 = game.Player("Player 1", catalog)
+                player2 = game.Player("Player 2", catalog)
+                return (game.Game(player1, player2, rng=random.Random(0)),
+                        template1, template2)
+
+            def run(state):
+                battle_game, template1, template2 = state
+                battle_game.battle(template1.instantiate(), template2.instantiate())
+
+            benchmarks.append(Benchmark(f"battle:{name1}-vs-{name2}", setup, run, inner=200))
+    return benchmarks
+
+
+def shop_benchmarks(game, catalog):
+    def setup():
+        player = game.Player("Shopper", catalog, _DeclinePolicy(), rng=random.Random(0))
+        player.coins = 10 ** 9
+        return player
+
+    def run(player):
+        player.buy_card()
+
+    return [Benchmark("shop:buy_card_offer", setup, run, inner=2000)]
+
+
+def merge_benchmarks(game, catalog, sizes=(1_000, 10_000)):
+    """Player.auto_merge on large level-1 decks; each sample gets a fresh deck."""
+    benchmarks = []
+    for size in sizes:
+        def setup(size=size):
+            rng = random.Random(size)
+            player = game.Player("Merger", catalog)
+            for _ in range(size):
+                player.add_card(rng.choice(catalog))
+            return player
+
+        benchmarks.append(Benchmark(f"merge:auto_merge[{size}]", setup,
+                                    lambda player: player.auto_merge(), per_sample=True))
+
+    def setup_one():
+        player = game.Player("Merger", catalog, _FirstPairPolicy())
+        for card in catalog:
+            for _ in range(1_000):
+                player.add_card(card)
+        return player
+
+    benchmarks.append(Benchmark("merge:merge_cards_step", setup_one,
+                                lambda player: player.merge_cards(), inner=1000,
+                                per_sample=True))
+    return benchmarks
+
+
+def power_benchmarks(game, catalog, size=100_000):
+    """Rank a large card pool by calculate_power."""
+    def setup():
+        rng = random.Random(size)
+        return [rng.choice(catalog).instantiate() for _ in range(size)]
+
+    def run(cards):
+        sorted(cards, key=lambda card: card.calculate_power(), reverse=True)
+
+    return [Benchmark(f"power:rank[{size}]", setup, run)]
+
+
+def matchmaking_benchmarks(sizes=(1_000, 100_000)):
+    """Matchmaker.enqueue plus dequeue against a queue of `size` waiters.
+
+    Tolerance 0 keeps every ticket waiting, so each sample is a pure index
+    insert and removal; "match" uses the default tolerance, where most
+    enqueues pair off with a neighbour and the queue is refilled.
+    """
+    benchmarks = []
+    for size in sizes:
+        def setup(size=size, tolerance=0.0):
+            rng = random.Random(size)
+            queue = Matchmaker(tolerance=tolerance, widen_per_second=0.0)
+            for ticket in range(size):
+                queue.enqueue(ticket, rng.uniform(10, 500))
+            return queue, rng, [size]
+
+        def run(state):
+            queue, rng, counter = state
+            ticket = counter[0]
+            counter[0] += 1
+            queue.enqueue(ticket, rng.uniform(10, 500))
+            queue.dequeue(ticket)
+
+        def run_match(state):
+            queue, rng, counter = state
+            ticket = counter[0]
+            counter[0] += 1
+            if queue.enqueue(ticket, rng.uniform(10, 500)) is not None:
+                queue.enqueue(-ticket, rng.uniform(10, 500))
+
+        benchmarks.append(Benchmark(f"matchmaking:enqueue_dequeue[{size}]", setup, run,
+                                    inner=2000))
+        benchmarks.append(Benchmark(f"matchmaking:match[{size}]",
+                                    lambda size=size: setup(size, 0.25), run_match,
+                                    inner=2000))
+    return benchmarks
+
+
+def snapshot_benchmarks(game, catalog, rounds=6):
+    """snapshot + restore and fork of a self-play game `rounds` rounds in."""
+    from selfplay import new_game
+
+    def setup():
+        position = new_game(catalog, "greedy", "greedy", SeedTree(0).child(0))
+        position.play(max_rounds=rounds)
+        return position
+
+    def snapshot_restore(position):
+        snapshot.restore(snapshot.snapshot(position), catalog)
+
+    rollout_rng = random.Random(0)
+    return [
+        Benchmark("snapshot:snapshot_restore", setup, snapshot_restore, inner=500),
+        Benchmark("snapshot:fork", setup, snapshot.fork, inner=500),
+        Benchmark("snapshot:fork_with_rng", setup,
+                  lambda position: snapshot.fork(position, rollout_rng), inner=2000),
+    ]
+
+
+def replay_benchmarks(game, catalog, games=20):
+    """A full linear replay, from the deal and without keyframes, of `games` games.
+
+    Divide the rounds in the name by the median for rounds per second.
+    """
+    from replay import Replay, Replayer, record_selfplay
+
+    replayers = [Replayer(Replay(record_selfplay(0, i, "greedy", "greedy", catalog)[1].to_bytes()),
+                          catalog) for i in range(games)]
+    rounds = sum(replayer.replay.rounds for replayer in replayers)
+
+    def replay_all(replayers):
+        for replayer in replayers:
+            replayer.state_at(replayer.replay.rounds, seek=False)
+
+    return [Benchmark(f"replay:linear[{rounds} rounds]", lambda: replayers, replay_all, inner=5)]
+
+
+def write_catalog(path, rows, source="db.txt"):
+    """A db.txt-format file of `rows` lines, cycling db.txt with unique names."""
+    with open(source) as file:
+        base = [line.rstrip("\n").split(",") for line in file if line.strip()]
+    with open(path, "w") as out:
+        for i in range(rows):
+            card_type, _, attack, defense, health, level = base[i % len(base)]
+            out.write(f"{card_type},Card {i},{attack},{defense},{health},{level}\n")
+
+
+def load_benchmarks(game, sizes, directory):
+    benchmarks = []
+    for rows in sizes:
+        path = os.path.join(directory, f"catalog_{rows}.txt")
+
+        def setup(path=path, rows=rows):
+            if not os.path.exists(path):
+                write_catalog(path, rows)
+            return path
+
+        # Big catalogs take seconds per load; a few samples are enough
+        repeats = 3 if rows >= 1_000_000 else None
+        inner = max(1, 10_000 // rows)
+        benchmarks.append(Benchmark(f"load:load_cards_from_db[{rows}]", setup,
+                                    game.load_cards_from_db, inner=inner, repeats=repeats))
+    return benchmarks
+
+
+def all_benchmarks(load_sizes, directory):
+    catalog = CardCatalog(cardgame.load_cards_from_db())
+    return (battle_benchmarks(cardgame, catalog) + shop_benchmarks(cardgame, catalog) +
+            merge_benchmarks(cardgame, catalog) + power_benchmarks(cardgame, catalog) +
+            matchmaking_benchmarks() + snapshot_benchmarks(cardgame, catalog) +
+            replay_benchmarks(cardgame, catalog) +
+            load_benchmarks(cardgame, load_sizes, directory))
+
+
+# Reporting
+
+def compare(results, baseline, threshold):
+    """(name, ratio, status) for benchmarks in both runs; ratio is new/old median."""
+    rows = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = stats["median_ns"] / old["median_ns"]
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, ratio, status))
+    return rows
+
+
+def format_ns(ns):
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:8.2f} {unit}"
+    return f"{ns:8.0f} ns"
+
+
+def metadata():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths")
+    parser.add_argument("-k", "--filter", default="",
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--load-sizes", type=int, nargs="+", default=list(DEFAULT_LOAD_SIZES))
+    parser.add_argument("--full", action="store_true",
+                        help=f"load catalogs up to {FULL_LOAD_SIZES[-1]:,} rows")
+    parser.add_argument("--json", metavar="OUT", help="write results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="JSON from an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="median slowdown that counts as a regression (default: 0.10)")
+    args = parser.parse_args()
+    load_sizes = FULL_LOAD_SIZES if args.full else args.load_sizes
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for benchmark in all_benchmarks(load_sizes, directory):
+            if args.filter not in benchmark.name:
+                continue
+            stats = benchmark.measure(args.repeats, args.warmup)
+            results[benchmark.name] = stats
+            print(f"{benchmark.name:<36} median {format_ns(stats['median_ns'])}  "
+                  f"p90 {format_ns(stats['p90_ns'])}  p99 {format_ns(stats['p99_ns'])}  "
+                  f"(+/- {stats['stdev_ns'] / stats['mean_ns']:.1%})")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"meta": metadata(), "results": results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nAgainst {args.compare} (threshold {args.threshold:.0%}):")
+        for name, ratio, status in rows:
+            print(f"  {name:<36} {ratio:6.2f}x  {status}")
+        if any(status == "REGRESSION" for _, _, status in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from collections import namedtuple
+
+
+# One validated db.txt row: type,name,attack,defense,health[,level]
+CardRow = namedtuple("CardRow", "card_type name attack defense health level")
+
+# A rejected row, reported instead of aborting the load
+RowError = namedtuple("RowError", "line_number line reason")
+
+CARD_TYPES = ("Warrior", "Archer", "Guardian", "Assassin")
+
+
+def parse_row(line, card_types=CARD_TYPES):
+    """Parse one db.txt line into a CardRow; raises ValueError if invalid."""
+    fields = [field.strip() for field in line.split(',')]
+    if len(fields) not in (5, 6):
+        raise ValueError(f"expected 5 or 6 fields, got {len(fields)}")
+
+    card_type, name = fields[0], fields[1]
+    if card_type not in card_types:
+        raise ValueError(f"unknown card type {card_type!r}")
+    if not name:
+        raise ValueError("missing card name")
+
+    try:
+        attack = int(fields[2])
+        defense = float(fields[3])
+        health = int(fields[4])
+        level = int(fields[5]) if len(fields) == 6 else 1
+    except ValueError:
+        raise ValueError("attack, health and level must be integers and defense a number") from None
+
+    if attack < 0:
+        raise ValueError(f"attack must not be negative, got {attack}")
+    if not 0 <= defense < 1:
+        raise ValueError(f"defense must be in [0, 1), got {defense}")
+    if health <= 0:
+        raise ValueError(f"health must be positive, got {health}")
+    if level < 1:
+        raise ValueError(f"level must be at least 1, got {level}")
+    return CardRow(card_type, name, attack, defense, health, level)
+
+
+def iter_rows(path="db.txt", errors=None, card_types=CARD_TYPES):
+    """Lazily yield a CardRow for every valid line of a card database.
+
+    Reads one line at a time, so memory stays flat regardless of file size.
+    Blank lines and lines starting with '#' are skipped. Invalid rows are
+    appended to `errors` as RowError (or dropped if errors is None) and the
+    load carries on.
+    """
+    with open(path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
+                continue
+            try:
+                row = parse_row(stripped, card_types)
+            except ValueError as exc:
+                if errors is not None:
+                    errors.append(RowError(line_number, stripped, str(exc)))
+                continue
+            yield row
+
+
+def iter_chunks(path="db.txt", chunk_size=10000, errors=None, card_types=CARD_TYPES):
+    """Yield lists of at most chunk_size CardRows; only one chunk is held at a time."""
+    chunk = []
+    for row in iter_rows(path, errors, card_types):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,153 @@
+"""Compiled binary card store, read through mmap with no parsing.
+
+Usage: python card_store.py db.txt db.bin
+
+Layout (little-endian):
+    header   32 bytes: magic, version, record size, record count, names offset
+    records  count x RECORD_DTYPE, fixed width
+    names    UTF-8 card names, addressed by (name_offset, name_len)
+"""
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+from simulator import KIND_CODES, card_kind
+from vector_engine import CardArrays
+
+
+MAGIC = b"CARDSTOR"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQ8x")
+
+RECORD_DTYPE = np.dtype([
+    ("kind", "i1"),
+    ("name_len", "<u2"),
+    ("name_offset", "<u4"),
+    ("level", "<i4"),
+    ("attack", "<f8"),
+    ("defense", "<f8"),
+    ("health", "<f8"),
+    ("attack_growth", "<f8"),
+    ("defense_growth", "<f8"),
+    ("health_growth", "<f8"),
+], align=True)
+
+KIND_NAMES = {code: name for name, code in KIND_CODES.items()}
+
+
+def compile_store(cards, path):
+    """Write Card objects (any iterable, e.g. a lazy load) to a store file.
+
+    Records are streamed to disk as they arrive; only the names are buffered
+    and appended at the end. Returns the number of cards written.
+    """
+    names = bytearray()
+    count = 0
+    with open(path, "wb") as out:
+        out.write(bytes(HEADER.size))
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        for card in cards:
+            encoded = card.name.encode("utf-8")
+            record[0] = (card_kind(card), len(encoded), len(names), card.level,
+                         card.attack, card.defense, card.health,
+                         card.attack_growth, card.defense_growth, card.health_growth)
+            out.write(record.tobytes())
+            names += encoded
+            count += 1
+        names_offset = out.tell()
+        out.write(names)
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, count, names_offset))
+    return count
+
+
+def _number(value):
+    # Attack and health are whole numbers in db.txt; keep them ints
+    value = value.item()
+    return int(value) if value.is_integer() else value
+
+
+def is_card_store(path):
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class CardStore:
+    """Read-only, memory-mapped view of a compiled card store.
+
+    `records` is a NumPy structured array backed directly by the page cache,
+    so every process that opens the same file shares one copy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, names_offset = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a card store")
+        if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path}: unsupported card store version {version}")
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE,
+                                     count=count, offset=HEADER.size)
+        self._names_offset = names_offset
+
+    def __len__(self):
+        return len(self.records)
+
+    def name(self, index):
+        record = self.records[index]
+        start = self._names_offset + int(record["name_offset"])
+        return self._mmap[start:start + int(record["name_len"])].decode("utf-8")
+
+    def names(self):
+        return [self.name(i) for i in range(len(self))]
+
+    def to_arrays(self, names=False):
+        """CardArrays for vector_engine; numeric fields are views, not copies.
+
+        Decoding names is a Python loop over every record, so they are left
+        out (None) unless `names` is true.
+        """
+        r = self.records
+        return CardArrays(self.names() if names else None, r["kind"], r["attack"], r["defense"],
+                          r["health"], r["level"], r["attack_growth"],
+                          r["defense_growth"], r["health_growth"])
+
+    def card(self, index, card_classes):
+        """Build a Card object, e.g. card(i, CARD_CLASSES) from the game module."""
+        r = self.records[index]
+        cls = card_classes[KIND_NAMES[int(r["kind"])]]
+        return cls(self.name(index), _number(r["attack"]), r["defense"].item(),
+                   _number(r["health"]), int(r["level"]))
+
+    def close(self):
+        # Drop the array view first; mmap refuses to close while exported
+        self.records = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python card_store.py <db.txt> <store.bin>")
+        sys.exit(2)
+    import cardgame
+    from cardgame import report_db_errors
+
+    source, target = sys.argv[1:]
+    errors = []
+    count = compile_store(cardgame.load_cards_from_db(source, errors, lazy=True), target)
+    report_db_errors(errors, source)
+    print(f"Compiled {count} cards from {source} into {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+"""Headless game core: the card model, the db.txt loader and the game engine.
+
+Both front ends (the console script and the tkinter GUI) build on this
+module, and so do the headless tools. It imports nothing GUI-related, so
+process-pool workers can import it cheaply without a display.
+"""
+import random
+import time
+from abc import ABC, abstractmethod
+
+import events
+from card_loader import iter_rows
+from deck import Deck
+from shop import sampler_for
+
+
+# Turn actions a policy can pick in Game.player_turn
+MARKET = "market"
+MERGE = "merge"
+BATTLE = "battle"
+
+STARTING_CARDS = 2  # Dealt to every new player
+
+
+class Card(ABC):
+    # Only the per-card mutable fields live on instances; growth and power
+    # multipliers are per-class constants defined on each subclass.
+    # `template` is the catalog card a deck card was instantiated from
+    # (None for catalog cards themselves, which are never mutated), and
+    # `deck` the Deck currently holding the card, if any.
+    __slots__ = ("name", "attack", "defense", "health", "level", "template", "deck")
+
+    @abstractmethod
+    def __init__(self, name, attack, defense, health, level):
+        self.name = name
+        self.attack = attack
+        self.defense = defense
+        self.health = health
+        self.level = level
+        self.template = None
+        self.deck = None
+        self.set_base_stats(self.attack, self.defense, self.health)
+        
+    @abstractmethod
+    def set_base_stats(self):
+        pass
+    
+    @abstractmethod
+    def special_ability(self, rng=random):
+        pass
+    
+    def instantiate(self):
+        """Return a fresh deck copy of this card; the original is left untouched."""
+        card = object.__new__(type(self))
+        card.name = self.name
+        card.attack = self.attack
+        card.defense = self.defense
+        card.health = self.health
+        card.level = self.level
+        card.template = self.template if self.template is not None else self
+        card.deck = None
+        return card
+
+    def upgrade(self):
+        self.level += 1
+        self.attack += self.attack_growth
+        self.defense += self.defense_growth if self.defense <= 0.9 else 0
+        self.health += self.health_growth
+        if events.sink.enabled:
+            events.sink.emit((events.UPGRADE, self.name, self.level, self.attack, self.defense, self.health))
+
+    def take_damage(self, damage):
+        actual_damage = damage * (1 - self.defense)
+        self.health -= actual_damage
+        # Leave the deck as soon as the card falls
+        if self.health <= 0 and self.deck is not None:
+            self.deck.discard(self)
+        if events.sink.enabled:
+            events.sink.emit((events.DAMAGE, self.name, actual_damage, self.health))
+        
+    def is_alive(self):
+        return self.health > 0
+
+    def calculate_power(self):
+        return (self.attack * self.attack_multiplier + 
+                self.defense * self.defense_multiplier) * self.level
+        
+    def set_base_stats(self, attack, defense, health):
+        self.attack = attack
+        self.defense = defense
+        self.health = health
+    
+
+class Warrior(Card):
+    __slots__ = ()
+    attack_growth = 6
+    defense_growth = 0.05
+    health_growth = 25
+    attack_multiplier = 1.2
+    defense_multiplier = 0.8
+
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+        
+    def special_ability(self, rng=random):
+        return self.attack * (1 + (1 - self.health/90) * 0.5)
+
+class Archer(Card):
+    __slots__ = ()
+    attack_growth = 8
+    defense_growth = 0.03
+    health_growth = 15
+    attack_multiplier = 1.5
+    defense_multiplier = 0.5
+
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+        
+    def special_ability(self, rng=random):
+        return self.attack * 2 if rng.random() < 0.3 else self.attack
+
+class Guardian(Card):
+    __slots__ = ()
+    attack_growth = 4
+    defense_growth = 0.07
+    health_growth = 35
+    attack_multiplier = 0.8
+    defense_multiplier = 1.2
+
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+        
+    def special_ability(self, rng=random):
+        return self.defense * 10
+
+class Assassin(Card):
+    __slots__ = ()
+    attack_growth = 9
+    defense_growth = 0.02
+    health_growth = 12
+    attack_multiplier = 1.7
+    defense_multiplier = 0.3
+
+    def __init__(self, name, attack, defense, health, level=1):
+        super().__init__(name, attack, defense, health, level)
+        
+    def special_ability(self, rng=random):
+        return self.attack * 3 if rng.random() < 0.2 else self.attack
+
+CARD_CLASSES = {
+    "Warrior": Warrior,
+    "Archer": Archer,
+    "Guardian": Guardian,
+    "Assassin": Assassin,
+}
+
+def iter_cards_from_db(path="db.txt", errors=None):
+    """Lazily build cards row by row, so callers can start before the file is parsed."""
+    for row in iter_rows(path, errors, CARD_CLASSES):
+        # Instantiate the correct class with parameters
+        yield CARD_CLASSES[row.card_type](row.name, row.attack, row.defense, row.health, row.level)
+
+def load_cards_from_db(path="db.txt", errors=None, lazy=False):
+    # Invalid rows are reported through `errors` and skipped
+    cards = iter_cards_from_db(path, errors)
+    return cards if lazy else list(cards)
+
+def report_db_errors(errors, path="db.txt"):
+    for error in errors:
+        print(f"Skipping {path} line {error.line_number}: {error.reason} ({error.line!r})")
+
+def deal_starting_cards(player, catalog, rng):
+    """Deal a new player STARTING_CARDS uniform picks from the catalog, drawn from `rng`.
+
+    Every front end deals through here, so one seed deals the same hands in all of them.
+    """
+    for _ in range(STARTING_CARDS):
+        player.add_card(rng.choice(catalog))
+
+class Player:
+    def __init__(self, name, available_cards, policy=None, rng=None):
+        self.name = name
+        self.cards = Deck()  # Player’s own deck of cards
+        self.coins = 10
+        self.available_cards = available_cards  # CardCatalog loaded from db.txt
+        self.policy = policy  # Makes the decisions instead of input() when set
+        self.merges = self.cards.merges  # Deck cards bucketed by (class, level)
+        self.shop = sampler_for(available_cards)  # Market offers from that catalog
+        self.rng = rng if rng is not None else random  # Draws this player's offers
+        self.recorder = None  # ReplayRecorder logging this player's game, if any
+
+    def add_card(self, card):
+        """Add a copy of a catalog card to the player's deck and return it."""
+        instance = card.instantiate()
+        self.cards.add(instance)
+        return instance
+
+    def remove_dead_cards(self):
+        """Drop cards whose health has run out.
+
+        Cards killed through take_damage leave the deck on their own; this
+        only catches health changed some other way.
+        """
+        self.cards.prune()
+        
+    # Method untuk menampilkan kartu yang valid
+    def view_cards(self):
+        print(f"\n{self.name}'s Cards:")
+        
+        # Cek dan hapus kartu yang tidak valid (health <= 0)
+        self.remove_dead_cards()
+        
+        if not self.cards:
+            print("No cards available.")
+            return
+        
+        # Tampilkan kartu yang masih valid
+        for i, card in enumerate(self.cards, 1):
+            print(f"{i}. {card.name} (Level {card.level})")
+            print(f"   Attack: {card.attack}, Defense: {card.defense:.2f}, Health: {card.health}")
+        
+        input("\nPress Enter to continue...")
+
+
+    def merge(self, card1, card2):
+        """Upgrade card1 by consuming card2; returns False if they cannot merge."""
+        if card1 is card2 or card1 not in self.merges or card2 not in self.merges:
+            return False
+
+        # Check if both cards are of the same class and level
+        if (card1.__class__ != card2.__class__ or
+            card1.level != card2.level):
+            return False
+
+        if self.recorder is not None:
+            self.recorder.merge(self, card1, card2)
+
+        # Upgrade the first card and remove the second one
+        old_level = card1.level
+        card1.upgrade()
+        self.cards.discard(card2)
+        self.cards.relevel(card1, old_level)
+        if events.sink.enabled:
+            events.sink.emit((events.MERGE, card1.name, card1.level))
+        return True
+
+    def merge_pair(self, index1, index2):
+        """Merge two deck cards by index; returns False if they cannot merge."""
+        if not (0 <= index1 < len(self.cards) and
+                0 <= index2 < len(self.cards)):
+            return False
+        return self.merge(self.cards[index1], self.cards[index2])
+
+    def auto_merge(self):
+        """Merge every available pair, lowest level first, and return the count.
+
+        Merges cascade in the same pass: two L1 cards make an L2, which then
+        merges with another L2, and so on.
+        """
+        merged = 0
+        while True:
+            pair = self.merges.pair_at()
+            if pair is None:
+                return merged
+            self.merge(*pair)
+            merged += 1
+
+    def merge_cards(self, game=None):
+        if len(self.cards) < 2:
+            if self.policy is None:
+                print("Need at least 2 cards to merge!")
+            return False
+
+        if not self.merges.has_merge():
+            if self.policy is None:
+                print("No two cards share a type and level, nothing to merge.")
+            return False
+
+        if self.policy is not None:
+            pair = self.policy.choose_merge(self, game)
+            return pair is not None and self.merge(*pair)
+            
+        while True:
+            print(f"\n{self.name}, choose two cards to merge (or 0 to cancel):")
+            for i, card in enumerate(self.cards, 1):
+                print(f"{i}. {card.name} - Level: {card.level}")
+            
+            try:
+                choice1 = int(input("Choose first card (0 to cancel): "))
+                if choice1 == 0:
+                    return False
+                    
+                choice2 = int(input("Choose second card (0 to cancel): "))
+                if choice2 == 0:
+                    return False
+                
+                choice1 -= 1
+                choice2 -= 1
+                
+                if (0 <= choice1 < len(self.cards) and 
+                    0 <= choice2 < len(self.cards) and
+                    choice1 != choice2):
+                    
+                    if self.merge_pair(choice1, choice2):
+                        return True
+                    else:
+                        print("Cards must be of the same type and level to merge.")
+                else:
+                    print("Invalid selection.")
+                    return False
+            except ValueError:
+                print("Please enter valid numbers.")
+                return False
+
+    def purchase(self, card):
+        """Pay for a catalog card and add a copy of it to the deck."""
+        if self.recorder is not None:
+            self.recorder.purchase(self, card)
+        selected_card = self.add_card(card)
+        self.coins -= 5
+        if events.sink.enabled:
+            events.sink.emit((events.PURCHASE, self.name, selected_card.name))
+        return True
+
+    def buy_card(self, game=None):
+        if self.coins <= 0:
+            if self.policy is None:
+                print("Not enough coins to buy a new card!")
+            return False
+
+        # Up to 5 cards, no card name more than twice
+        chosen_cards = self.shop.offer(self.rng)
+
+        if self.policy is not None:
+            choice = self.policy.choose_purchase(self, chosen_cards, game)
+            return choice is not None and self.purchase(chosen_cards[choice])
+
+        # Display options to the player
+        print("\nAvailable cards to buy:")
+        for i, card in enumerate(chosen_cards, 1):
+            print(f"{i}. {card.name} - Attack: {card.attack}, Defense: {card.defense:.2f}, Health: {card.health}")
+
+        print("0. Cancel purchase")
+
+        # Let player choose a card
+        try:
+            choice = int(input(f"Choose a card to buy (0-{len(chosen_cards)}): "))
+            if choice == 0:
+                return False
+            elif 1 <= choice <= len(chosen_cards):
+                return self.purchase(chosen_cards[choice - 1])
+            else:
+                print("Invalid choice.")
+                return False
+        except ValueError:
+            print("Please enter a valid number.")
+            return False
+
+    def choose_card(self, game=None):
+        if self.policy is not None:
+            return self.policy.choose_battle_card(self, game)
+
+        while True:
+            print(f"\n{self.name}, choose your action:")
+            print("1. Choose card for battle")
+            print("2. View all cards")
+            
+            try:
+                action = input("Enter your choice (1-2): ")
+                
+                if action == "1":
+                    print(f"\nChoose your card:")
+                    for i, card in enumerate(self.cards, 1):
+                        print(f"{i}. {card.name} - Level: {card.level}")
+                        print(f"   Attack: {card.attack}, Defense: {card.defense:.2f}, Health: {card.health}")
+                    
+                    choice = int(input("Choose card number: ")) - 1
+                    if 0 <= choice < len(self.cards):
+                        return self.cards[choice]
+                    else:
+                        print("Invalid card number.")
+                elif action == "2":
+                    self.view_cards()
+                else:
+                    print("Invalid choice.")
+            except ValueError:
+                print("Please enter a valid number.")
+
+class Game:
+    def __init__(self, player1, player2, rounds=3, rng=None):
+        self.player1 = player1
+        self.player2 = player2
+        self.rounds = rounds
+        self.rng = rng if rng is not None else random  # Rolls for special abilities
+        self.recorder = None  # Set by replay.ReplayRecorder
+        self.round = 0  # Rounds started so far; play() resumes from here
+
+    def battle(self, card1, card2):
+        sink = events.sink
+        if sink.enabled:
+            sink.emit((events.BATTLE, self.player1.name, card1.name, self.player2.name, card2.name))
+        rng = self.rng
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.battle(card1, card2)
+            rng = recorder.dice(rng)  # Lets the recorder see each crit roll
+        
+        while card1.is_alive() and card2.is_alive():
+            # Card 1's turn
+            attack_damage = card1.special_ability(rng)
+            if recorder is not None:
+                recorder.attack(card1, attack_damage)
+            card2.take_damage(attack_damage)
+            if not card2.is_alive():
+                if sink.enabled:
+                    sink.emit((events.DEFEAT, card2.name))
+                    sink.emit((events.ROUND_WIN, self.player1.name))
+                return 1
+
+            # Card 2's turn
+            attack_damage = card2.special_ability(rng)
+            if recorder is not None:
+                recorder.attack(card2, attack_damage)
+            card1.take_damage(attack_damage)
+            if not card1.is_alive():
+                if sink.enabled:
+                    sink.emit((events.DEFEAT, card1.name))
+                    sink.emit((events.ROUND_WIN, self.player2.name))
+                return 2
+
+        return 0
+
+    def policy_turn(self, player, max_actions=20):
+        """Let the player's policy act until it picks battle or an action does nothing."""
+        for _ in range(max_actions):
+            action = player.policy.choose_action(player, self)
+            if action == MARKET:
+                done = player.buy_card(self)
+            elif action == MERGE:
+                done = player.merge_cards(self)
+            else:
+                break
+            if not done:
+                break
+
+    def player_turn(self, player, turn_time_limit=60):
+        if player.policy is not None:
+            self.policy_turn(player)
+            return
+
+        start_time = time.time()
+        
+        while True:
+            elapsed_time = time.time() - start_time
+            if elapsed_time >= turn_time_limit:
+                print("\nTime's up! Moving to the next phase.\n")
+                break
+            
+            print(f"{player.name}'s turn (Coins: {player.coins}) - Time remaining: {int(turn_time_limit - elapsed_time)} seconds\n")
+            print("1. Decks \n")
+            print("2. Market \n")
+            print("3. Merge \n")
+            print("4. Battle \n")
+            
+            action = input("Choose your action (1-4): ")
+            
+            if action == "1":
+                player.view_cards()
+            elif action == "2":
+                if player.buy_card():
+                    print("Card purchased successfully!")
+            elif action == "3":
+                if player.merge_cards():
+                    print("Cards merged successfully!")
+            elif action == "4":
+                print("Proceeding to battle...")
+                break
+            else:
+                print("Invalid choice. Please try again.")
+            
+            # Check remaining time after each action
+            if time.time() - start_time >= turn_time_limit:
+                print("\nTime's up! Moving to the next phase.\n")
+                break
+            
+
+    def pay_out(self, winner):
+        if winner == 1:
+            self.player1.coins += 10
+            self.player2.coins += 3
+            if events.sink.enabled:
+                events.sink.emit((events.COINS, self.player1.name, 10))
+                events.sink.emit((events.COINS, self.player2.name, 3))
+        elif winner == 2:
+            self.player2.coins += 10
+            self.player1.coins += 3
+            if events.sink.enabled:
+                events.sink.emit((events.COINS, self.player1.name, 3))
+                events.sink.emit((events.COINS, self.player2.name, 10))
+
+    def play(self, max_rounds=200):
+        """Play a whole game with no input or output; both players need a policy.
+
+        Returns 1 or 2 for the winning player, or 0 for a draw.
+        """
+        player1, player2 = self.player1, self.player2
+        while player1.cards and player2.cards and self.round < max_rounds:
+            self.round += 1
+            if self.recorder is not None:
+                self.recorder.round()
+            self.policy_turn(player1)
+            self.policy_turn(player2)
+
+            card1 = player1.choose_card(self)
+            card2 = player2.choose_card(self)
+            self.pay_out(self.battle(card1, card2))
+
+        self.rounds_played = self.round
+        return self.game_winner()
+
+    def game_winner(self):
+        # The bigger deck wins if the round limit ends the game early
+        cards1, cards2 = len(self.player1.cards), len(self.player2.cards)
+        if cards1 > cards2:
+            return 1
+        if cards2 > cards1:
+            return 2
+        return 0
+
+    def start(self):
+        print("\n=== Game Start ===")
+
+        while self.player1.cards and self.player2.cards:  # Loop hingga salah satu deck kosong
+            self.round += 1
+            if self.recorder is not None:
+                self.recorder.round()
+
+            # Player turns
+            self.player_turn(self.player1)
+            self.player_turn(self.player2)
+
+            # Battle phase
+            card1 = self.player1.choose_card()
+            card2 = self.player2.choose_card()
+
+            # Lakukan pertarungan
+            winner = self.battle(card1, card2)
+            self.pay_out(winner)
+
+            # Perbarui deck masing-masing pemain
+            self.player1.view_cards()
+            self.player2.view_cards()
+
+        print("\n=== Game Over ===")
+        if self.player1.cards:
+            print(f"{self.player1.name} wins the game!")
+        elif self.player2.cards:
+            print(f"{self.player2.name} wins the game!")
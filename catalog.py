@@ -0,0 +1,124 @@
+import random
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+class CardCatalog:
+    """Indexed, read-mostly collection of catalog cards.
+
+    Behaves like the list returned by load_cards_from_db (len, indexing,
+    iteration, random.choice), and adds O(1) lookup by name and class,
+    range queries on stats and power, and O(1) weighted sampling. The
+    per-card rarity weights also feed shop.ShopSampler's market offers.
+    Indexes are built from the cards' stats at construction; call reindex()
+    after changing them.
+    """
+
+    RANGE_FIELDS = ("attack", "defense", "health", "power")
+
+    def __init__(self, cards, weights=None):
+        self._cards = list(cards)
+        self._weights = list(weights) if weights is not None else None
+        if self._weights is not None and len(self._weights) != len(self._cards):
+            raise ValueError("weights must have one entry per card")
+        self.reindex()
+
+    def reindex(self):
+        self._by_name = {}
+        self._by_class = defaultdict(list)
+        for card in self._cards:
+            self._by_name.setdefault(card.name, []).append(card)
+            self._by_class[type(card).__name__].append(card)
+
+        # Range indexes: parallel sorted key / card lists for bisect
+        self._ranges = {}
+        for field in self.RANGE_FIELDS:
+            if field == "power":
+                keyed = sorted(((card.calculate_power(), i) for i, card in enumerate(self._cards)))
+            else:
+                keyed = sorted(((getattr(card, field), i) for i, card in enumerate(self._cards)))
+            self._ranges[field] = ([key for key, _ in keyed],
+                                   [self._cards[i] for _, i in keyed])
+
+        self._build_alias()
+
+    # List compatibility
+    def __len__(self):
+        return len(self._cards)
+
+    def __getitem__(self, index):
+        return self._cards[index]
+
+    def __iter__(self):
+        return iter(self._cards)
+
+    @property
+    def weights(self):
+        """Per-card rarity weights, or None for a uniform catalog."""
+        return list(self._weights) if self._weights is not None else None
+
+    # Lookups
+    def get(self, name, default=None):
+        """Return the first card called `name`."""
+        cards = self._by_name.get(name)
+        return cards[0] if cards else default
+
+    def named(self, name):
+        return list(self._by_name.get(name, ()))
+
+    def names(self):
+        return list(self._by_name)
+
+    def of_class(self, card_class):
+        """All cards of a class, given as the class or its name ("Warrior")."""
+        if isinstance(card_class, type):
+            card_class = card_class.__name__
+        return list(self._by_class.get(card_class, ()))
+
+    def in_range(self, field, low=None, high=None):
+        """Cards with low <= field <= high, ordered by that field.
+
+        `field` is one of attack, defense, health or power (calculate_power).
+        """
+        keys, cards = self._ranges[field]
+        start = 0 if low is None else bisect_left(keys, low)
+        stop = len(keys) if high is None else bisect_right(keys, high)
+        return cards[start:stop]
+
+    def strongest(self, count=1):
+        """The `count` cards with the highest calculate_power, strongest first."""
+        _, cards = self._ranges["power"]
+        return cards[:-count - 1:-1] if count > 0 else []
+
+    # Weighted sampling (Vose's alias method)
+    def _build_alias(self):
+        n = len(self._cards)
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        if n == 0 or self._weights is None:
+            return
+        total = float(sum(self._weights))
+        if total <= 0:
+            raise ValueError("weights must sum to a positive value")
+        scaled = [w * n / total for w in self._weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever is left is 1.0 up to rounding
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def sample(self, rng=random):
+        """Draw one card, with probability proportional to its weight."""
+        if not self._cards:
+            raise IndexError("cannot sample from an empty catalog")
+        i = int(rng.random() * len(self._cards))
+        if self._weights is None:
+            return self._cards[i]
+        return self._cards[i] if rng.random() < self._prob[i] else self._cards[self._alias[i]]
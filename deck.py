@@ -0,0 +1,121 @@
+from collections import Counter
+from itertools import islice
+
+from merge_index import MergeIndex
+
+
+class Deck:
+    """A player's live cards, kept current as cards join, merge and die.
+
+    Cards register themselves through their `deck` slot, and Card.take_damage
+    discards a card from its deck the moment its health runs out. Length,
+    truthiness, membership, per-class counts and removal are all O(1), so
+    round loops and win checks never rescan the deck. Iteration and indexing
+    follow the order cards were added, like the list it replaces.
+
+    `power` is the deck's total calculate_power, kept current as cards are
+    bought, upgraded through relevel and lost, for matchmaking.
+    """
+
+    def __init__(self, cards=()):
+        self._cards = {}  # card -> its calculate_power, in insertion order
+        self.class_counts = Counter()
+        self.power = 0.0
+        self.merges = MergeIndex()
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        if card in self._cards:
+            return
+        power = self._cards[card] = card.calculate_power()
+        self.power += power
+        card.deck = self
+        self.class_counts[type(card).__name__] += 1
+        self.merges.add(card)
+
+    def discard(self, card):
+        """Remove a card if present; safe to call for cards already gone."""
+        if card not in self._cards:
+            return
+        self.power -= self._cards.pop(card)
+        if not self._cards:
+            self.power = 0.0  # Drop accumulated rounding error
+        card.deck = None
+        name = type(card).__name__
+        self.class_counts[name] -= 1
+        if not self.class_counts[name]:
+            del self.class_counts[name]
+        self.merges.discard(card)
+
+    def copy(self):
+        """A deck of fresh copies of these cards, in the same order.
+
+        The counts, power and merge buckets are copied rather than rebuilt
+        card by card, since forking a game for search does this constantly.
+        """
+        clone = Deck.__new__(Deck)
+        clone._cards = cards = {}
+        copies = {}
+        for card, power in self._cards.items():
+            copy = copies[card] = card.instantiate()
+            copy.deck = clone
+            cards[copy] = power
+        clone.class_counts = Counter.__new__(Counter)  # Counter() and .copy are slow
+        dict.update(clone.class_counts, self.class_counts)
+        clone.power = self.power
+        clone.merges = self.merges.copy(copies)
+        return clone
+
+    def strongest(self):
+        """The first card with the highest calculate_power, from the kept scores."""
+        cards = self._cards
+        return max(cards, key=cards.__getitem__)
+
+    def relevel(self, card, old_level):
+        """Re-bucket and re-score a card after an upgrade changed its level."""
+        self.merges.relevel(card, old_level)
+        power = card.calculate_power()
+        self.power += power - self._cards[card]
+        self._cards[card] = power
+
+    def prune(self):
+        """Drop cards whose health was lowered without going through take_damage."""
+        for card in [card for card in self._cards if card.health <= 0]:
+            self.discard(card)
+
+    def index(self, card):
+        """Position of a card in deck order; O(n), for menus and replays."""
+        for position, other in enumerate(self._cards):
+            if other is card:
+                return position
+        raise ValueError("card is not in this deck")
+
+    def count(self, card_class):
+        """Live cards of a class, given as the class or its name."""
+        if isinstance(card_class, type):
+            card_class = card_class.__name__
+        return self.class_counts[card_class]
+
+    def __len__(self):
+        return len(self._cards)
+
+    def __bool__(self):
+        return bool(self._cards)
+
+    def __contains__(self, card):
+        return card in self._cards
+
+    def __iter__(self):
+        return iter(self._cards)
+
+    def __getitem__(self, index):
+        # Positional access is only for menus and random picks; it walks the deck
+        if index < 0:
+            index += len(self._cards)
+        if not 0 <= index < len(self._cards):
+            raise IndexError("deck index out of range")
+        return next(islice(self._cards, index, None))
+
+    def __repr__(self):
+        return f"Deck({list(self._cards)!r})"
@@ -0,0 +1,153 @@
+"""Structured game events and the sinks that consume them.
+
+Game logic emits plain tuples (kind, *fields) to the module-level `sink`
+instead of printing. Emitters check `sink.enabled` first, so with the default
+NullSink no tuple is built and nothing is formatted:
+
+    if events.sink.enabled:
+        events.sink.emit((events.DAMAGE, card.name, damage, card.health))
+"""
+from collections import deque
+
+
+# Event kinds and their field names
+DAMAGE = 1
+DEFEAT = 2
+ROUND_WIN = 3
+BATTLE = 4
+UPGRADE = 5
+MERGE = 6
+PURCHASE = 7
+COINS = 8
+
+EVENT_NAMES = {
+    DAMAGE: "damage",
+    DEFEAT: "defeat",
+    ROUND_WIN: "round_win",
+    BATTLE: "battle",
+    UPGRADE: "upgrade",
+    MERGE: "merge",
+    PURCHASE: "purchase",
+    COINS: "coins",
+}
+
+EVENT_FIELDS = {
+    DAMAGE: ("card", "amount", "health"),
+    DEFEAT: ("card",),
+    ROUND_WIN: ("player",),
+    BATTLE: ("player1", "card1", "player2", "card2"),
+    UPGRADE: ("card", "level", "attack", "defense", "health"),
+    MERGE: ("card", "level"),
+    PURCHASE: ("player", "card"),
+    COINS: ("player", "amount"),
+}
+
+# How the console front end has always phrased each event
+CONSOLE_TEMPLATES = {
+    DAMAGE: "{0} received {1:.2f} damage, remaining health: {2:.2f}",
+    DEFEAT: "{0} has been defeated!",
+    ROUND_WIN: "{0} wins this round!",
+    BATTLE: "\nBattle: {0}'s {1} vs {2}'s {3}",
+    UPGRADE: ("{0} has been merged and upgraded to level {1}!\n"
+              "New stats - Attack: {2}, Defense: {3:.2f}, Health: {4}"),
+    MERGE: "Merged {0} to level {1}!",
+    PURCHASE: "{0} bought a new card: {1}",
+    COINS: "{0} earned {1} coins!",
+}
+
+
+def event_dict(event):
+    """Name the fields of an event tuple, e.g. for JSON."""
+    kind = event[0]
+    record = {"event": EVENT_NAMES[kind]}
+    record.update(zip(EVENT_FIELDS[kind], event[1:]))
+    return record
+
+
+def format_event(event):
+    return CONSOLE_TEMPLATES[event[0]].format(*event[1:])
+
+
+class NullSink:
+    """Discards everything; emitters skip building events entirely."""
+
+    enabled = False
+
+    def emit(self, event):
+        pass
+
+    def flush(self):
+        pass
+
+
+class ConsoleSink:
+    """Prints events the way the game always has, for a human at the console."""
+
+    enabled = True
+
+    def emit(self, event):
+        print(CONSOLE_TEMPLATES[event[0]].format(*event[1:]))
+
+    def flush(self):
+        pass
+
+
+class RingBufferSink:
+    """Keeps the last `capacity` event tuples in memory, unformatted."""
+
+    enabled = True
+
+    def __init__(self, capacity=4096):
+        self.events = deque(maxlen=capacity)
+        self.emit = self.events.append
+
+    def flush(self):
+        pass
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def clear(self):
+        self.events.clear()
+
+
+class JsonlSink:
+    """Buffers event tuples and writes them as JSON lines in batches."""
+
+    enabled = True
+
+    def __init__(self, file, buffer_size=8192):
+        self.file = file
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+    def emit(self, event):
+        self._buffer.append(event)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        import json  # Only this sink needs it; keeps `import events` cheap
+
+        if self._buffer:
+            self.file.write("".join(json.dumps(event_dict(event)) + "\n"
+                                    for event in self._buffer))
+            self._buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+sink = NullSink()
+
+
+def set_sink(new_sink):
+    """Route events to `new_sink`; returns the previous sink."""
+    global sink
+    previous, sink = sink, new_sink
+    return previous
@@ -0,0 +1,138 @@
+"""Load-test client for server.py.
+
+Usage: python loadtest.py [--players 10000] [--duration 30] [--think 1.0]
+                          [--port 8765]
+
+Opens --players connections at once, joins them all, and plays scripted
+turns: look at the market, buy the first card when affordable, then
+battle with the first card. Each request waits for its reply and then
+--think seconds (randomised +/-50%), like a person clicking. Players rejoin
+after a game ends and everyone disconnects after --duration. The report
+gives request latency percentiles (send to matching reply) and the
+request rate.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import time
+
+from policies import CARD_PRICE
+
+
+class Client:
+    def __init__(self, number, latencies, think=0.0):
+        self.number = number
+        self.latencies = latencies
+        self.think = think
+        self.pending = {}  # request id -> (future, sent at)
+        self.ids = itertools.count()
+        self.turns = asyncio.Queue()
+        self.games = 0
+        self.errors = 0  # Error replies, e.g. a turn that timed out while thinking
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port, limit=1 << 16)
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+    async def request(self, message):
+        if self.think:
+            await asyncio.sleep(self.think * random.uniform(0.5, 1.5))
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = (future, time.perf_counter())
+        message["id"] = request_id
+        self.send(message)
+        return await future
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            request_id = message.get("id")
+            if request_id is not None:
+                future, sent = self.pending.pop(request_id)
+                self.latencies.append(time.perf_counter() - sent)
+                future.set_result(message)
+            elif message["type"] in ("turn", "game_over"):
+                self.turns.put_nowait(message)
+
+    async def play(self, duration):
+        listener = asyncio.create_task(self.listen())
+        try:
+            async with asyncio.timeout(duration):
+                while True:
+                    await self.play_game()
+        except TimeoutError:
+            pass
+        finally:
+            listener.cancel()
+            self.writer.close()
+
+    async def play_game(self):
+        self.send({"op": "join", "name": f"load{self.number}"})
+        while True:
+            message = await self.turns.get()
+            if message["type"] == "game_over":
+                self.games += 1
+                return
+            offer = await self.request({"op": "market"})
+            if offer["type"] == "error":
+                self.errors += 1
+                continue
+            if message["coins"] >= CARD_PRICE and offer["cards"]:
+                await self.request({"op": "buy", "card": 0})
+            reply = await self.request({"op": "battle", "card": 0})
+            if reply["type"] == "error":
+                self.errors += 1
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(host, port, players, duration, think, connect_batch=500):
+    latencies = []
+    clients = [Client(i, latencies, think) for i in range(players)]
+    started = time.perf_counter()
+    # Connect in batches so the listen backlog is not overrun
+    for i in range(0, players, connect_batch):
+        await asyncio.gather(*(client.connect(host, port)
+                               for client in clients[i:i + connect_batch]))
+    connected = time.perf_counter() - started
+    print(f"{players:,} players connected in {connected:.1f}s")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client.play(duration) for client in clients))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    print(f"{len(ordered):,} requests, {sum(c.games for c in clients):,} player-games "
+          f"in {elapsed:.1f}s ({len(ordered) / elapsed:,.0f} requests/s), "
+          f"{sum(c.errors for c in clients):,} error replies")
+    if ordered:
+        print(f"latency p50 {percentile(ordered, 0.50) * 1e3:.2f} ms  "
+              f"p99 {percentile(ordered, 0.99) * 1e3:.2f} ms  "
+              f"max {ordered[-1] * 1e3:.2f} ms  mean {statistics.fmean(ordered) * 1e3:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the card game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="mean seconds between a reply and the next request")
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.players, args.duration, args.think))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Matchmaking: pair waiting players with opponents of similar deck power.
+
+    queue = Matchmaker(tolerance=0.25)
+    pair = queue.enqueue(ticket, player.cards.power)  # (waiting, ticket) or None
+    queue.dequeue(ticket)                             # gave up before a match
+    for pair in queue.poll(): ...                     # call every second or so
+
+A player's strength is Deck.power, the sum of calculate_power over their
+deck, which the deck keeps current as cards are bought, merged, upgraded
+and killed, so queueing never rescans a deck.
+
+Waiting tickets sit in a sorted index of (power, arrival) split into short
+buckets, so one bisect over the bucket maxima and one inside a bucket find
+the nearest waiting power on either side in O(log n), and inserts and
+removals only shift one bucket. Enqueueing matches the closer neighbour if
+it is within `tolerance` (a fraction of the larger power); otherwise the
+ticket waits. Each waiter's window widens by `widen_per_second`, and poll()
+pairs neighbours whose gap the wider window now covers, so nobody waits
+forever for a perfect opponent.
+"""
+import itertools
+import time
+from bisect import bisect_left
+
+
+BUCKET_SIZE = 512  # Buckets split when they reach twice this
+
+
+class Matchmaker:
+    def __init__(self, tolerance=0.25, widen_per_second=0.05, clock=time.monotonic):
+        self.tolerance = tolerance
+        self.widen_per_second = widen_per_second
+        self.clock = clock
+        self._buckets = []  # Sorted runs of (power, arrival number, ticket)
+        self._maxes = []    # Last entry of each bucket, for bisecting buckets
+        self._entries = {}  # ticket -> (entry, enqueued at)
+        self._arrivals = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, ticket):
+        return ticket in self._entries
+
+    def allowance(self, power, other_power, since, now):
+        """Largest fair power gap for a ticket that has waited since `since`."""
+        fraction = self.tolerance + self.widen_per_second * (now - since)
+        return fraction * max(power, other_power, 1.0)
+
+    def _nearest(self, key):
+        """(bucket, position) of the waiting entry closest in power to `key`."""
+        buckets, maxes = self._buckets, self._maxes
+        if not buckets:
+            return None
+        b = bisect_left(maxes, key)
+        if b == len(buckets):
+            return b - 1, len(buckets[b - 1]) - 1
+        i = bisect_left(buckets[b], key)
+        if i:
+            below = b, i - 1
+        elif b:
+            below = b - 1, len(buckets[b - 1]) - 1
+        else:
+            return b, i
+        power = key[0]
+        if power - buckets[below[0]][below[1]][0] <= buckets[b][i][0] - power:
+            return below
+        return b, i
+
+    def _insert(self, entry):
+        buckets, maxes = self._buckets, self._maxes
+        if not buckets:
+            buckets.append([entry])
+            maxes.append(entry)
+            return
+        b = min(bisect_left(maxes, entry), len(buckets) - 1)
+        bucket = buckets[b]
+        bucket.insert(bisect_left(bucket, entry), entry)
+        maxes[b] = bucket[-1]
+        if len(bucket) >= 2 * BUCKET_SIZE:
+            buckets[b:b + 1] = bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]
+            maxes[b:b + 1] = bucket[BUCKET_SIZE - 1], bucket[-1]
+
+    def _remove_at(self, b, i):
+        bucket = self._buckets[b]
+        del bucket[i]
+        if bucket:
+            self._maxes[b] = bucket[-1]
+        else:
+            del self._buckets[b], self._maxes[b]
+
+    def enqueue(self, ticket, power):
+        """Match `ticket` with the closest fair waiter, or queue it.
+
+        Returns (waiting ticket, ticket) when matched, otherwise None.
+        """
+        if ticket in self._entries:
+            raise ValueError(f"{ticket!r} is already queued")
+        arrival = next(self._arrivals)
+        now = self.clock()
+        nearest = self._nearest((power, arrival))
+        if nearest is not None:
+            other_power, _, other = self._buckets[nearest[0]][nearest[1]]
+            since = self._entries[other][1]
+            if abs(power - other_power) <= self.allowance(power, other_power, since, now):
+                self._remove_at(*nearest)
+                del self._entries[other]
+                return other, ticket
+        entry = (power, arrival, ticket)
+        self._insert(entry)
+        self._entries[ticket] = (entry, now)
+        return None
+
+    def dequeue(self, ticket):
+        """Take `ticket` out of the queue; False if it was not waiting."""
+        entry = self._entries.pop(ticket, None)
+        if entry is None:
+            return False
+        # Search by (power, arrival) so tickets themselves are never compared
+        key = entry[0][:2]
+        b = bisect_left(self._maxes, key)
+        self._remove_at(b, bisect_left(self._buckets[b], key))
+        return True
+
+    def poll(self):
+        """Pair neighbours whose widened windows now cover their gap.
+
+        One O(n) sweep; returns the new pairs, longer-waiting ticket first.
+        """
+        now = self.clock()
+        entries = self._entries
+        waiting = [entry for bucket in self._buckets for entry in bucket]
+        pairs = []
+        kept = []
+        i = 0
+        while i < len(waiting):
+            if i + 1 < len(waiting):
+                (power, _, first), (other_power, _, second) = waiting[i], waiting[i + 1]
+                if entries[second][1] < entries[first][1]:
+                    first, second = second, first
+                since = entries[first][1]
+                if other_power - power <= self.allowance(power, other_power, since, now):
+                    del entries[first], entries[second]
+                    pairs.append((first, second))
+                    i += 2
+                    continue
+            kept.append(waiting[i])
+            i += 1
+        self._buckets = [kept[i:i + BUCKET_SIZE] for i in range(0, len(kept), BUCKET_SIZE)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        return pairs
@@ -0,0 +1,129 @@
+"""Compute the all-pairs matchup matrix for every card and merge level.
+
+Usage: python matchup_matrix.py --max-level 3 --samples 2000 --workers 32
+
+Pairs are cut into fixed-size shards and each shard draws from its own
+SeedSequence child keyed by the shard index, so the matrix depends only on
+--seed and --shard-size, never on how many workers ran it.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from card_store import CardStore, is_card_store
+import cardgame
+from vector_engine import CardArrays, level_entries, pair_counts, counts_to_matrix
+
+
+# Per-process state, set once by the pool initializer so shards only carry
+# their index range over the pipe.
+_entries = None
+
+SHARDS_PER_WORKER = 4  # In flight at once, so huge pools do not queue every shard
+
+
+def _init_worker(entries):
+    global _entries
+    _entries = entries
+
+
+def _init_worker_from_store(path, levels):
+    # Each worker maps the compiled store itself; the pages are shared
+    global _entries
+    _entries = level_entries(CardStore(path).to_arrays(), levels)
+
+
+def _run_shard(shard, start, stop, samples, seed):
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard,)))
+    return shard, pair_counts(_entries, start, stop, samples, rng)
+
+
+def build_matrix(pool, levels, samples, seed, workers=None, shard_size=256,
+                 store_path=None):
+    """Run every shard on a process pool and merge the partial counts.
+
+    If store_path names the compiled card store `pool` was read from, workers
+    open it themselves instead of receiving the stat arrays. Only
+    SHARDS_PER_WORKER shards per worker are submitted at a time.
+    Returns (wins1, wins2, draws) shaped (cards, levels, cards, levels).
+    """
+    levels = list(levels)
+    entries = level_entries(pool, levels)
+    pair_count = len(entries[0]) ** 2
+    if store_path is None:
+        initializer, initargs = _init_worker, (entries,)
+    else:
+        initializer, initargs = _init_worker_from_store, (store_path, levels)
+    counts = np.zeros((3, pair_count), dtype=np.int64)
+    shards = enumerate(range(0, pair_count, shard_size))
+    window = SHARDS_PER_WORKER * (workers or os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        running = set()
+        while True:
+            # Top the window back up, then wait for any shard to finish
+            for shard, start in shards:
+                stop = min(start + shard_size, pair_count)
+                running.add(executor.submit(_run_shard, shard, start, stop, samples, seed))
+                if len(running) >= window:
+                    break
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard, partial = future.result()
+                start = shard * shard_size
+                counts[:, start:start + partial.shape[-1]] += partial
+
+    return tuple(counts_to_matrix(counts[outcome], len(pool), len(levels))
+                 for outcome in (1, 2, 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="All-pairs card matchup matrix")
+    parser.add_argument("--db", default="db.txt",
+                        help="card database or compiled card store (default: db.txt)")
+    parser.add_argument("--max-level", type=int, default=3,
+                        help="highest merge level to include (default: 3)")
+    parser.add_argument("--samples", type=int, default=1000,
+                        help="duels per matchup (default: 1000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard-size", type=int, default=256,
+                        help="matchups per work unit (changes the RNG streams)")
+    parser.add_argument("--output", default="matchup_matrix.npz")
+    args = parser.parse_args()
+
+    if is_card_store(args.db):
+        pool = CardStore(args.db).to_arrays(names=True)
+        store_path = args.db
+    else:
+        errors = []
+        pool = CardArrays.from_cards(cardgame.load_cards_from_db(args.db, errors))
+        cardgame.report_db_errors(errors, args.db)
+        store_path = None
+    levels = range(1, args.max_level + 1)
+
+    started = time.perf_counter()
+    wins1, wins2, draws = build_matrix(pool, levels, args.samples, args.seed,
+                                       args.workers, args.shard_size, store_path)
+    elapsed = time.perf_counter() - started
+
+    np.savez_compressed(
+        args.output,
+        wins1=wins1, wins2=wins2, draws=draws,
+        win_rate=wins1 / args.samples,
+        names=np.array(pool.names), levels=np.array(list(levels)),
+        samples=args.samples, seed=args.seed, shard_size=args.shard_size,
+    )
+    duels = wins1.size * args.samples
+    print(f"{wins1.size} matchups x {args.samples} samples in {elapsed:.2f}s "
+          f"({duels / elapsed:,.0f} duels/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+"""Monte Carlo Tree Search player for the shop-merge-battle loop.
+
+Usage: python mcts.py [--games 20] [--budget 0.2] [--workers 0]
+                      [--opponent greedy] [--seed 0]
+
+MCTSPolicy plans its own decisions: what to do next in a turn (go to the
+market, merge a given (class, level) pair or end the turn), which offered
+card to buy, and which card to send into battle. The opponent's moves,
+market offers and critical hits are chance: every iteration forks the
+current game with snapshot.fork and its own dice and replays the tree's
+actions on that fork (open-loop MCTS). An action is only scored in the
+iterations where it was legal, since offers and merge pairs vary.
+
+Leaves are valued by a rollout of `rollout_rounds` rounds with greedy play
+on both sides, battles resolved by simulator.run_duel instead of the
+blow-by-blow Game.battle. A finished game scores 1, 0.5 or 0; otherwise
+the rollout scores the share of total deck power that is ours.
+
+Each decision searches for `budget` seconds. With `workers`, that many
+processes search at once (root parallelism), each keeping its own tree,
+and the parent sums their root statistics. The tree is kept between
+decisions: the policy tells each search which actions it has taken since,
+and the search descends to that subtree instead of starting over.
+`last_stats` and `total_stats` count iterations and tree nodes, with
+nodes_per_second for sizing hardware.
+"""
+import argparse
+import math
+import multiprocessing
+import random
+import time
+
+from policies import BATTLE, CARD_PRICE, MARKET, MERGE, GreedyPolicy, Policy
+from simulator import duel_stats, run_duel
+import snapshot
+
+
+# Decision points, in the order the game asks for them
+TURN = "turn"      # choose_action
+OFFER = "offer"    # choose_purchase
+CARD = "card"      # choose_battle_card
+OVER = "over"
+
+MAX_TURN_ACTIONS = 20  # As in Game.policy_turn
+MAX_ROUNDS = 200       # As in Game.play
+EXPLORATION = 1.4
+
+
+class Node:
+    __slots__ = ("phase", "children", "visits", "value", "available")
+
+    def __init__(self, phase):
+        self.phase = phase
+        self.children = {}  # action -> Node
+        self.visits = 0
+        self.value = 0.0
+        self.available = 0  # Iterations in which this node's action was legal
+
+
+def fast_battle(game, card1, card2):
+    """Game.battle through simulator.run_duel: same rules, no per-hit calls."""
+    winner, _, health1, health2 = run_duel(duel_stats(card1), duel_stats(card2),
+                                           game.rng.random)
+    card1.health, card2.health = health1, health2
+    for card in (card1, card2):
+        if card.health <= 0 and card.deck is not None:
+            card.deck.discard(card)
+    return winner
+
+
+def _merge_pairs(player):
+    """One mergeable pair per (class, level) bucket, keyed by that bucket."""
+    pairs = {}
+    for card1, card2 in player.merges.pairs():
+        pairs.setdefault(("merge", type(card1).__name__, card1.level), (card1, card2))
+    return pairs
+
+
+def _battle_cards(player):
+    """The healthiest card of each (name, level), keyed by action."""
+    cards = {}
+    for card in player.cards:
+        action = ("card", card.name, card.level)
+        if action not in cards or card.health > cards[action].health:
+            cards[action] = card
+    return cards
+
+
+class Simulation:
+    """One forked game stepped through the searching player's decisions."""
+
+    def __init__(self, game, seat, phase, offer, turn_actions, max_rounds):
+        self.game = game
+        self.seat = seat
+        self.player = game.player1 if seat == 1 else game.player2
+        self.opponent = game.player2 if seat == 1 else game.player1
+        self.phase = phase
+        self.offer = offer
+        self.turn_actions = turn_actions
+        self.max_rounds = max_rounds
+
+    def legal_actions(self):
+        player = self.player
+        if self.phase == TURN:
+            actions = {}
+            if player.coins >= CARD_PRICE:
+                actions[("market",)] = None
+            actions.update(_merge_pairs(player))
+            actions[("end",)] = None
+            return actions
+        if self.phase == OFFER:
+            actions = {}
+            if player.coins >= CARD_PRICE:
+                for card in self.offer:
+                    actions.setdefault(("buy", card.name), card)
+            actions[("pass",)] = None
+            return actions
+        if self.phase == CARD:
+            return _battle_cards(player)
+        return {}
+
+    def apply(self, action, target):
+        kind = action[0]
+        player = self.player
+        if kind == "market":
+            self.offer = player.shop.offer(player.rng)
+            self.phase = OFFER
+        elif kind == "buy":
+            player.purchase(target)
+            self._acted()
+        elif kind == "merge":
+            player.merge(*target)
+            self._acted()
+        elif kind in ("end", "pass"):
+            self._end_turn()
+        elif kind == "card":
+            self._battle(target)
+
+    def _acted(self):
+        self.turn_actions += 1
+        self.phase = TURN
+        if self.turn_actions >= MAX_TURN_ACTIONS:
+            self._end_turn()
+
+    def _end_turn(self):
+        # Player 2 takes its turn after player 1's, before either picks a card
+        if self.seat == 1:
+            self.game.policy_turn(self.opponent)
+        self.phase = CARD
+
+    def _battle(self, card):
+        game, opponent = self.game, self.opponent
+        other = opponent.policy.choose_battle_card(opponent, game)
+        if self.seat == 1:
+            winner = fast_battle(game, card, other)
+        else:
+            winner = fast_battle(game, other, card)
+        game.pay_out(winner)
+        self._next_round()
+
+    def _next_round(self):
+        game = self.game
+        if not (game.player1.cards and game.player2.cards) or game.round >= self.max_rounds:
+            self.phase = OVER
+            return
+        game.round += 1
+        if self.seat == 2:
+            game.policy_turn(self.opponent)
+        self.phase = TURN
+        self.turn_actions = 0
+        self.offer = None
+
+    def rollout(self, rounds, policy):
+        """Play on with `policy` for us for up to `rounds` battles; our score."""
+        game, player = self.game, self.player
+        if self.phase == OFFER:
+            choice = policy.choose_purchase(player, self.offer, game)
+            if choice is not None and player.coins >= CARD_PRICE:
+                player.purchase(self.offer[choice])
+                self._acted()
+            else:
+                self._end_turn()
+        player.policy = policy
+        for _ in range(rounds):
+            if self.phase == OVER:
+                break
+            if self.phase == TURN:
+                game.policy_turn(player)
+                self._end_turn()
+            self._battle(policy.choose_battle_card(player, game))
+        return self.score()
+
+    def score(self):
+        game = self.game
+        if self.phase == OVER:
+            winner = game.game_winner()
+            return 0.5 if winner == 0 else float(winner == self.seat)
+        ours, theirs = self.player.cards.power, self.opponent.cards.power
+        return ours / (ours + theirs) if ours + theirs > 0 else 0.5
+
+
+class Search:
+    """One MCTS tree; lives in the policy or in a worker process."""
+
+    def __init__(self, catalog, seed=None, exploration=EXPLORATION, rollout_rounds=10,
+                 max_rounds=MAX_ROUNDS, opponent_policy=None):
+        self.catalog = catalog
+        self.rng = random.Random(seed)
+        self.exploration = exploration
+        self.rollout_rounds = rollout_rounds
+        self.max_rounds = max_rounds
+        self.rollout_policy = GreedyPolicy()
+        self.opponent_policy = opponent_policy or GreedyPolicy()
+        self.root = None
+
+    def advance(self, actions):
+        """Move the root down past actions the player has taken since the last search."""
+        for action in actions:
+            if self.root is None:
+                return
+            self.root = self.root.children.get(action)
+
+    def reset(self):
+        self.root = None
+
+    def run(self, data, seat, phase, offer, turn_actions, budget):
+        """Search from a snapshot for `budget` seconds.
+
+        Returns ({action: (visits, value)} at the root, iterations, nodes).
+        """
+        game = snapshot.restore(data, self.catalog)
+        offer = [self.catalog[i] for i in offer] if offer is not None else None
+        if self.root is None or self.root.phase != phase:
+            self.root = Node(phase)
+        root, rng, exploration = self.root, self.rng, self.exploration
+        policies = [None, None]
+        policies[2 - seat] = self.opponent_policy
+        iterations = nodes = 0
+        deadline = time.perf_counter() + budget
+        while time.perf_counter() < deadline:
+            simulation = Simulation(snapshot.fork(game, rng, policies), seat, phase,
+                                    offer, turn_actions, self.max_rounds)
+            node, path = root, [root]
+            while True:
+                legal = simulation.legal_actions()
+                if not legal:
+                    break
+                children = node.children
+                fresh = []
+                for action in legal:
+                    child = children.get(action)
+                    if child is None:
+                        fresh.append(action)
+                    else:
+                        child.available += 1
+                if fresh:
+                    action = rng.choice(fresh)
+                    simulation.apply(action, legal[action])
+                    child = children[action] = Node(simulation.phase)
+                    child.available = 1
+                    path.append(child)
+                    break
+                best = best_score = None
+                for action in legal:
+                    child = children[action]
+                    score = (child.value / child.visits +
+                             exploration * math.sqrt(math.log(child.available) / child.visits))
+                    if best_score is None or score > best_score:
+                        best, best_score = action, score
+                simulation.apply(best, legal[best])
+                node = children[best]
+                path.append(node)
+            value = simulation.rollout(self.rollout_rounds, self.rollout_policy)
+            for node in path:
+                node.visits += 1
+                node.value += value
+            iterations += 1
+            nodes += len(path)
+        stats = {action: (child.visits, child.value) for action, child in root.children.items()}
+        return stats, iterations, nodes
+
+
+def _worker(connection, catalog, seed, options):
+    search = Search(catalog, seed, **options)
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        if message == "reset":
+            search.reset()
+            continue
+        actions, request = message
+        search.advance(actions)
+        connection.send(search.run(*request))
+
+
+class MCTSPolicy(Policy):
+    """Plays by tree search; see the module docstring.
+
+    `opponent_policy` models the other player inside the search (greedy by
+    default). Call close() when done to stop the worker processes.
+    """
+
+    def __init__(self, catalog, budget=0.2, workers=0, seed=None, exploration=EXPLORATION,
+                 rollout_rounds=10, max_rounds=MAX_ROUNDS, opponent_policy=None):
+        self.catalog = catalog
+        self.budget = budget
+        self.index = {id(card): i for i, card in enumerate(catalog)}
+        options = {"exploration": exploration, "rollout_rounds": rollout_rounds,
+                   "max_rounds": max_rounds, "opponent_policy": opponent_policy}
+        seeds = random.Random(seed)
+        self.search = None
+        self.connections = []
+        self.processes = []
+        if workers:
+            for _ in range(workers):
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_worker, args=(child, catalog, seeds.getrandbits(64), options),
+                    daemon=True)
+                process.start()
+                self.connections.append(parent)
+                self.processes.append(process)
+        else:
+            self.search = Search(catalog, seeds.getrandbits(64), **options)
+        self.game = None
+        self.taken = []          # Actions taken since the last search
+        self.turn_actions = 0
+        self.merge_pair = None   # Chosen by choose_action for choose_merge
+        self.last_stats = None
+        self.total_stats = {"decisions": 0, "iterations": 0, "nodes": 0, "seconds": 0.0}
+
+    def fork(self, fork_rng):
+        raise TypeError("an MCTSPolicy tracks its own game; give snapshot.fork other policies")
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+        for process in self.processes:
+            process.join()
+        self.connections, self.processes = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _new_game(self, game):
+        if game is not self.game:
+            self.game = game
+            self.taken = []
+            self.turn_actions = 0
+            if self.search is not None:
+                self.search.reset()
+            for connection in self.connections:
+                connection.send("reset")
+
+    def _decide(self, player, game, phase, legal, offer=None):
+        """Search and return the best of `legal` actions, recording it as taken."""
+        self._new_game(game)
+        if len(legal) == 1:
+            action = next(iter(legal))
+        else:
+            action = self._search(player, game, phase, legal, offer)
+        self.taken.append(action)
+        return action
+
+    def _search(self, player, game, phase, legal, offer):
+        seat = 1 if player is game.player1 else 2
+        offer = [self.index[id(card)] for card in offer] if offer is not None else None
+        request = (snapshot.snapshot(game), seat, phase, offer, self.turn_actions, self.budget)
+        started = time.perf_counter()
+        if self.search is not None:
+            self.search.advance(self.taken)
+            results = [self.search.run(*request)]
+        else:
+            for connection in self.connections:
+                connection.send((self.taken, request))
+            results = [connection.recv() for connection in self.connections]
+        seconds = time.perf_counter() - started
+        self.taken = []
+
+        visits = dict.fromkeys(legal, 0)
+        iterations = nodes = 0
+        for stats, worker_iterations, worker_nodes in results:
+            for action, (action_visits, _) in stats.items():
+                if action in visits:
+                    visits[action] += action_visits
+            iterations += worker_iterations
+            nodes += worker_nodes
+        self.last_stats = {"iterations": iterations, "nodes": nodes, "seconds": seconds,
+                           "nodes_per_second": nodes / seconds if seconds else 0.0}
+        totals = self.total_stats
+        totals["decisions"] += 1
+        totals["iterations"] += iterations
+        totals["nodes"] += nodes
+        totals["seconds"] += seconds
+        return max(visits, key=visits.get)
+
+    def nodes_per_second(self):
+        seconds = self.total_stats["seconds"]
+        return self.total_stats["nodes"] / seconds if seconds else 0.0
+
+    def choose_action(self, player, game):
+        if game is None:
+            return super().choose_action(player, game)
+        legal = {}
+        if player.coins >= CARD_PRICE:
+            legal[("market",)] = None
+        legal.update(_merge_pairs(player))
+        legal[("end",)] = None
+        action = self._decide(player, game, TURN, legal)
+        if action[0] == "market":
+            return MARKET
+        if action[0] == "merge":
+            self.merge_pair = legal[action]
+            self.turn_actions += 1
+            return MERGE
+        self.turn_actions = 0
+        return BATTLE
+
+    def choose_purchase(self, player, offer, game):
+        if game is None or not offer:
+            return GreedyPolicy().choose_purchase(player, offer, game)
+        legal = {}
+        if player.coins >= CARD_PRICE:
+            for i, card in enumerate(offer):
+                legal.setdefault(("buy", card.name), i)
+        legal[("pass",)] = None
+        action = self._decide(player, game, OFFER, legal, offer)
+        if action[0] == "buy":
+            self.turn_actions += 1
+        else:
+            self.turn_actions = 0
+        return legal[action]
+
+    def choose_merge(self, player, game):
+        pair, self.merge_pair = self.merge_pair, None
+        return pair if pair is not None else player.merges.pair_at(highest=True)
+
+    def choose_battle_card(self, player, game):
+        if game is None:
+            return GreedyPolicy().choose_battle_card(player, game)
+        self.turn_actions = 0
+        legal = _battle_cards(player)
+        return legal[self._decide(player, game, CARD, legal)]
+
+
+def main():
+    from catalog import CardCatalog
+    import cardgame
+    from cardgame import report_db_errors
+    from seeds import SeedTree
+    from selfplay import POLICIES, new_game
+
+    parser = argparse.ArgumentParser(description="Play the MCTS policy against another policy")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=0.2, help="seconds per decision")
+    parser.add_argument("--workers", type=int, default=0, help="search processes (0: in-process)")
+    parser.add_argument("--opponent", default="greedy", choices=sorted(POLICIES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    errors = []
+    catalog = CardCatalog(cardgame.load_cards_from_db(errors=errors))
+    report_db_errors(errors)
+    seeds = SeedTree(args.seed)
+    wins = [0, 0, 0]
+    with MCTSPolicy(catalog, args.budget, args.workers, seed=args.seed) as bot:
+        for i in range(args.games):
+            # Alternate seats so neither side always attacks first
+            seat = 1 + i % 2
+            policies = (None, args.opponent) if seat == 1 else (args.opponent, None)
+            game = new_game(catalog, *(p or "greedy" for p in policies), seeds.child(i))
+            (game.player1 if seat == 1 else game.player2).policy = bot
+            winner = game.play()
+            wins[0 if winner == 0 else 1 if winner == seat else 2] += 1
+            print(f"game {i + 1}: {'draw' if winner == 0 else 'won' if winner == seat else 'lost'}"
+                  f" as player {seat} in {game.rounds_played} rounds")
+        totals = bot.total_stats
+        print(f"MCTS vs {args.opponent}: {wins[1]} won, {wins[2]} lost, {wins[0]} drawn")
+        print(f"{totals['decisions']:,} searched decisions, {totals['iterations']:,} iterations, "
+              f"{bot.nodes_per_second():,.0f} nodes/s "
+              f"({totals['iterations'] / max(totals['seconds'], 1e-9):,.0f} iterations/s)")
+
+
+if __name__ == "__main__":
+    main()
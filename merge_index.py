@@ -0,0 +1,86 @@
+from itertools import islice
+
+
+class MergeIndex:
+    """Deck cards bucketed by (class, level), the key Player.merge_cards checks.
+
+    Buckets holding two or more cards are tracked separately, so "can
+    anything merge?" is O(1) and enumerating candidates only touches buckets
+    that actually have a pair. Callers keep it in sync through add, discard
+    and relevel as cards are bought, die or get upgraded.
+    """
+
+    def __init__(self, cards=()):
+        self._buckets = {}  # (class, level) -> {card: None}, insertion ordered
+        self._ready = {}    # keys of buckets with 2+ cards, used as an ordered set
+        self._size = 0
+        for card in cards:
+            self.add(card)
+
+    @staticmethod
+    def key(card):
+        return (card.__class__, card.level)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, card):
+        return card in self._buckets.get(self.key(card), ())
+
+    def add(self, card):
+        key = self.key(card)
+        bucket = self._buckets.setdefault(key, {})
+        if card in bucket:
+            return
+        bucket[card] = None
+        self._size += 1
+        if len(bucket) == 2:
+            self._ready[key] = None
+
+    def discard(self, card, level=None):
+        """Remove a card; pass `level` if it changed since the card was added."""
+        key = (card.__class__, card.level if level is None else level)
+        bucket = self._buckets.get(key)
+        if not bucket or card not in bucket:
+            return
+        del bucket[card]
+        self._size -= 1
+        if len(bucket) == 1:
+            del self._ready[key]
+        elif not bucket:
+            del self._buckets[key]
+
+    def copy(self, copies):
+        """The same buckets over other cards; `copies` maps each card to its stand-in."""
+        clone = MergeIndex.__new__(MergeIndex)
+        clone._buckets = {key: {copies[card]: None for card in bucket}
+                          for key, bucket in self._buckets.items()}
+        clone._ready = dict(self._ready)
+        clone._size = self._size
+        return clone
+
+    def relevel(self, card, old_level):
+        """Move a card whose level changed from old_level."""
+        self.discard(card, old_level)
+        self.add(card)
+
+    def has_merge(self):
+        return bool(self._ready)
+
+    def pairs(self):
+        """Disjoint mergeable pairs, bucket by bucket."""
+        for key in self._ready:
+            cards = iter(self._buckets[key])
+            while True:
+                pair = tuple(islice(cards, 2))
+                if len(pair) < 2:
+                    break
+                yield pair
+
+    def pair_at(self, highest=False):
+        """One mergeable pair from the lowest (or highest) level bucket, or None."""
+        if not self._ready:
+            return None
+        pick = max if highest else min
+        key = pick(self._ready, key=lambda k: k[1])
+        return tuple(islice(self._buckets[key], 2))
@@ -0,0 +1,265 @@
+"""Durable player profiles (name, coins, deck) in SQLite.
+
+Usage: python player_store.py players.db [NAME ...]
+
+    store = PlayerStore("players.db", catalog)
+    player = store.load("alice")        # cached, or read lazily, or new
+    ... play ...
+    store.save(player)                  # queued, not yet on disk
+    store.close()                       # writes what is queued, then returns
+
+save() snapshots the player into a pending row, replacing any row already
+pending for that name, so a player saved after every battle costs one row
+per flush, not one per battle. The pending rows are written in a single
+transaction (one fsync) once `batch_size` players are queued or the
+oldest has waited `flush_seconds`; a server also calls flush_due() from a
+timer so a quiet store still gets written out.
+
+flush() only hands the pending rows to a writer thread, which commits them
+on its own connection, so an event loop never waits on an fsync. Rows stay
+readable from memory until their batch is committed.
+
+The database runs in WAL mode with synchronous=FULL, so a crash loses at
+most the rows still pending and never leaves a half-written batch.
+
+Deck cards are saved as catalog index, class and name plus their stats.
+Each row records the catalog CRC it was saved under; with a different
+db.txt the cards are matched by class and name instead, and cards no longer
+in the catalog are dropped.
+
+load() keeps the most recently used `cache_size` players in memory and
+reads the rest one row at a time, on demand.
+"""
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from queue import SimpleQueue
+
+from cardgame import Player
+from snapshot import catalog_info
+
+
+SCHEMA_VERSION = 2
+
+
+def encode_deck(cards, index):
+    """JSON deck; `index` maps id(catalog card) to its catalog position."""
+    return json.dumps([[index[id(card.template)], type(card).__name__, card.name,
+                        card.attack, card.defense, card.health, card.level]
+                       for card in cards], separators=(",", ":"))
+
+
+def decode_deck(text, player, checksum):
+    """Add the encoded cards to `player`'s deck, rebuilt from its catalog.
+
+    `checksum` is the CRC of the catalog the deck was saved with.
+    """
+    catalog = player.available_cards
+    entries = json.loads(text)
+    if checksum == catalog_info(catalog)[1]:
+        templates = [catalog[entry[0]] for entry in entries]
+    else:
+        by_name = {}
+        for card in catalog:
+            by_name.setdefault(card.name, []).append(card)
+        templates = []
+        for entry in entries:
+            matches = by_name.get(entry[-5], [])
+            if len(entry) > 5:
+                matches = [card for card in matches if type(card).__name__ == entry[1]][:1]
+            # Schema 1 saved names only, so a name shared by several cards is dropped
+            templates.append(matches[0] if len(matches) == 1 else None)
+    for template, entry in zip(templates, entries):
+        if template is None:
+            continue  # Dropped from db.txt since the profile was saved
+        attack, defense, health, level = entry[-4:]
+        card = template.instantiate()
+        card.attack, card.defense, card.health, card.level = attack, defense, health, level
+        player.cards.add(card)
+
+
+class PlayerStore:
+    def __init__(self, path, catalog, cache_size=1024, batch_size=256, flush_seconds=0.5,
+                 clock=time.monotonic):
+        self.catalog = catalog
+        self.index, self.checksum = catalog_info(catalog)
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.clock = clock
+        self.cache = OrderedDict()  # name -> Player, least recently used first
+        self.pending = {}           # name -> (coins, deck, catalog CRC) for the next flush
+        self.pending_since = None
+        self.in_flight = {}         # name -> row handed to the writer, not yet committed
+        self.flushes = 0            # Batches committed by the writer
+        self.connection = sqlite3.connect(path)  # Reads, on the caller's thread
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self._lock = threading.Lock()
+        self._batches = SimpleQueue()
+        self._error = None
+        self._writer = threading.Thread(target=self._write_batches, args=(path,),
+                                        name="player-store-writer", daemon=True)
+        self._writer.start()
+
+    def _migrate(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"player store schema {version} is newer than {SCHEMA_VERSION}")
+        if version < 1:
+            with self.connection:
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS players ("
+                    "name TEXT PRIMARY KEY, coins INTEGER NOT NULL, deck TEXT NOT NULL)")
+        if version < 2:
+            with self.connection:
+                self.connection.execute(
+                    "ALTER TABLE players ADD COLUMN catalog INTEGER NOT NULL DEFAULT 0")
+                self.connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self.cache or self._row(name) is not None
+
+    def _row(self, name):
+        """The newest row for `name`: pending, being written, or committed."""
+        row = self.pending.get(name)
+        if row is None:
+            with self._lock:
+                row = self.in_flight.get(name)
+        if row is None:
+            # The writer commits a row before dropping it from in_flight
+            row = self.connection.execute(
+                "SELECT coins, deck, catalog FROM players WHERE name = ?", (name,)).fetchone()
+        return row
+
+    def load(self, name, create=True, **player_options):
+        """The stored Player called `name`; a new one if unknown and `create`.
+
+        `player_options` (policy, rng) apply only when the player is built,
+        not to one already in the cache.
+        """
+        player = self.cache.get(name)
+        if player is not None:
+            self.cache.move_to_end(name)
+            return player
+        row = self._row(name)
+        if row is None and not create:
+            return None
+        player = Player(name, self.catalog, **player_options)
+        if row is not None:
+            player.coins = row[0]
+            decode_deck(row[1], player, row[2])
+        self.cache[name] = player
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return player
+
+    def save(self, player):
+        """Queue the player's current coins and deck for the next flush."""
+        if not self.pending:
+            self.pending_since = self.clock()
+        self.pending[player.name] = (player.coins, encode_deck(player.cards, self.index),
+                                     self.checksum)
+        if player.name not in self.cache:
+            self.cache[player.name] = player
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush_due(self):
+        """Flush if the oldest pending row has waited `flush_seconds`."""
+        if self.pending and self.clock() - self.pending_since >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Hand every pending row to the writer as one batch; returns the row count.
+
+        Does not wait for the commit. Raises if an earlier batch failed.
+        """
+        self._raise_writer_error()
+        if not self.pending:
+            return 0
+        batch = self.pending
+        with self._lock:
+            self.in_flight.update(batch)
+        self.pending = {}
+        self.pending_since = None
+        self._batches.put(batch)
+        return len(batch)
+
+    def _raise_writer_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("player store writer failed") from error
+
+    def _write_batches(self, path):
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA synchronous=FULL")
+        try:
+            while True:
+                batch = self._batches.get()
+                if batch is None:
+                    return
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO players (name, coins, deck, catalog) "
+                            "VALUES (?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+                            "coins = excluded.coins, deck = excluded.deck, "
+                            "catalog = excluded.catalog",
+                            [(name, *row) for name, row in batch.items()])
+                except sqlite3.Error as error:
+                    self._error = error  # Rows stay in in_flight, so loads still see them
+                    continue
+                with self._lock:
+                    for name, row in batch.items():
+                        # A later batch may have replaced the row meanwhile
+                        if self.in_flight.get(name) is row:
+                            del self.in_flight[name]
+                self.flushes += 1
+        finally:
+            connection.close()
+
+    def close(self):
+        """Flush, wait for the writer to commit everything, and close."""
+        try:
+            self.flush()
+        finally:
+            self._batches.put(None)
+            self._writer.join()
+            self.connection.close()
+        self._raise_writer_error()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python player_store.py players.db [NAME ...]")
+        sys.exit(1)
+    connection = sqlite3.connect(sys.argv[1])
+    if len(sys.argv) > 2:
+        query = ("SELECT name, coins, deck FROM players WHERE name IN (%s) ORDER BY name"
+                 % ",".join("?" * (len(sys.argv) - 2)))
+        rows = connection.execute(query, sys.argv[2:])
+    else:
+        rows = connection.execute("SELECT name, coins, deck FROM players ORDER BY name")
+    for name, coins, deck in rows:
+        cards = json.loads(deck)
+        print(f"{name}: {coins} coins, {len(cards)} cards")
+        for entry in cards:
+            card_name, attack, defense, health, level = entry[-5:]
+            print(f"   {card_name} (Level {level})  Attack: {attack}, "
+                  f"Defense: {defense:.2f}, Health: {health}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import random
+from abc import ABC, abstractmethod
+
+from cardgame import BATTLE, MARKET, MERGE
+
+
+CARD_PRICE = 5
+
+
+def opponent_of(player, game):
+    if game is None:
+        return None
+    return game.player2 if player is game.player1 else game.player1
+
+
+class Policy(ABC):
+    """Makes a Player's decisions instead of input().
+
+    Every hook receives the deciding player and the running Game (None when
+    the player acts outside a game). The default turn is: buy while coins
+    last, merge while a pair exists, then battle. Game.player_turn ends the
+    turn as soon as an action does nothing, so a policy that declines a
+    purchase or merge simply moves on to the battle.
+    """
+
+    def choose_action(self, player, game):
+        if player.coins >= CARD_PRICE:
+            return MARKET
+        if player.merges.has_merge():
+            return MERGE
+        return BATTLE
+
+    @abstractmethod
+    def choose_purchase(self, player, offer, game):
+        """Index into `offer` of the card to buy, or None to buy nothing."""
+
+    @abstractmethod
+    def choose_merge(self, player, game):
+        """Pair of the player's cards to merge (see player.merges), or None."""
+
+    @abstractmethod
+    def choose_battle_card(self, player, game):
+        """The card from player.cards to send into battle."""
+
+    def fork(self, fork_rng):
+        """This policy's stand-in in a forked game (see snapshot.fork).
+
+        `fork_rng` maps a generator to the fork's copy of it. Policies keep
+        no per-game state by default, so the fork shares this one; override
+        to copy whatever a policy mutates as it plays.
+        """
+        return self
+
+
+class RandomPolicy(Policy):
+    """Uniformly random choices; the baseline for self-play."""
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def choose_action(self, player, game):
+        options = [BATTLE]
+        if player.coins >= CARD_PRICE:
+            options.append(MARKET)
+        if player.merges.has_merge():
+            options.append(MERGE)
+        return self.rng.choice(options)
+
+    def choose_purchase(self, player, offer, game):
+        return self.rng.randrange(len(offer)) if offer else None
+
+    def choose_merge(self, player, game):
+        pairs = list(player.merges.pairs())
+        return self.rng.choice(pairs) if pairs else None
+
+    def choose_battle_card(self, player, game):
+        return self.rng.choice(player.cards)
+
+    def fork(self, fork_rng):
+        clone = RandomPolicy.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.rng = fork_rng(self.rng)
+        return clone
+
+
+class GreedyPolicy(Policy):
+    """Always takes the highest calculate_power option."""
+
+    def choose_purchase(self, player, offer, game):
+        if not offer:
+            return None
+        return max(range(len(offer)), key=lambda i: offer[i].calculate_power())
+
+    def choose_merge(self, player, game):
+        # Merge the highest-level pair first to push one card as far as possible
+        return player.merges.pair_at(highest=True)
+
+    def choose_battle_card(self, player, game):
+        return player.cards.strongest()
+
+
+class LookaheadPolicy(GreedyPolicy):
+    """Scores options by exact duel odds against the opponent's deck.
+
+    Uses solver.solve, so every evaluation after the first for a given pair
+    of cards is a cache hit. Without a game to look at it falls back to the
+    greedy choice.
+    """
+
+    def _win_chance(self, card, other, attacks_first):
+        import solver  # Lazily, so importing the core never loads the solver
+
+        if attacks_first:
+            return solver.solve(card, other).win1
+        return solver.solve(other, card).win2
+
+    def choose_battle_card(self, player, game):
+        opponent = opponent_of(player, game)
+        alive = [card for card in opponent.cards if card.is_alive()] if opponent else []
+        if not alive:
+            return super().choose_battle_card(player, game)
+        first = player is game.player1
+        # Assume the opponent answers with its best card: maximise the worst case
+        return max(player.cards, key=lambda card: min(
+            self._win_chance(card, other, first) for other in alive))
+
+    def choose_purchase(self, player, offer, game):
+        opponent = opponent_of(player, game)
+        alive = [card for card in opponent.cards if card.is_alive()] if opponent else []
+        if not offer or not alive:
+            return super().choose_purchase(player, offer, game)
+        first = player is game.player1
+        return max(range(len(offer)), key=lambda i: sum(
+            self._win_chance(offer[i], other, first) for other in alive))
@@ -0,0 +1,181 @@
+"""Opt-in call counts and timings for the game's phases and card classes.
+
+    import profiling
+    profiler = profiling.enable()
+    ... play games ...
+    profiling.disable()
+    profiler.write_json("profile.json")
+    profiler.write_collapsed("profile.folded")   # flamegraph.pl / speedscope
+
+enable() wraps the methods listed in PHASES and each card class's
+special_ability and take_damage with timing wrappers, and disable() puts
+the originals back. The loader is patched as cardgame.load_cards_from_db,
+so callers go through the module attribute rather than importing the
+function by name. The game code has no profiling checks, so a disabled
+profiler costs nothing at all.
+
+Timings are kept per call stack of phase names ("game;turn;shop"), so
+nested phases are attributed correctly. Process-pool workers call enable()
+in their initializer and send snapshot() back with each result. The parent
+merges those snapshots into one profile.
+"""
+import json
+from functools import wraps
+from time import perf_counter_ns
+
+
+# (class or function name, attribute) -> phase name
+PHASES = {
+    ("Game", "play"): "game",
+    ("Game", "start"): "game",
+    ("Game", "policy_turn"): "turn",
+    ("Game", "player_turn"): "turn",
+    ("Player", "buy_card"): "shop",
+    ("Player", "merge_cards"): "merge",
+    ("Player", "choose_card"): "choose",
+    ("Game", "battle"): "battle",
+    ("Game", "pay_out"): "cleanup",
+    ("Player", "remove_dead_cards"): "cleanup",
+    (None, "load_cards_from_db"): "load",
+}
+
+
+class Profiler:
+    """Call count and cumulative nanoseconds per stack of phase names."""
+
+    def __init__(self):
+        self.stats = {}   # (phase, ...) -> [calls, total_ns]
+        self._stack = []
+
+    def timed(self, name, function):
+        """Wrap `function` so each call is timed as phase `name`."""
+        stack, stats = self._stack, self.stats
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            stack.append(name(args[0]) if callable(name) else name)
+            started = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - started
+                key = tuple(stack)
+                stack.pop()
+                entry = stats.get(key)
+                if entry is None:
+                    stats[key] = [1, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
+
+        wrapper.__profiled__ = function
+        return wrapper
+
+    def snapshot(self):
+        """Plain {"a;b": [calls, total_ns]} dict; picklable and JSON-ready."""
+        return {";".join(key): list(entry) for key, entry in self.stats.items()}
+
+    def merge(self, snapshot):
+        """Add a snapshot (e.g. from a worker) into this profile."""
+        for key, (calls, total) in snapshot.items():
+            entry = self.stats.setdefault(tuple(key.split(";")), [0, 0])
+            entry[0] += calls
+            entry[1] += total
+
+    def reset(self):
+        self.stats.clear()
+
+    def self_times(self):
+        """Exclusive nanoseconds per stack: total minus time in child phases."""
+        own = {key: total for key, (_, total) in self.stats.items()}
+        for key, (_, total) in self.stats.items():
+            parent = key[:-1]
+            if parent in own:
+                own[parent] -= total
+        return own
+
+    def to_json(self):
+        own = self.self_times()
+        return {
+            ";".join(key): {"calls": calls, "total_ns": total, "self_ns": own[key]}
+            for key, (calls, total) in sorted(self.stats.items())
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_json(), file, indent=2)
+
+    def collapsed(self):
+        """Collapsed-stack lines ("a;b;c <self microseconds>") for flame graphs."""
+        return [f"{';'.join(key)} {max(0, own) // 1000}"
+                for key, own in sorted(self.self_times().items())]
+
+    def write_collapsed(self, path):
+        with open(path, "w") as file:
+            file.write("\n".join(self.collapsed()) + "\n")
+
+    def report(self, limit=20):
+        """Text table of the heaviest stacks by total time."""
+        own = self.self_times()
+        rows = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [f"{'stack':<50} {'calls':>10} {'total ms':>10} {'self ms':>10}"]
+        for key, (calls, total) in rows[:limit]:
+            lines.append(f"{';'.join(key):<50} {calls:>10,} {total / 1e6:>10.1f} "
+                         f"{own[key] / 1e6:>10.1f}")
+        return "\n".join(lines)
+
+
+profiler = None
+_patched = []  # (owner, attribute, original)
+
+
+def _class_method_name(method):
+    def name(card):
+        return f"{type(card).__name__}.{method}"
+    return name
+
+
+def enable(game_module=None, new_profiler=None):
+    """Start profiling the game classes (of cardgame by default); returns the profiler."""
+    global profiler
+    if game_module is None:
+        import cardgame as game_module
+    disable()
+    profiler = new_profiler or Profiler()
+
+    def patch(owner, attribute, name):
+        original = getattr(owner, attribute)
+        _patched.append((owner, attribute, original))
+        setattr(owner, attribute, profiler.timed(name, original))
+
+    for (owner_name, attribute), phase in PHASES.items():
+        owner = game_module if owner_name is None else getattr(game_module, owner_name, None)
+        if owner is not None and hasattr(owner, attribute):
+            patch(owner, attribute, phase)
+
+    # Per card class; take_damage lives on Card, so name it after the caller's class
+    patch(game_module.Card, "take_damage", _class_method_name("take_damage"))
+    for card_class in game_module.CARD_CLASSES.values():
+        patch(card_class, "special_ability", f"{card_class.__name__}.special_ability")
+    return profiler
+
+
+def disable():
+    """Restore every wrapped method; the collected stats stay on the profiler."""
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+
+
+def enable_in_worker():
+    """ProcessPoolExecutor initializer: profile the game in this worker."""
+    enable()
+
+
+def take_snapshot():
+    """This process's profile as a snapshot, then start counting afresh."""
+    if profiler is None:
+        return {}
+    snapshot = profiler.snapshot()
+    profiler.reset()
+    return snapshot
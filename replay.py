@@ -0,0 +1,499 @@
+"""Compact binary game replays with keyframes for seeking.
+
+Usage: python replay.py record SEED INDEX POLICY1 POLICY2 OUT
+       python replay.py show FILE [ROUND]
+
+A ReplayRecorder attached to a Game logs only the decisions and dice: shop
+purchases (catalog index), merges and battle picks (deck positions) and one
+bit per crit roll. Everything else, damage, deaths and coin payouts, follows
+from the rules, so the Replayer recomputes it with the game's own arithmetic.
+
+Layout: magic, then varints: version, seed text, catalog size and CRC,
+keyframe interval, op stream, keyframe blob and the keyframe index. A
+keyframe is the full state after every `interval` rounds, so seeking to
+round N replays at most interval - 1 rounds.
+"""
+import struct
+import sys
+import zlib
+from weakref import WeakKeyDictionary
+
+from simulator import WARRIOR, ARCHER, GUARDIAN, ASSASSIN, card_kind
+
+
+MAGIC = b"CGREPLAY"
+VERSION = 1
+KEYFRAME_INTERVAL = 32
+
+# Op codes; purchase and merge add the seat (0 or 1)
+ROUND = 0
+PURCHASE = 1
+MERGE = 3
+BATTLE = 5
+
+PAYOUT = (10, 3)  # Coins for the round winner and loser, as in Game.pay_out
+CARD_PRICE = 5
+CRIT_CHANCE = {ARCHER: 0.3, ASSASSIN: 0.2}  # As in special_ability
+
+_DOUBLE = struct.Struct("<d")
+
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def read_varints(data, pos, count):
+    """`count` varints from `pos` and the position after them.
+
+    Deck positions, catalog indexes and roll counts nearly always fit one
+    byte, so a run of one-byte varints is sliced out whole.
+    """
+    run = data[pos:pos + count]
+    if len(run) == count and run.isascii():
+        return run, pos + count
+    values = []
+    for _ in range(count):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values, pos
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def catalog_checksum(catalog):
+    """CRC of the catalog's names and stats; a replay only fits its own catalog."""
+    crc = 0
+    for card in catalog:
+        crc = zlib.crc32(repr((type(card).__name__, card.name, card.attack,
+                               card.defense, card.health, card.level)).encode(), crc)
+    return crc
+
+
+_catalog_index = WeakKeyDictionary()
+
+
+def _index_of(catalog):
+    try:
+        index = _catalog_index.get(catalog)
+    except TypeError:  # Plain lists cannot be weak-referenced
+        return {id(card): i for i, card in enumerate(catalog)}
+    if index is None:
+        index = _catalog_index[catalog] = {id(card): i for i, card in enumerate(catalog)}
+    return index
+
+
+class _Dice:
+    """The game's rng during a recorded battle, remembering the last roll."""
+
+    __slots__ = ("rng", "last")
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.last = None
+
+    def random(self):
+        self.last = self.rng.random()
+        return self.last
+
+
+class ReplayRecorder:
+    """Logs one Game's decisions; attach it before the first round.
+
+    The state at attach time (the starting deal) becomes keyframe 0.
+    """
+
+    def __init__(self, game, catalog, seed=None, interval=KEYFRAME_INTERVAL):
+        self.game = game
+        self.catalog = catalog
+        self.seed = seed
+        self.interval = interval
+        self._index = _index_of(catalog)
+        self._crit_chances = {}
+        self._dice = None
+        self.ops = bytearray()
+        self.keyframes = bytearray()
+        self.keyframe_index = []  # (rounds completed, op offset, keyframe offset)
+        self.rounds = 0
+        self._rolls = None  # Crit bits of the battle in progress
+        game.recorder = self
+        game.player1.recorder = self
+        game.player2.recorder = self
+        self._keyframe()
+
+    def _seat(self, player):
+        return 0 if player is self.game.player1 else 1
+
+    def _flush_battle(self):
+        if self._rolls is None:
+            return
+        rolls, self._rolls = self._rolls, None
+        write_varint(self.ops, len(rolls))
+        packed = 0
+        for i, bit in enumerate(rolls):
+            packed |= bit << (i & 7)
+            if i & 7 == 7:
+                self.ops.append(packed)
+                packed = 0
+        if len(rolls) & 7:
+            self.ops.append(packed)
+
+    def _keyframe(self):
+        self.keyframe_index.append((self.rounds, len(self.ops), len(self.keyframes)))
+        out = self.keyframes
+        for player in (self.game.player1, self.game.player2):
+            write_varint(out, _zigzag(player.coins))
+            write_varint(out, len(player.cards))
+            for card in player.cards:
+                write_varint(out, self._index[id(card.template)])
+                write_varint(out, card.level)
+                out += _DOUBLE.pack(card.health)
+
+    # Hooks called by Game and Player
+    def round(self):
+        self._flush_battle()
+        if self.rounds and self.rounds % self.interval == 0:
+            self._keyframe()
+        self.ops.append(ROUND)
+        self.rounds += 1
+
+    def purchase(self, player, card):
+        self._flush_battle()
+        self.ops.append(PURCHASE + self._seat(player))
+        write_varint(self.ops, self._index[id(card)])
+
+    def merge(self, player, card1, card2):
+        self._flush_battle()
+        self.ops.append(MERGE + self._seat(player))
+        write_varint(self.ops, player.cards.index(card1))
+        write_varint(self.ops, player.cards.index(card2))
+
+    def battle(self, card1, card2):
+        self._flush_battle()
+        self.ops.append(BATTLE)
+        write_varint(self.ops, self.game.player1.cards.index(card1))
+        write_varint(self.ops, self.game.player2.cards.index(card2))
+        self._rolls = []
+
+    def dice(self, rng):
+        """Stand-in for `rng` in the battle just started; see attack()."""
+        self._dice = _Dice(rng)
+        return self._dice
+
+    def attack(self, card, damage):
+        # Log the roll itself: with attack 0 a crit deals the same damage
+        chance = self._crit_chances.get(type(card))
+        if chance is None:
+            chance = self._crit_chances[type(card)] = CRIT_CHANCE.get(card_kind(card), 0)
+        if chance:
+            self._rolls.append(self._dice.last < chance)
+
+    def to_bytes(self):
+        self._flush_battle()
+        out = bytearray(MAGIC)
+        write_varint(out, VERSION)
+        seed = repr(self.seed).encode()
+        write_varint(out, len(seed))
+        out += seed
+        write_varint(out, len(self.catalog))
+        write_varint(out, catalog_checksum(self.catalog))
+        write_varint(out, self.interval)
+        write_varint(out, self.rounds)
+        for section in (self.ops, self.keyframes):
+            write_varint(out, len(section))
+            out += section
+        write_varint(out, len(self.keyframe_index))
+        for entry in self.keyframe_index:
+            for value in entry:
+                write_varint(out, value)
+        return bytes(out)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+
+class ReplayState:
+    """Both decks and coins after `round` completed rounds.
+
+    Deck cards are [catalog index, level, attack, defense, health] lists in
+    deck order, so positions match the recorded game; health is always a
+    float, whether the state was seeked to or replayed.
+    """
+
+    __slots__ = ("round", "decks", "coins")
+
+    def __init__(self, round_number, decks, coins):
+        self.round = round_number
+        self.decks = decks
+        self.coins = coins
+
+    def __repr__(self):
+        return f"ReplayState(round={self.round}, coins={self.coins}, decks={self.decks})"
+
+
+class Replay:
+    """A parsed replay file; pair it with its catalog in a Replayer."""
+
+    def __init__(self, data):
+        data = bytes(data)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a replay file")
+        pos = len(MAGIC)
+        version, pos = read_varint(data, pos)
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        length, pos = read_varint(data, pos)
+        self.seed = data[pos:pos + length].decode()
+        pos += length
+        self.catalog_size, pos = read_varint(data, pos)
+        self.catalog_crc, pos = read_varint(data, pos)
+        self.interval, pos = read_varint(data, pos)
+        self.rounds, pos = read_varint(data, pos)
+        length, pos = read_varint(data, pos)
+        self.ops = data[pos:pos + length]
+        pos += length
+        length, pos = read_varint(data, pos)
+        self.keyframes = data[pos:pos + length]
+        pos += length
+        count, pos = read_varint(data, pos)
+        self.keyframe_index = []
+        for _ in range(count):
+            entry = []
+            for _ in range(3):
+                value, pos = read_varint(data, pos)
+                entry.append(value)
+            self.keyframe_index.append(tuple(entry))
+        self.size = len(data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls(file.read())
+
+
+class Replayer:
+    """Rebuilds the state of a recorded game at any round."""
+
+    def __init__(self, replay, catalog):
+        if len(catalog) != replay.catalog_size or catalog_checksum(catalog) != replay.catalog_crc:
+            raise ValueError("replay was recorded against a different catalog")
+        self.replay = replay
+        # Per catalog card: kind, base stats and growth, for exact recomputation
+        self._cards = [(card_kind(card), card.attack, card.defense, card.health, card.level,
+                        card.attack_growth, card.defense_growth, card.health_growth)
+                       for card in catalog]
+        # Each catalog card as bought; health as a float, as keyframes store
+        # it, so states compare equal however they were reached
+        self._fresh = [[index, card.level, card.attack, card.defense, float(card.health)]
+                       for index, card in enumerate(catalog)]
+
+    def _new_card(self, index, level=None):
+        card = self._fresh[index][:]
+        for _ in range(card[1], card[1] if level is None else level):
+            self._upgrade(card)
+        return card
+
+    def _upgrade(self, card):
+        # Same statement order as Card.upgrade
+        _, _, _, _, _, ag, dg, hg = self._cards[card[0]]
+        card[1] += 1
+        card[2] += ag
+        card[3] += dg if card[3] <= 0.9 else 0
+        card[4] += hg
+
+    def _keyframe_state(self, number):
+        rounds, _, pos = self.replay.keyframe_index[number]
+        data = self.replay.keyframes
+        decks, coins = [], []
+        for _ in range(2):
+            value, pos = read_varint(data, pos)
+            coins.append(_unzigzag(value))
+            count, pos = read_varint(data, pos)
+            deck = []
+            for _ in range(count):
+                index, pos = read_varint(data, pos)
+                level, pos = read_varint(data, pos)
+                card = self._new_card(index, level)
+                card[4] = _DOUBLE.unpack_from(data, pos)[0]
+                pos += 8
+                deck.append(card)
+            decks.append(deck)
+        return ReplayState(rounds, decks, coins)
+
+    def state_at(self, round_number, seek=True):
+        """State after `round_number` rounds (0 is the starting deal).
+
+        With seek=False every round is replayed from the starting deal
+        instead of from the nearest keyframe.
+        """
+        if not 0 <= round_number <= self.replay.rounds:
+            raise IndexError(f"round {round_number} outside 0..{self.replay.rounds}")
+        number = 0
+        if seek:
+            number = min(round_number // self.replay.interval,
+                         len(self.replay.keyframe_index) - 1)
+        state = self._keyframe_state(number)
+        self._run(state, self.replay.keyframe_index[number][1], round_number)
+        return state
+
+    def final_state(self):
+        return self.state_at(self.replay.rounds)
+
+    def _run(self, state, pos, stop_round):
+        ops = self.replay.ops
+        end = len(ops)
+        cards, fresh = self._cards, self._fresh
+        decks, coins = state.decks, state.coins
+        rounds = state.round
+        while pos < end:
+            op = ops[pos]
+            pos += 1
+            if op == ROUND:
+                if rounds == stop_round:
+                    break
+                rounds += 1
+            elif op == BATTLE:
+                (i, j, roll_count), pos = read_varints(ops, pos, 3)
+                rolls = int.from_bytes(ops[pos:pos + (roll_count + 7) // 8], "little")
+                pos += (roll_count + 7) // 8
+                winner = _battle(decks[0][i], decks[1][j], cards, rolls)
+                if winner == 1:
+                    del decks[1][j]
+                    coins[0] += PAYOUT[0]
+                    coins[1] += PAYOUT[1]
+                elif winner == 2:
+                    del decks[0][i]
+                    coins[0] += PAYOUT[1]
+                    coins[1] += PAYOUT[0]
+            elif op < MERGE:
+                index = ops[pos]
+                if index < 0x80:
+                    pos += 1
+                else:
+                    index, pos = read_varint(ops, pos)
+                decks[op - PURCHASE].append(fresh[index][:])
+                coins[op - PURCHASE] -= CARD_PRICE
+            else:
+                (i, j), pos = read_varints(ops, pos, 2)
+                deck = decks[op - MERGE]
+                self._upgrade(deck[i])
+                del deck[j]
+        state.round = rounds
+
+
+def _striker(card, cards, scale):
+    """(Warrior's attack, hit, crit hit) of a card whose hits are scaled by `scale`.
+
+    The products are special_ability's, times (1 - defense) as in
+    take_damage, in the game's order, so every hit rounds as in play. A
+    Warrior's hit depends on its health and is left to the caller; cards
+    that cannot crit have no crit hit.
+    """
+    kind = cards[card[0]][0]
+    if kind == WARRIOR:
+        return card[2], None, None
+    if kind == GUARDIAN:
+        return None, card[3] * 10 * scale, None
+    return None, card[2] * scale, card[2] * (2 if kind == ARCHER else 3) * scale
+
+
+def _battle(card1, card2, cards, rolls):
+    """Game.battle on replay cards; returns 1, 2 or 0 like the game.
+
+    The recorded crit bits, one per roll in attack order, stand in for the dice.
+    """
+    scale1, scale2 = 1 - card2[3], 1 - card1[3]
+    warrior1, hit1, crit1 = _striker(card1, cards, scale1)
+    warrior2, hit2, crit2 = _striker(card2, cards, scale2)
+    h1, h2 = card1[4], card2[4]
+    winner = roll = 0
+    while h1 > 0 and h2 > 0:
+        if warrior1 is not None:
+            h2 -= warrior1 * (1 + (1 - h1/90) * 0.5) * scale1
+        elif crit1 is None:
+            h2 -= hit1
+        else:
+            h2 -= crit1 if rolls >> roll & 1 else hit1
+            roll += 1
+        if h2 <= 0:
+            winner = 1
+            break
+        if warrior2 is not None:
+            h1 -= warrior2 * (1 + (1 - h2/90) * 0.5) * scale2
+        elif crit2 is None:
+            h1 -= hit2
+        else:
+            h1 -= crit2 if rolls >> roll & 1 else hit2
+            roll += 1
+        if h1 <= 0:
+            winner = 2
+            break
+    card1[4], card2[4] = h1, h2
+    return winner
+
+
+def record_selfplay(seed, index, policy1="greedy", policy2="random", catalog=None):
+    """Play game `index` of a selfplay run under a recorder; returns (game, recorder)."""
+    import cardgame
+    from catalog import CardCatalog
+    from seeds import as_seed_tree
+    from selfplay import new_game
+
+    if catalog is None:
+        catalog = CardCatalog(cardgame.load_cards_from_db())
+    seeds = as_seed_tree(seed).child(index)
+    game = new_game(catalog, policy1, policy2, seeds)
+    recorder = ReplayRecorder(game, catalog, seed=seeds)
+    game.play()
+    return game, recorder
+
+
+def main():
+    if len(sys.argv) >= 7 and sys.argv[1] == "record":
+        _, _, seed, index, policy1, policy2, path = sys.argv[:7]
+        game, recorder = record_selfplay(int(seed), int(index), policy1, policy2)
+        recorder.save(path)
+        size = len(recorder.to_bytes())
+        print(f"{game.rounds_played} rounds, {size} bytes "
+              f"({size / max(game.rounds_played, 1):.1f} bytes/round) -> {path}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "show":
+        import cardgame
+        from catalog import CardCatalog
+
+        replay = Replay.load(sys.argv[2])
+        catalog = CardCatalog(cardgame.load_cards_from_db())
+        round_number = int(sys.argv[3]) if len(sys.argv) > 3 else replay.rounds
+        state = Replayer(replay, catalog).state_at(round_number)
+        print(f"seed {replay.seed}, {replay.rounds} rounds; after round {state.round}:")
+        for seat, (deck, coins) in enumerate(zip(state.decks, state.coins), 1):
+            print(f"Player {seat}: {coins} coins")
+            for index, level, attack, defense, health in deck:
+                print(f"  {catalog[index].name} (Level {level}) "
+                      f"Attack: {attack}, Defense: {defense:.2f}, Health: {health}")
+    else:
+        print(__doc__.split("\n\n")[1])
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,393 +1,13 @@
-import random
-from abc import ABC, abstractmethod
-from collections import Counter
-import time
+import argparse
 import tkinter as tk
-from tkinter import messagebox, simpledialog
-
-
-class Card(ABC):
-    @abstractmethod
-    def __init__(self, name, attack, defense, health, level):
-        self.name = name
-        self.attack = attack
-        self.defense = defense
-        self.health = health
-        self.level = level
-        self.set_base_stats(self.attack, self.defense, self.health)
-        
-    @abstractmethod
-    def set_base_stats(self):
-        pass
-    
-    @abstractmethod
-    def special_ability(self):
-        pass
-    
-    def upgrade(self):
-        self.level += 1
-        self.attack += self.attack_growth
-        self.defense += self.defense_growth if self.defense <= 0.9 else 0
-        self.health += self.health_growth
-        print(f"{self.name} has been merged and upgraded to level {self.level}!")
-        print(f"New stats - Attack: {self.attack}, Defense: {self.defense:.2f}, Health: {self.health}")
-
-    def take_damage(self, damage):
-        actual_damage = damage * (1 - self.defense)
-        self.health -= actual_damage
-        print(f"{self.name} received {actual_damage:.2f} damage, remaining health: {self.health:.2f}")
-        
-    def is_alive(self):
-        return self.health > 0
-
-    def calculate_power(self):
-        return (self.attack * self.attack_multiplier + 
-                self.defense * self.defense_multiplier) * self.level
-        
-    def set_base_stats(self, attack, defense, health):
-        self.attack = attack
-        self.defense = defense
-        self.health = health
-    
-
-class Warrior(Card):
-    def __init__(self, name, attack, defense, health, level=1):
-        super().__init__(name, attack, defense, health, level)
-        
-    def set_base_stats(self, attack, defense, health):
-        self.attack = attack
-        self.defense = defense
-        self.health = health
-        self.attack_growth = 6
-        self.defense_growth = 0.05
-        self.health_growth = 25
-        self.attack_multiplier = 1.2
-        self.defense_multiplier = 0.8
-        
-    def special_ability(self):
-        return self.attack * (1 + (1 - self.health/90) * 0.5)
-
-class Archer(Card):
-    def __init__(self, name, attack, defense, health, level=1):
-        super().__init__(name, attack, defense, health, level)
-        
-    def set_base_stats(self, attack, defense, health):
-        self.attack = attack
-        self.defense = defense
-        self.health = health
-        self.attack_growth = 8
-        self.defense_growth = 0.03
-        self.health_growth = 15
-        self.attack_multiplier = 1.5
-        self.defense_multiplier = 0.5
-        
-    def special_ability(self):
-        return self.attack * 2 if random.random() < 0.3 else self.attack
-
-class Guardian(Card):
-    def __init__(self, name, attack, defense, health, level=1):
-        super().__init__(name, attack, defense, health, level)
-        
-    def set_base_stats(self, attack, defense, health):
-        self.attack = attack
-        self.defense = defense
-        self.health = health
-        self.attack_growth = 4
-        self.defense_growth = 0.07
-        self.health_growth = 35
-        self.attack_multiplier = 0.8
-        self.defense_multiplier = 1.2
-        
-    def special_ability(self):
-        return self.defense * 10
-
-class Assassin(Card):
-    def __init__(self, name, attack, defense, health, level=1):
-        super().__init__(name, attack, defense, health, level)
-        
-    def set_base_stats(self, attack, defense, health):
-        self.attack = attack
-        self.defense = defense
-        self.health = health
-        self.attack_growth = 9
-        self.defense_growth = 0.02
-        self.health_growth = 12
-        self.attack_multiplier = 1.7
-        self.defense_multiplier = 0.3
-        
-    def special_ability(self):
-        return self.attack * 3 if random.random() < 0.2 else self.attack
-
-def load_cards_from_db():
-    cards = []
-    with open("db.txt", 'r') as file:
-        for line in file:
-            # Parse each line
-            data = line.strip().split(',')
-            card_type = data[0]
-            name = data[1]
-            attack = int(data[2])
-            defense = float(data[3])
-            health = int(data[4])
-            
-            
-            # Based on the name, instantiate the correct class
-            # Instantiate the correct class with parameters
-            if card_type == "Warrior":
-                card = Warrior(name, attack, defense, health)
-            elif card_type == "Archer":
-                card = Archer(name, attack, defense, health)
-            elif card_type == "Guardian":
-                card = Guardian(name, attack, defense, health)
-            elif card_type == "Assassin":
-                card = Assassin(name, attack, defense, health)
-                continue
-            
-            # Set the card's base stats using a method that applies these values
-            card.set_base_stats(attack, defense, health)
-            cards.append(card)
-            
-    return cards
-
-class Player:
-    def __init__(self, name, available_cards):
-        self.name = name
-        self.cards = []  # Player’s own deck of cards
-        self.coins = 10
-        self.available_cards = available_cards  # List of cards loaded from db.txt
-
-    def add_card(self, card):
-        """Add a card to the player's deck."""
-        self.cards.append(card)
-        
-    # Method untuk menampilkan kartu yang valid
-    def view_cards(self):
-        print(f"\n{self.name}'s Cards:")
-        
-        # Cek dan hapus kartu yang tidak valid (health <= 0)
-        self.cards = [card for card in self.cards if card.health > 0]
-        
-        if not self.cards:
-            print("No cards available.")
-            return
-        
-        # Tampilkan kartu yang masih valid
-        for i, card in enumerate(self.cards, 1):
-            print(f"{i}. {card.name} (Level {card.level})")
-            print(f"   Attack: {card.attack}, Defense: {card.defense:.2f}, Health: {card.health}")
-        
-        input("\nPress Enter to continue...")
-
-
-    def merge_cards(self):
-        if len(self.cards) < 2:
-            print("Need at least 2 cards to merge!")
-            return False
-            
-        while True:
-            print(f"\n{self.name}, choose two cards to merge (or 0 to cancel):")
-            for i, card in enumerate(self.cards, 1):
-                print(f"{i}. {card.name} - Level: {card.level}")
-            
-            try:
-                choice1 = int(input("Choose first card (0 to cancel): "))
-                if choice1 == 0:
-                    return False
-                    
-                choice2 = int(input("Choose second card (0 to cancel): "))
-                if choice2 == 0:
-                    return False
-                
-                choice1 -= 1
-                choice2 -= 1
-                
-                if (0 <= choice1 < len(self.cards) and 
-                    0 <= choice2 < len(self.cards) and
-                    choice1 != choice2):
-                    
-                    card1, card2 = self.cards[choice1], self.cards[choice2]
-                    
-                    # Check if both cards are of the same class and level
-                    if (card1.__class__ == card2.__class__ and 
-                        card1.level == card2.level):
-                        
-                        # Upgrade the first card and remove the second one
-                        card1.upgrade()
-                        del self.cards[choice2]
-                        print(f"Merged {card1.name} to level {card1.level}!")
-                        return True
-                    else:
-                        print("Cards must be of the same type and level to merge.")
-                else:
-                    print("Invalid selection.")
-                    return False
-            except ValueError:
-                print("Please enter valid numbers.")
-                return False
-
-    def buy_card(self):
-        if self.coins <= 0:
-            print("Not enough coins to buy a new card!")
-            return False
-
-        # Select 5 random cards, ensuring no card appears more than twice
-        chosen_cards = []
-        count = Counter()
-        while len(chosen_cards) < 5:
-            card = random.choice(self.available_cards)
-            if count[card.name] < 2:  # Only allow each card up to 2 times
-                chosen_cards.append(card)
-                count[card.name] += 1
-
-        # Display options to the player
-        print("\nAvailable cards to buy:")
-        for i, card in enumerate(chosen_cards, 1):
-            print(f"{i}. {card.name} - Attack: {card.attack}, Defense: {card.defense:.2f}, Health: {card.health}")
-
-        print("0. Cancel purchase")
-
-        # Let player choose a card
-        try:
-            choice = int(input("Choose a card to buy (0-5): "))
-            if choice == 0:
-                return False
-            elif 1 <= choice <= 5:
-                selected_card = chosen_cards[choice - 1]
-                self.cards.append(selected_card)
-                self.coins -= 5
-                print(f"{self.name} bought a new card: {selected_card.name}")
-                return True
-            else:
-                print("Invalid choice.")
-                return False
-        except ValueError:
-            print("Please enter a valid number.")
-            return False
-
-    def choose_card(self):
-        while True:
-            print(f"\n{self.name}, choose your action:")
-            print("1. Choose card for battle")
-            print("2. View all cards")
-            
-            try:
-                action = input("Enter your choice (1-2): ")
-                
-                if action == "1":
-                    print(f"\nChoose your card:")
-                    for i, card in enumerate(self.cards, 1):
-                        print(f"{i}. {card.name} - Level: {card.level}")
-                        print(f"   Attack: {card.attack}, Defense: {card.defense:.2f}, Health: {card.health}")
-                    
-                    choice = int(input("Choose card number: ")) - 1
-                    if 0 <= choice < len(self.cards):
-                        return self.cards[choice]
-                    else:
-                        print("Invalid card number.")
-                elif action == "2":
-                    self.view_cards()
-                else:
-                    print("Invalid choice.")
-            except ValueError:
-                print("Please enter a valid number.")
-
-class Game:
-    def __init__(self, player1, player2, rounds=3):
-        self.player1 = player1
-        self.player2 = player2
-        self.rounds = rounds
-
-    def battle(self, card1, card2):
-        print(f"\nBattle: {self.player1.name}'s {card1.name} vs {self.player2.name}'s {card2.name}")
-        
-        while card1.is_alive() and card2.is_alive():
-            # Card 1's turn
-            attack_damage = card1.special_ability()
-            card2.take_damage(attack_damage)
-            if not card2.is_alive():
-                print(f"{card2.name} has been defeated!")
-                print(f"{self.player1.name} wins this round!")
-                return 1
-
-            # Card 2's turn
-            attack_damage = card2.special_ability()
-            card1.take_damage(attack_damage)
-            if not card1.is_alive():
-                print(f"{card1.name} has been defeated!")
-                print(f"{self.player2.name} wins this round!")
-                return 2
-
-        return 0
-
-    def player_turn(self, player, turn_time_limit=60):
-        start_time = time.time()
-        
-        while True:
-            elapsed_time = time.time() - start_time
-            if elapsed_time >= turn_time_limit:
-                print("\nTime's up! Moving to the next phase.\n")
-                break
-            
-            print(f"{player.name}'s turn (Coins: {player.coins}) - Time remaining: {int(turn_time_limit - elapsed_time)} seconds\n")
-            print(f"\n{player.symbol} {player.name}'s turn (Coins: {player.coins}\n)")
-            print("1. Decks \n")
-            print("2. Market \n")
-            print("3. Merge \n")
-            print("4. Battle \n")
-            
-            action = input("Choose your action (1-4): ")
-            
-            if action == "1":
-                player.view_cards()
-            elif action == "2":
-                if player.buy_card():
-                    print("Card purchased successfully!")
-            elif action == "3":
-                if player.merge_cards():
-                    print("Cards merged successfully!")
-            elif action == "4":
-                print("Proceeding to battle...")
-                break
-            else:
-                print("Invalid choice. Please try again.")
-            
-            # Check remaining time after each action
-            if time.time() - start_time >= turn_time_limit:
-                print("\nTime's up! Moving to the next phase.\n")
-                break
-            
-
-    def start(self):
-        print("\n=== Game Start ===")
-
-        while self.player1.cards and self.player2.cards:  # Loop hingga salah satu deck kosong
-            # Player turns
-            self.player_turn(self.player1)
-            self.player_turn(self.player2)
-
-            # Battle phase
-            card1 = self.player1.choose_card()
-            card2 = self.player2.choose_card()
-
-            # Lakukan pertarungan
-            winner = self.battle(card1, card2)
-            if winner == 1:
-                self.player1.coins += 3
-                print(f"{self.player1.name} earned 3 coins!")
-            elif winner == 2:
-                self.player2.coins += 3
-                print(f"{self.player2.name} earned 3 coins!")
-
-            # Perbarui deck masing-masing pemain
-            self.player1.view_cards()
-            self.player2.view_cards()
-
-        print("\n=== Game Over ===")
-        if self.player1.cards:
-            print(f"{self.player1.name} wins the game!")
-        elif self.player2.cards:
-            print(f"{self.player2.name} wins the game!")
+from tkinter import messagebox
 
+import events
+import cardgame
+from cardgame import deal_starting_cards, report_db_errors, Player, Game
+from catalog import CardCatalog
+from policies import CARD_PRICE
+from seeds import SeedTree
 
 '''
 def main():
@@ -428,11 +48,15 @@ if __name__ == "__main__":
 
 '''
 class CardGameGUI:
-    def __init__(self, root):
+    def __init__(self, root, seed=None):
         self.root = root
+        self.seed = seed  # Root seed of the next game; fresh entropy when None
         self.root.title("Card Game")
+        events.set_sink(events.ConsoleSink())
 
-        self.all_cards = load_cards_from_db()  # Assume this function loads card data
+        errors = []
+        self.all_cards = CardCatalog(cardgame.load_cards_from_db(errors=errors))
+        report_db_errors(errors)
         self.rounds = 5  # Set example rounds or adjust as necessary
         self.game = None  # Will hold the Game instance
 
@@ -460,18 +84,21 @@ class CardGameGUI:
             messagebox.showwarning("Warning", "Both players must enter their names!")
             return
         
+        # Every random draw in the game comes from its own stream of one seed
+        seeds = SeedTree(self.seed)
+        print(f"Game seed: {seeds.seed} (play it again with --seed {seeds.seed})")
+
         # Initialize players and assign cards
-        player1 = Player(player1_name, self.all_cards)
-        player2 = Player(player2_name, self.all_cards)
+        player1 = Player(player1_name, self.all_cards, rng=seeds.child("player", 1).rng())
+        player2 = Player(player2_name, self.all_cards, rng=seeds.child("player", 2).rng())
 
-        # Give each player 2 starting cards
-        player1.add_card(random.choice(self.all_cards))
-        player1.add_card(random.choice(self.all_cards))
-        player2.add_card(random.choice(self.all_cards))
-        player2.add_card(random.choice(self.all_cards))
+        # Give each player their starting cards, dealt as in every front end
+        deal = seeds.child("deal").rng()
+        deal_starting_cards(player1, self.all_cards, deal)
+        deal_starting_cards(player2, self.all_cards, deal)
 
         # Initialize the Game instance and store it
-        self.game = Game(player1, player2, self.rounds)
+        self.game = Game(player1, player2, self.rounds, rng=seeds.child("battle").rng())
         
         # Display initial card stats in GUI
         self.display_initial_cards(player1, player2)
@@ -505,18 +132,18 @@ class CardGameGUI:
         
         tk.Label(self.buy_frame, text=f"{player.name}, select a card to buy").pack()
 
-        for idx, card in enumerate(self.all_cards, 1):
+        # The same market offer the console game draws, not the whole catalog
+        for card in player.shop.offer(player.rng):
             tk.Button(self.buy_frame, text=f"Buy {card.name} - {card.attack}/{card.defense}/{card.health}", 
-                      command=lambda idx=idx: self.buy_card(player, idx)).pack()
+                      command=lambda card=card: self.buy_card(player, card)).pack()
 
         tk.Button(self.buy_frame, text="Cancel", command=self.cancel_action(player)).pack()
 
-    def buy_card(self, player, card_idx):
-        # Buy card logic using GUI instead of input
-        selected_card = self.all_cards[card_idx - 1]
-        if player.coins >= 0:  # Assume each card has a `price` attribute
-            player.add_card(selected_card)
-            player.coins -= 5
+    def buy_card(self, player, selected_card):
+        # Buy card logic using GUI instead of input; purchase() pays, records
+        # and reports it like every other front end
+        if player.coins >= CARD_PRICE:
+            player.purchase(selected_card)
             messagebox.showinfo("Purchase", f"{player.name} bought {selected_card.name}!")
         else:
             messagebox.showwarning("Purchase", "Not enough coins!")
@@ -543,7 +170,7 @@ class CardGameGUI:
         self.merge_selection.append(selected_card)
         
         if len(self.merge_selection) == 2:
-            if player.merge_cards(self.merge_selection[0], self.merge_selection[1]):
+            if player.merge(self.merge_selection[0], self.merge_selection[1]):
                 messagebox.showinfo("Merge", "Cards merged successfully!")
             else:
                 messagebox.showwarning("Merge", "Merge unsuccessful.")
@@ -601,6 +228,10 @@ class CardGameGUI:
         else:
             return "The game is a tie!"
 
-root = tk.Tk()
-game_gui = CardGameGUI(root)
-root.mainloop()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Two-player card battle in a window")
+    parser.add_argument("--seed", type=int, help="replay the game dealt from this seed")
+    args = parser.parse_args()
+    root = tk.Tk()
+    game_gui = CardGameGUI(root, args.seed)
+    root.mainloop()
@@ -0,0 +1,56 @@
+import random
+import secrets
+from hashlib import blake2b
+
+
+class SeedTree:
+    """A root seed plus a path of keys; every distinct path is its own stream.
+
+    Children are derived by hashing (seed, path), so handing out streams
+    needs no shared state or coordination: a worker, game or player builds
+    its generator from its own path and never touches another's. Any game
+    out of a batch can be replayed by rebuilding the same path, e.g.
+    SeedTree(seed).child("batch-7", 1234).
+
+    Keys are ints or strings. rng() returns an independent random.Random
+    for this node; call it once per consumer and keep the generator.
+    """
+
+    __slots__ = ("seed", "path")
+
+    def __init__(self, seed=None, path=()):
+        # Without a seed, draw fresh entropy but keep it so the run can be replayed
+        self.seed = secrets.randbits(64) if seed is None else seed
+        self.path = tuple(path)
+
+    def child(self, *keys):
+        return SeedTree(self.seed, self.path + keys)
+
+    def spawn(self, count):
+        """`count` independent children, numbered from 0."""
+        return [self.child(i) for i in range(count)]
+
+    def derive(self):
+        """128-bit integer seed for this node."""
+        digest = blake2b(repr((self.seed, self.path)).encode(), digest_size=16)
+        return int.from_bytes(digest.digest(), "little")
+
+    def rng(self):
+        return random.Random(self.derive())
+
+    def __reduce__(self):
+        return SeedTree, (self.seed, self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, SeedTree) and (self.seed, self.path) == (other.seed, other.path)
+
+    def __hash__(self):
+        return hash((self.seed, self.path))
+
+    def __repr__(self):
+        return f"SeedTree({self.seed!r}, {self.path!r})"
+
+
+def as_seed_tree(seed):
+    """Accept a SeedTree, an int seed or None (fresh entropy)."""
+    return seed if isinstance(seed, SeedTree) else SeedTree(seed)
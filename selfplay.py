@@ -0,0 +1,111 @@
+"""Headless policy-vs-policy games.
+
+Usage: python selfplay.py [games] [policy1] [policy2] [--batch]
+       policies: random, greedy, lookahead (default: 1000 greedy random)
+
+Game i of play_games(..., seed=s) draws everything from SeedTree(s).child(i),
+so replay_game(s, i, ...) reproduces it exactly on its own.
+
+--batch plays all games at once with play_batch (NumPy, random and greedy
+policies only): the same rules and odds, but no per-game replay.
+"""
+import sys
+import time
+from collections import Counter
+
+from catalog import CardCatalog
+import cardgame
+from policies import RandomPolicy, GreedyPolicy, LookaheadPolicy
+from seeds import as_seed_tree
+
+
+POLICIES = {
+    "random": RandomPolicy,
+    "greedy": GreedyPolicy,
+    "lookahead": LookaheadPolicy,
+}
+
+def new_game(catalog, policy1, policy2, seeds):
+    """Set up a Game like main() does, with both players driven by policies.
+
+    `seeds` is the game's SeedTree; the deal, each player's shop, each
+    policy and the battle rolls all get their own stream from it.
+    """
+    player1 = cardgame.Player("Player 1", catalog,
+                              _make_policy(policy1, seeds.child("policy", 1)),
+                              seeds.child("player", 1).rng())
+    player2 = cardgame.Player("Player 2", catalog,
+                              _make_policy(policy2, seeds.child("policy", 2)),
+                              seeds.child("player", 2).rng())
+    deal = seeds.child("deal").rng()
+    for player in (player1, player2):
+        cardgame.deal_starting_cards(player, catalog, deal)
+    return cardgame.Game(player1, player2, rng=seeds.child("battle").rng())
+
+
+def play_games(count, policy1="greedy", policy2="random", seed=None, catalog=None,
+               record_each=False):
+    """Play `count` games and return a Counter of winners (1, 2 or 0 for draws).
+
+    `seed` is an int or a SeedTree. With record_each, return the list of
+    winners in play order instead.
+    """
+    if catalog is None:
+        catalog = CardCatalog(cardgame.load_cards_from_db())
+    seeds = as_seed_tree(seed)
+    winners = []
+    for i in range(count):
+        game = new_game(catalog, policy1, policy2, seeds.child(i))
+        winners.append(game.play())
+    return winners if record_each else Counter(winners)
+
+
+def play_batch(count, policy1="greedy", policy2="random", seed=None, catalog=None):
+    """play_games on vector_engine.batch_selfplay: every game in lockstep arrays.
+
+    Only policies in vector_engine.BATCH_POLICIES are supported. Results
+    agree with play_games in distribution, not game by game.
+    """
+    import vector_engine
+    import numpy as np
+
+    if catalog is None:
+        catalog = CardCatalog(cardgame.load_cards_from_db())
+    rng = np.random.default_rng(as_seed_tree(seed).child("batch").derive())
+    winners, _ = vector_engine.batch_selfplay(catalog, policy1, policy2, count, rng,
+                                              weights=catalog.weights)
+    return Counter(winners.tolist())
+
+
+def replay_game(seed, index, policy1="greedy", policy2="random", catalog=None):
+    """Rebuild and replay game `index` of a play_games run; returns the finished Game."""
+    if catalog is None:
+        catalog = CardCatalog(cardgame.load_cards_from_db())
+    game = new_game(catalog, policy1, policy2, as_seed_tree(seed).child(index))
+    game.play()
+    return game
+
+
+def _make_policy(policy, seeds):
+    if isinstance(policy, str):
+        policy = POLICIES[policy]
+    if policy is RandomPolicy:
+        return RandomPolicy(seeds.rng())
+    return policy()
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--batch"]
+    play = play_batch if "--batch" in sys.argv[1:] else play_games
+    count = int(args[0]) if len(args) > 0 else 1000
+    policy1 = args[1] if len(args) > 1 else "greedy"
+    policy2 = args[2] if len(args) > 2 else "random"
+    started = time.perf_counter()
+    results = play(count, policy1, policy2, seed=0)
+    elapsed = time.perf_counter() - started
+    print(f"{policy1} vs {policy2}: {results[1]} / {results[2]} wins, {results[0]} draws")
+    print(f"{count} games in {elapsed:.2f}s ({count / elapsed:,.0f} games/s)")
+
+
+if __name__ == "__main__":
+    main()
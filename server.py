@@ -0,0 +1,351 @@
+"""Asyncio game server: many concurrent two-player matches in one process.
+
+Usage: python server.py [--host 127.0.0.1] [--port 8765] [--turn-seconds 60]
+                        [--store players.db]
+
+Protocol: one JSON object per line in each direction. A client sends
+{"op": "join", "name": ...}, is dealt a starting deck and waits in the
+matchmaking queue for an opponent of similar deck power. During its turn a
+player sends any number of actions:
+
+    {"op": "view"}                        -> {"type": "deck", "cards": [...]}
+    {"op": "market"}                      -> {"type": "offer", "cards": [...]}
+    {"op": "buy", "card": i}              -> buys offer[i] from the last market
+    {"op": "merge", "cards": [i, j]}      -> merges deck cards i and j
+    {"op": "battle", "card": i}           -> picks deck card i and ends the turn
+
+Every request may carry an "id", which is echoed in its reply. The server
+announces {"type": "turn", ...} to whoever is on turn, then {"type":
+"battle", ...} after each round and {"type": "game_over", ...} at the end.
+
+Turns end when the player picks a battle card or when an event-loop timer
+fires after --turn-seconds, whichever comes first. A player who times out
+without a pick fights with their strongest card.
+
+With --store, players keep their coins and surviving cards between games
+and server runs: profiles are saved to SQLite after every battle, and a
+player whose deck is empty is dealt a new starting hand. Names then
+identify profiles, so a name can only be in one queue or match at a time.
+"""
+import argparse
+import asyncio
+import json
+
+import cardgame
+from cardgame import Game, Player, deal_starting_cards, report_db_errors
+from catalog import CardCatalog
+from matchmaking import Matchmaker
+from player_store import PlayerStore
+from policies import CARD_PRICE, GreedyPolicy
+from seeds import SeedTree
+
+
+MAX_ROUNDS = 200
+POLL_SECONDS = 1.0  # How often the queue widens its windows for long waiters
+
+
+def card_dict(card):
+    return {"name": card.name, "class": type(card).__name__, "level": card.level,
+            "attack": card.attack, "defense": card.defense, "health": card.health}
+
+
+class Session:
+    """One client connection; it belongs to at most one match at a time."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.name = None
+        self.player = None
+        self.match = None
+        self.seat = None
+
+    def send(self, message):
+        # Writes are buffered by the transport; no per-message drain
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+
+class Match:
+    """One Game between two sessions, driven by their messages."""
+
+    _fallback = GreedyPolicy()
+
+    def __init__(self, session1, session2, seeds, turn_seconds, max_rounds=MAX_ROUNDS,
+                 store=None):
+        self.sessions = (session1, session2)
+        self.turn_seconds = turn_seconds
+        self.max_rounds = max_rounds
+        self.store = store
+        for seat, session in enumerate(self.sessions):
+            session.match, session.seat = self, seat
+        players = [session.player for session in self.sessions]
+        self.game = Game(*players, rng=seeds.child("battle").rng())
+        self.players = players
+        self.round = 0
+        self.on_turn = None        # Seat whose turn it is
+        self.offers = [None, None]  # Last market offer per seat
+        self.picks = [None, None]   # Battle card per seat
+        self._turn_over = None
+        self.finished = False
+
+    async def run(self):
+        for seat, session in enumerate(self.sessions):
+            session.send({"type": "matched", "seat": seat + 1,
+                          "opponent": self.sessions[1 - seat].name,
+                          "opponent_power": self.players[1 - seat].cards.power,
+                          "deck": [card_dict(card) for card in self.players[seat].cards]})
+        player1, player2 = self.players
+        while (player1.cards and player2.cards and self.round < self.max_rounds
+               and not self.finished):
+            self.round += 1
+            for seat in (0, 1):
+                await self._turn(seat)
+                if self.finished:
+                    return
+            card1, card2 = (self.picks[seat] or self._fallback.choose_battle_card(player, None)
+                            for seat, player in enumerate(self.players))
+            winner = self.game.battle(card1, card2)
+            self.game.pay_out(winner)
+            self._save()
+            self.picks = [None, None]
+            for seat, session in enumerate(self.sessions):
+                session.send({"type": "battle", "round": self.round, "winner": winner,
+                              "cards": [card_dict(card1), card_dict(card2)],
+                              "coins": self.players[seat].coins})
+        if not self.finished:
+            self._finish(self.game.game_winner())
+
+    async def _turn(self, seat):
+        loop = asyncio.get_running_loop()
+        self.on_turn = seat
+        self._turn_over = loop.create_future()
+        # The deadline is a loop timer, not a clock check between actions
+        timer = loop.call_later(self.turn_seconds, self._end_turn)
+        self.sessions[seat].send({"type": "turn", "round": self.round,
+                                  "coins": self.players[seat].coins,
+                                  "seconds": self.turn_seconds})
+        try:
+            await self._turn_over
+        finally:
+            timer.cancel()
+            self.on_turn = None
+            self.offers[seat] = None
+
+    def _end_turn(self):
+        if self._turn_over is not None and not self._turn_over.done():
+            self._turn_over.set_result(None)
+
+    def _save(self):
+        if self.store is not None:
+            for player in self.players:
+                self.store.save(player)
+
+    def _finish(self, winner):
+        self.finished = True
+        self._save()
+        for session in self.sessions:
+            session.send({"type": "game_over", "winner": winner})
+            session.match = None
+        self._end_turn()
+
+    def leave(self, seat):
+        """A player disconnected; the other one wins."""
+        if not self.finished:
+            self._finish(2 - seat)
+
+    def handle(self, seat, message):
+        """Apply one action from `seat`; returns the reply."""
+        op = message.get("op")
+        player = self.players[seat]
+        if op == "view":
+            return {"type": "deck", "coins": player.coins,
+                    "cards": [card_dict(card) for card in player.cards]}
+        if seat != self.on_turn:
+            return {"type": "error", "reason": "not your turn"}
+        if op == "market":
+            self.offers[seat] = offer = player.shop.offer(player.rng)
+            return {"type": "offer", "cards": [card_dict(card) for card in offer]}
+        if op == "buy":
+            offer = self.offers[seat]
+            index = message.get("card")
+            if offer is None or not isinstance(index, int) or not 0 <= index < len(offer):
+                return {"type": "error", "reason": "no such offer"}
+            if player.coins < CARD_PRICE:
+                return {"type": "error", "reason": "not enough coins"}
+            player.purchase(offer[index])
+            self.offers[seat] = None
+            return {"type": "ok", "coins": player.coins}
+        if op == "merge":
+            pair = message.get("cards")
+            if (not isinstance(pair, list) or len(pair) != 2 or
+                    not all(isinstance(i, int) for i in pair) or
+                    not player.merge_pair(*pair)):
+                return {"type": "error", "reason": "cannot merge those cards"}
+            return {"type": "ok", "cards": len(player.cards)}
+        if op == "battle":
+            index = message.get("card")
+            if not isinstance(index, int) or not 0 <= index < len(player.cards):
+                return {"type": "error", "reason": "no such card"}
+            self.picks[seat] = player.cards[index]
+            self._end_turn()
+            return {"type": "ok"}
+        return {"type": "error", "reason": f"unknown op {op!r}"}
+
+
+class GameServer:
+    def __init__(self, catalog, turn_seconds=60, seed=None, max_rounds=MAX_ROUNDS,
+                 matchmaker=None, store=None):
+        self.catalog = catalog
+        self.turn_seconds = turn_seconds
+        self.max_rounds = max_rounds
+        self.seeds = SeedTree(seed)
+        self.queue = matchmaker if matchmaker is not None else Matchmaker()
+        self.store = store
+        self.by_name = {}  # name -> the session last joined under it
+        self.joins = 0
+        self.matches_started = 0
+        self.tasks = set()
+
+    def deal(self, name):
+        """The player called `name`, stored or new, from this join's seed stream.
+
+        Players without cards are dealt a starting deck.
+        """
+        seeds = self.seeds.child("join", self.joins)
+        self.joins += 1
+        rng = seeds.child("player").rng()
+        if self.store is None:
+            player = Player(name, self.catalog, rng=rng)
+        else:
+            player = self.store.load(name)
+            player.rng = rng
+        if not player.cards:
+            deal_starting_cards(player, self.catalog, seeds.child("deal").rng())
+        return player
+
+    def join(self, session):
+        session.player = self.deal(session.name)
+        pair = self.queue.enqueue(session, session.player.cards.power)
+        if pair is None:
+            session.send({"type": "waiting", "power": session.player.cards.power})
+        else:
+            self.start_match(*pair)
+
+    def poll(self):
+        for pair in self.queue.poll():
+            self.start_match(*pair)
+        if self.store is not None:
+            self.store.flush_due()
+
+    async def poll_forever(self):
+        seconds = POLL_SECONDS
+        if self.store is not None:
+            seconds = min(seconds, self.store.flush_seconds)
+        while True:
+            await asyncio.sleep(seconds)
+            self.poll()
+
+    def start_match(self, session1, session2):
+        match = Match(session1, session2, self.seeds.child("match", self.matches_started),
+                      self.turn_seconds, self.max_rounds, self.store)
+        self.matches_started += 1
+        task = asyncio.create_task(match.run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def leave(self, session):
+        self.queue.dequeue(session)
+        if self.by_name.get(session.name) is session:
+            del self.by_name[session.name]
+        if session.match is not None:
+            session.match.leave(session.seat)
+
+    def handle(self, session, message):
+        if message.get("op") == "join":
+            if session.match is not None or session in self.queue:
+                return {"type": "error", "reason": "already joined"}
+            name = str(message.get("name") or "Player")
+            other = self.by_name.get(name)
+            if (self.store is not None and other is not None and other is not session and
+                    (other.match is not None or other in self.queue)):
+                return {"type": "error", "reason": "name in use"}
+            if self.by_name.get(session.name) is session:
+                del self.by_name[session.name]
+            session.name = name
+            self.by_name[name] = session
+            self.join(session)
+            return None
+        if session.match is None:
+            return {"type": "error", "reason": "not in a match"}
+        return session.match.handle(session.seat, message)
+
+    async def handle_connection(self, reader, writer):
+        session = Session(reader, writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream limit; the rest of it cannot be framed
+                    session.send({"type": "error", "reason": "line too long"})
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    session.send({"type": "error", "reason": "bad json"})
+                    continue
+                if not isinstance(message, dict):
+                    session.send({"type": "error", "reason": "expected an object"})
+                    continue
+                reply = self.handle(session, message)
+                if reply is not None:
+                    if "id" in message:
+                        reply["id"] = message["id"]
+                    session.send(reply)
+                if writer.transport.get_write_buffer_size() > 1 << 16:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.leave(session)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port,
+                                            backlog=4096, limit=1 << 16)
+        poller = asyncio.create_task(self.poll_forever())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            poller.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Card game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--turn-seconds", type=float, default=60)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--store", metavar="DB", help="keep player profiles in this SQLite file")
+    args = parser.parse_args()
+
+    errors = []
+    catalog = CardCatalog(cardgame.load_cards_from_db(errors=errors))
+    report_db_errors(errors)
+    store = PlayerStore(args.store, catalog) if args.store else None
+    server = GameServer(catalog, args.turn_seconds, args.seed, store=store)
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
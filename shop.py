@@ -0,0 +1,157 @@
+import random
+from bisect import bisect_right
+from itertools import accumulate
+from weakref import WeakKeyDictionary
+
+
+OFFER_SIZE = 5
+MAX_COPIES = 2  # Times one card name may appear in a single offer
+
+
+class ShopSampler:
+    """Draws market offers with bounded copies per card name, without rejection.
+
+    Each draw picks a name with probability proportional to its weight among
+    the names that are not yet at max_copies in the offer, then a card of
+    that name. That is the distribution the old redraw-until-accepted loop
+    produced, but every draw costs O(log names) on a Fenwick tree of name
+    weights plus O(1) per name already capped. Nothing is rejected, so an
+    offer is O(offer_size log names) however small or skewed the catalog.
+
+    When the catalog cannot fill an offer (fewer than
+    offer_size / max_copies names with weight) the offer is simply shorter.
+    Card weights default to the catalog's rarity weights (CardCatalog
+    weights=...); the sampler never mutates shared state, so one instance
+    can serve any number of players.
+    """
+
+    def __init__(self, cards, weights=None, offer_size=OFFER_SIZE,
+                 max_copies=MAX_COPIES):
+        if weights is None:
+            weights = getattr(cards, "weights", None)
+        cards = list(cards)
+        weights = [1.0] * len(cards) if weights is None else list(weights)
+        if len(weights) != len(cards):
+            raise ValueError("weights must have one entry per card")
+        if any(w < 0 for w in weights):
+            raise ValueError("weights must not be negative")
+        self.offer_size = offer_size
+        self.max_copies = max_copies
+
+        # Group cards by name; each name keeps its cards and their running weight
+        groups = {}
+        for card, weight in zip(cards, weights):
+            if weight > 0:
+                groups.setdefault(card.name, ([], []))
+                groups[card.name][0].append(card)
+                groups[card.name][1].append(weight)
+        self._cards = [cards_ for cards_, _ in groups.values()]
+        self._cumulative = [list(accumulate(ws)) for _, ws in groups.values()]
+        self._weights = [cumulative[-1] for cumulative in self._cumulative]
+        self.total = sum(self._weights)
+        self._uniform = len(set(self._weights)) <= 1
+        self._build_tree()
+
+    def _build_tree(self):
+        n = len(self._weights)
+        tree = [0.0] * (n + 1)
+        for i, weight in enumerate(self._weights, 1):
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top = 1 << n.bit_length() if n else 0
+
+    def _find(self, target):
+        # Smallest name index whose prefix weight exceeds target
+        tree, n = self._tree, len(self._weights)
+        pos, step = 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+    def _draw_name(self, capped, rng):
+        """Index of a name not in `capped` (sorted), weighted, in one pass."""
+        if self._uniform:
+            # Equal weights: pick a rank among the open names and skip the capped ones
+            index = int(rng.random() * (len(self._weights) - len(capped)))
+            for closed in capped:
+                if closed <= index:
+                    index += 1
+            return index
+        closed_weight = sum(self._weights[i] for i in capped)
+        target = rng.random() * (self.total - closed_weight)
+        index = self._find(target)
+        # Step over the capped names' mass in index order
+        for closed in capped:
+            if closed > index:
+                break
+            target += self._weights[closed]
+            index = self._find(target)
+        while index in capped:  # Only reachable through float rounding at the top end
+            index -= 1
+        return index
+
+    def _draw_card(self, name_index, rng):
+        cards = self._cards[name_index]
+        if len(cards) == 1:
+            return cards[0]
+        cumulative = self._cumulative[name_index]
+        i = bisect_right(cumulative, rng.random() * cumulative[-1])
+        return cards[min(i, len(cards) - 1)]
+
+    def offer(self, rng=random):
+        """One market offer: up to offer_size cards, each name at most max_copies times."""
+        names = len(self._weights)
+        size = min(self.offer_size, names * self.max_copies)
+        cards = self._cards
+        uniform = self._uniform
+        offer = []
+        copies = {}
+        capped = []
+        for _ in range(size):
+            # Inlined _draw_name and _draw_card for the common case: equal
+            # weights, nothing capped yet, one card per name
+            if uniform and not capped:
+                index = int(rng.random() * names)
+            else:
+                index = self._draw_name(capped, rng)
+            named = cards[index]
+            offer.append(named[0] if len(named) == 1 else self._draw_card(index, rng))
+            count = copies[index] = copies.get(index, 0) + 1
+            if count == self.max_copies:
+                capped.append(index)
+                capped.sort()
+        return offer
+
+    def offers(self, count, rng=random):
+        """Pre-generate `count` offers, e.g. one per waiting player."""
+        return [self.offer(rng) for _ in range(count)]
+
+
+_samplers = WeakKeyDictionary()
+_last_list = (None, None)  # The last plain-list catalog and its sampler
+
+
+def sampler_for(catalog):
+    """Shared ShopSampler for a catalog, built on first use.
+
+    A plain list cannot be weak-referenced, so only the last one seen keeps
+    its sampler; that covers a run's games, which all deal from one list.
+    Like a CardCatalog, a list is assumed not to change once in use.
+    """
+    global _last_list
+    try:
+        sampler = _samplers.get(catalog)
+    except TypeError:
+        if _last_list[0] is not catalog:
+            _last_list = (catalog, ShopSampler(catalog))
+        return _last_list[1]
+    if sampler is None:
+        sampler = _samplers[catalog] = ShopSampler(catalog)
+    return sampler
@@ -0,0 +1,179 @@
+import random
+from collections import Counter
+
+
+# Ability kinds, keyed by card class name so cards loaded by either front end
+# (or plain stat tuples) can be simulated without importing the game scripts.
+WARRIOR = 0
+ARCHER = 1
+GUARDIAN = 2
+ASSASSIN = 3
+
+KIND_CODES = {
+    "Warrior": WARRIOR,
+    "Archer": ARCHER,
+    "Guardian": GUARDIAN,
+    "Assassin": ASSASSIN,
+}
+
+
+def card_kind(card):
+    """Return the ability kind code for a card object."""
+    for cls in type(card).__mro__:
+        if cls.__name__ in KIND_CODES:
+            return KIND_CODES[cls.__name__]
+    raise ValueError(f"Unknown card class: {type(card).__name__}")
+
+
+def duel_stats(card):
+    """Snapshot the values a duel needs: (kind, attack, defense, health)."""
+    return (card_kind(card), card.attack, card.defense, card.health)
+
+
+def _attack_profile(stats, defender_defense):
+    """Reduce an attacker to (base, slope, crit_chance, crit_bonus).
+
+    Damage dealt after the defender's reduction is
+    base - slope * own_health, plus crit_bonus with probability crit_chance.
+    The Warrior's health-scaled formula is linear in its own health, so every
+    class fits this shape. It suits closed forms only: it rounds differently
+    from Game.battle, so an exact kill there can miss here (see _hits).
+    """
+    kind, attack, defense, health = stats
+    scale = 1 - defender_defense
+    if kind == WARRIOR:
+        return attack * 1.5 * scale, attack * 0.5 / 90 * scale, 0.0, 0.0
+    if kind == ARCHER:
+        return attack * scale, 0.0, 0.3, attack * scale
+    if kind == GUARDIAN:
+        return defense * 10 * scale, 0.0, 0.0, 0.0
+    return attack * scale, 0.0, 0.2, attack * 2 * scale
+
+
+def _hits(stats, defender_defense):
+    """(damage for own health, crit chance, crit damage) as Game.battle computes them.
+
+    The expressions are the game's own, special_ability times (1 - defense),
+    so a hit that kills exactly in play kills exactly here too; the linear
+    _attack_profile form can round the other way.
+    """
+    kind, attack, defense, _ = stats
+    if kind == WARRIOR:
+        return (lambda own: attack * (1 + (1 - own / 90) * 0.5) * (1 - defender_defense),
+                0.0, 0.0)
+    if kind == GUARDIAN:
+        damage = defense * 10 * (1 - defender_defense)
+        return (lambda own: damage), 0.0, 0.0
+    damage = attack * (1 - defender_defense)
+    if kind == ARCHER:
+        return (lambda own: damage), 0.3, attack * 2 * (1 - defender_defense)
+    return (lambda own: damage), 0.2, attack * 3 * (1 - defender_defense)
+
+
+def is_deterministic(stats1, stats2):
+    """True when neither card can roll a critical hit."""
+    return stats1[0] in (WARRIOR, GUARDIAN) and stats2[0] in (WARRIOR, GUARDIAN)
+
+
+def run_duel(stats1, stats2, rand, max_turns=10000):
+    """Resolve one silent duel with the same rules as Game.battle.
+
+    Returns (winner, turns, health1, health2) where winner is 1, 2 or 0 and
+    turns counts individual attacks. The input stats are never mutated.
+    """
+    h1 = stats1[3]
+    h2 = stats2[3]
+    if h1 <= 0 or h2 <= 0:
+        return 0, 0, h1, h2
+
+    hit1, p1, crit1 = _hits(stats1, stats2[2])
+    hit2, p2, crit2 = _hits(stats2, stats1[2])
+    turns = 0
+    while turns < max_turns:
+        # Card 1's turn
+        h2 -= crit1 if p1 and rand() < p1 else hit1(h1)
+        turns += 1
+        if h2 <= 0:
+            return 1, turns, h1, h2
+
+        # Card 2's turn
+        h1 -= crit2 if p2 and rand() < p2 else hit2(h2)
+        turns += 1
+        if h1 <= 0:
+            return 2, turns, h1, h2
+
+    return 0, turns, h1, h2
+
+
+class MatchupResult:
+    """Aggregated outcome of many duels between the same two cards."""
+
+    def __init__(self, duels):
+        self.duels = duels
+        self.wins = Counter()
+        self.total_turns = 0
+        # Remaining health of the winning card, per side
+        self.remaining = {1: [], 2: []}
+
+    def record(self, winner, turns, health1, health2, count=1):
+        self.wins[winner] += count
+        self.total_turns += turns * count
+        if winner == 1:
+            self.remaining[1].extend([health1] * count)
+        elif winner == 2:
+            self.remaining[2].extend([health2] * count)
+
+    def win_rate(self, side):
+        return self.wins[side] / self.duels if self.duels else 0.0
+
+    @property
+    def draw_rate(self):
+        return self.win_rate(0)
+
+    @property
+    def avg_turns(self):
+        return self.total_turns / self.duels if self.duels else 0.0
+
+    def health_histogram(self, side, bin_width=10):
+        """Bucket the winner's remaining health into bins of bin_width."""
+        histogram = Counter(int(h // bin_width) * bin_width for h in self.remaining[side])
+        return dict(sorted(histogram.items()))
+
+    def health_quantiles(self, side, quantiles=(0.1, 0.5, 0.9)):
+        values = sorted(self.remaining[side])
+        if not values:
+            return {q: None for q in quantiles}
+        last = len(values) - 1
+        return {q: values[round(q * last)] for q in quantiles}
+
+    def summary(self):
+        return {
+            "duels": self.duels,
+            "win_rate_1": self.win_rate(1),
+            "win_rate_2": self.win_rate(2),
+            "draw_rate": self.draw_rate,
+            "avg_turns": self.avg_turns,
+            "health_quantiles_1": self.health_quantiles(1),
+            "health_quantiles_2": self.health_quantiles(2),
+        }
+
+
+def simulate_matchup(card1, card2, duels, seed=None, max_turns=10000):
+    """Run `duels` silent duels of card1 (attacking first) against card2.
+
+    Cards may be Card objects or (kind, attack, defense, health) tuples. Each
+    call uses its own random.Random(seed), so results are reproducible and
+    never touch the global random module.
+    """
+    stats1 = card1 if isinstance(card1, tuple) else duel_stats(card1)
+    stats2 = card2 if isinstance(card2, tuple) else duel_stats(card2)
+    rand = random.Random(seed).random
+    result = MatchupResult(duels)
+    if is_deterministic(stats1, stats2):
+        # Every duel plays out identically, so resolve it once
+        result.record(*run_duel(stats1, stats2, rand, max_turns), count=duels)
+        return result
+    record = result.record
+    for _ in range(duels):
+        record(*run_duel(stats1, stats2, rand, max_turns))
+    return result
@@ -0,0 +1,204 @@
+"""Snapshot, restore and fork the full state of a Game.
+
+    data = snapshot(game)                          # compact bytes
+    game = restore(data, catalog, (policy1, policy2))
+    child = fork(game)                             # in-memory copy, no encoding
+    child = fork(game, rng=random.Random(7))       # ... rolling its own dice
+
+The state is the round number and, for each player, the name, coins and
+deck (catalog card, level, attack, defense, health per card), plus the
+random states of the game and both players. A restored or forked game plays
+on exactly as the original would. Policies, event sinks and recorders are
+not game state: restore() takes the policies to use, and fork() gets them
+from Policy.fork unless given others. Stateless policies are shared and
+RandomPolicy rolls the fork's dice; MCTSPolicy, which tracks the game it
+plays, has to be replaced through `policies`.
+
+Copying a Mersenne Twister state (2.5 KB) costs far more than a deck, so
+lookahead search should fork with `rng`: every random stream of the fork
+then draws from that one generator instead of copying the originals.
+
+Layout (little-endian): header (magic, schema version, round, catalog size
+and CRC, generator count); per player the name, coins, card count and
+fixed-width card records; the generator states; then which generator the
+game and each player draw from (MODULE_RNG for the shared `random` module,
+which is not captured).
+"""
+import random
+import struct
+from weakref import WeakKeyDictionary
+
+from cardgame import Game, Player
+from replay import catalog_checksum
+
+
+MAGIC = b"CGSNAPSH"
+VERSION = 1
+MODULE_RNG = 0xFF
+
+HEADER = struct.Struct("<8sHIIIB")
+PLAYER = struct.Struct("<HqH")      # name length, coins, card count
+CARD = struct.Struct("<IHddd")      # catalog index, level, attack, defense, health
+RNG_STATE = struct.Struct("<B625IBd")  # version, MT words + position, has gauss, gauss
+RNG_SLOTS = struct.Struct("<BBB")   # game, player 1, player 2
+
+
+_catalog_info = WeakKeyDictionary()
+_last_list = (None, None)  # The last plain-list catalog and its info
+
+
+def _build_info(catalog):
+    return {id(card): i for i, card in enumerate(catalog)}, catalog_checksum(catalog)
+
+
+def catalog_info(catalog):
+    """(card id -> catalog index, CRC) for a catalog, cached while it lives.
+
+    Plain lists cannot be weak-referenced, so only the last one keeps its
+    info (see shop.sampler_for).
+    """
+    global _last_list
+    try:
+        info = _catalog_info.get(catalog)
+    except TypeError:
+        if _last_list[0] is not catalog:
+            _last_list = (catalog, _build_info(catalog))
+        return _last_list[1]
+    if info is None:
+        info = _catalog_info[catalog] = _build_info(catalog)
+    return info
+
+
+def _rng_slots(game):
+    """Distinct generators of the game and players, and each one's slot."""
+    rngs, slots = [], []
+    for rng in (game.rng, game.player1.rng, game.player2.rng):
+        if rng is random:
+            slots.append(MODULE_RNG)
+            continue
+        for i, seen in enumerate(rngs):
+            if seen is rng:
+                slots.append(i)
+                break
+        else:
+            slots.append(len(rngs))
+            rngs.append(rng)
+    return rngs, slots
+
+
+def snapshot(game):
+    """Encode the game's state as bytes; see restore()."""
+    catalog = game.player1.available_cards
+    index, checksum = catalog_info(catalog)
+    rngs, slots = _rng_slots(game)
+    out = [HEADER.pack(MAGIC, VERSION, game.round, len(catalog), checksum, len(rngs))]
+    for player in (game.player1, game.player2):
+        name = player.name.encode("utf-8")
+        out.append(PLAYER.pack(len(name), player.coins, len(player.cards)))
+        out.append(name)
+        try:
+            out += [CARD.pack(index[id(card.template)], card.level, card.attack,
+                              card.defense, card.health) for card in player.cards]
+        except KeyError:
+            raise ValueError(f"{player.name} holds a card that is not in the catalog") from None
+    for rng in rngs:
+        version, words, gauss = rng.getstate()
+        out.append(RNG_STATE.pack(version, *words, gauss is not None, gauss or 0.0))
+    out.append(RNG_SLOTS.pack(*slots))
+    return b"".join(out)
+
+
+def restore(data, catalog, policies=(None, None)):
+    """Rebuild a Game from snapshot() bytes, with cards from `catalog`."""
+    magic, version, round_number, size, checksum, rng_count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a game snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    if size != len(catalog) or checksum != catalog_info(catalog)[1]:
+        raise ValueError("snapshot was taken with a different catalog")
+    pos = HEADER.size
+    players = []
+    for policy in policies:
+        name_length, coins, count = PLAYER.unpack_from(data, pos)
+        pos += PLAYER.size
+        player = Player(data[pos:pos + name_length].decode("utf-8"), catalog, policy)
+        pos += name_length
+        player.coins = coins
+        end = pos + count * CARD.size
+        add = player.cards.add
+        for template, level, attack, defense, health in CARD.iter_unpack(data[pos:end]):
+            card = catalog[template].instantiate()
+            card.level, card.attack, card.defense, card.health = level, attack, defense, health
+            add(card)
+        pos = end
+        players.append(player)
+    rngs = []
+    for _ in range(rng_count):
+        state = RNG_STATE.unpack_from(data, pos)
+        pos += RNG_STATE.size
+        rng = random.Random.__new__(random.Random)
+        rng.setstate((state[0], state[1:626], state[627] if state[626] else None))
+        rngs.append(rng)
+    game_slot, *player_slots = RNG_SLOTS.unpack_from(data, pos)
+    for player, slot in zip(players, player_slots):
+        player.rng = random if slot == MODULE_RNG else rngs[slot]
+    game = Game(*players, rng=random if game_slot == MODULE_RNG else rngs[game_slot])
+    game.round = round_number
+    return game
+
+
+def _copy_rng(rng, copies):
+    if rng is random:
+        return rng
+    clone = copies.get(id(rng))
+    if clone is None:
+        clone = copies[id(rng)] = random.Random.__new__(type(rng))
+        clone.setstate(rng.getstate())
+    return clone
+
+
+def _copy(instance):
+    # Copies every attribute, so new Player and Game fields fork too
+    clone = object.__new__(type(instance))
+    clone.__dict__.update(instance.__dict__)
+    return clone
+
+
+def fork(game, rng=None, policies=None):
+    """An independent copy of `game` to play on without touching the original.
+
+    Only per-game state is copied: decks, coins and random generators. With
+    `rng`, the game, both players and their policies draw from it instead
+    of copies of their own generators, which is much cheaper. Policies come
+    from Policy.fork unless `policies` is given; a generator shared between
+    the game, a player and a policy maps to one copy, and the catalog is
+    shared.
+    """
+    if rng is None:
+        copies = {}
+
+        def fork_rng(original):
+            return _copy_rng(original, copies)
+    else:
+        def fork_rng(original):
+            return rng
+
+    players = []
+    for player in (game.player1, game.player2):
+        clone = _copy(player)
+        clone.cards = player.cards.copy()
+        clone.merges = clone.cards.merges
+        clone.rng = fork_rng(player.rng)
+        clone.recorder = None
+        players.append(clone)
+    clone = _copy(game)
+    clone.player1, clone.player2 = players
+    clone.rng = fork_rng(game.rng)
+    clone.recorder = None
+    for i, player in enumerate(players):
+        if policies is not None:
+            player.policy = policies[i]
+        elif player.policy is not None:
+            player.policy = player.policy.fork(fork_rng)
+    return clone
@@ -0,0 +1,315 @@
+"""Duel outcomes solved by DP, checked against the Monte Carlo simulator.
+
+Usage: python solver.py [--duels 20000] [--levels 4]
+
+The command solves every stochastic pairing of catalog cards at levels 1 to
+--levels and fails if any win rate is further from simulate_matchup than
+sampling noise allows.
+"""
+import math
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+from simulator import (WARRIOR, card_kind, duel_stats, is_deterministic,
+                       simulate_matchup, _attack_profile, _hits)
+
+
+# Solved duel outcome. winner and turns are only set for deterministic pairs;
+# expected_turns counts individual attacks, as in simulator.run_duel.
+# truncated is the probability that a fight outlasted DP_MAX_TURNS attacks,
+# which counts as neither a win nor a draw.
+Outcome = namedtuple("Outcome", "win1 win2 draw expected_turns winner turns truncated")
+
+CACHE_SIZE = 65536
+MAX_TURNS = 10000
+# The DP recurses once per attack; longer fights are reported as truncated
+DP_MAX_TURNS = 400
+# DP states whose health differs by less than this are merged
+HEALTH_QUANTUM = 1e-9
+# Exact healths kept apart per quantum near an exact kill, and the memo size
+# after which no new ones are; further ones share the nearest one's memo
+# entry, which bounds the DP when tiny inexact hits meet large healths
+MAX_EXACT_HEALTHS = 16
+MAX_EXACT_STATES = 100000
+
+
+def card_key(card):
+    """Memo key for a card: (class, attack, defense, health, level)."""
+    return (card_kind(card), card.attack, card.defense, card.health, card.level)
+
+
+def solve(card1, card2):
+    """Outcome of Game.battle(card1, card2); card1 attacks first.
+
+    Crit-free pairs are exact. Pairs with crits are exact unless a cap is
+    hit: lines longer than DP_MAX_TURNS attacks count as `truncated`, and
+    once MAX_EXACT_HEALTHS or MAX_EXACT_STATES is reached, near-exact-kill
+    healths share their nearest neighbour's value, so results are then
+    approximate. Results are memoized on both cards' (class, attack,
+    defense, health, level) in an LRU cache of CACHE_SIZE entries.
+    """
+    return _solve(card_key(card1), card_key(card2))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _solve(key1, key2):
+    stats1 = key1[:4]
+    stats2 = key2[:4]
+    if stats1[3] <= 0 or stats2[3] <= 0:
+        return Outcome(0.0, 0.0, 1.0, 0, 0, 0, 0.0)
+    if is_deterministic(stats1, stats2):
+        winner, turns = _deterministic(stats1, stats2)
+        return Outcome(float(winner == 1), float(winner == 2), float(winner == 0),
+                       turns, winner, turns, 0.0)
+    return _stochastic(stats1, stats2)
+
+
+class _OnBoundary(Exception):
+    """A kill lands exactly on zero health, where float rounding decides."""
+
+
+def _on_boundary(dealt, health):
+    """Whether `dealt` damage in total kills `health` exactly, up to rounding."""
+    return abs(dealt - health) <= 1e-9 * max(1.0, health)
+
+
+def _kill_time(first_damage, step, health):
+    """Smallest k with k * first_damage + step * k * (k - 1) / 2 >= health.
+
+    This is the attack on which a target falls when the attacker's damage
+    grows by `step` per attack. Returns None if it never falls.
+    """
+    if step == 0:
+        if first_damage <= 0:
+            return None
+        k = max(1, math.ceil(health / first_damage))
+    else:
+        # Positive root of step/2 k^2 + (first_damage - step/2) k - health = 0
+        a = step / 2
+        b = first_damage - a
+        disc = b * b + 4 * a * health
+        if disc < 0:
+            return None
+        k = max(1, math.ceil((-b + math.sqrt(disc)) / (2 * a)))
+
+    def dealt(n):
+        return n * first_damage + step * n * (n - 1) / 2
+
+    # Correct float rounding in the root against the exact partial sums
+    while k > 1 and dealt(k - 1) >= health:
+        k -= 1
+    while dealt(k) < health:
+        k += 1
+        if k > MAX_TURNS:
+            return None
+    # Game.battle subtracts hit by hit, so an exact kill may leave a tiny
+    # positive remainder there, or a near miss none; the kill then lands a
+    # hit later or earlier than the closed form says, and only stepping
+    # reproduces that
+    if _on_boundary(dealt(k), health) or (k > 1 and _on_boundary(dealt(k - 1), health)):
+        raise _OnBoundary
+    return k
+
+
+def _step(stats1, stats2):
+    """Winner and attack count of a crit-free pair, hit by hit as Game.battle."""
+    hit1 = _hits(stats1, stats2[2])[0]
+    hit2 = _hits(stats2, stats1[2])[0]
+    h1, h2 = stats1[3], stats2[3]
+    for turn in range(1, MAX_TURNS + 1, 2):
+        h2 -= hit1(h1)
+        if h2 <= 0:
+            return 1, turn
+        h1 -= hit2(h2)
+        if h1 <= 0:
+            return 2, turn + 1
+    return 0, MAX_TURNS
+
+
+def _deterministic(stats1, stats2):
+    """Winner and attack count for a pair with no crit-capable class.
+
+    Guardian damage is constant, so a Warrior facing a Guardian loses a fixed
+    amount of health per hit and its own damage grows arithmetically; both
+    kill times then have a closed form. Warrior mirrors couple the two
+    health values, and exact kills hang on float rounding, so both are
+    stepped with the game's own arithmetic.
+    """
+    if stats1[0] == WARRIOR and stats2[0] == WARRIOR:
+        return _step(stats1, stats2)
+
+    b1, s1, _, _ = _attack_profile(stats1, stats2[2])
+    b2, s2, _, _ = _attack_profile(stats2, stats1[2])
+    h1, h2 = stats1[3], stats2[3]
+    # Only a Warrior has a slope, and its opponent here is a Guardian whose
+    # hits are the constant b; card 1 is hit before its k-th attack k-1
+    # times, card 2 k times.
+    try:
+        k1 = _kill_time(b1 - s1 * h1, s1 * b2, h2)
+        k2 = _kill_time(b2 - s2 * (h2 - b1), s2 * b1, h1)
+    except _OnBoundary:
+        return _step(stats1, stats2)
+    # Kills after MAX_TURNS attacks never happen in _step or the simulator
+    if k1 is not None and 2 * k1 - 1 > MAX_TURNS:
+        k1 = None
+    if k2 is not None and 2 * k2 > MAX_TURNS:
+        k2 = None
+    if k1 is None and k2 is None:
+        return 0, MAX_TURNS
+    if k2 is None or (k1 is not None and k1 <= k2):
+        return 1, 2 * k1 - 1
+    return 2, 2 * k2
+
+
+def _stochastic(stats1, stats2):
+    """Win probabilities by DP over (health1, health2) states; see solve() for the caps.
+
+    Health is merged on a HEALTH_QUANTUM grid, except where some run of
+    hits could kill exactly: there hit orders that round differently
+    really do end differently in play, so those states keep up to
+    MAX_EXACT_HEALTHS exact floats per grid cell (see MAX_EXACT_STATES).
+    """
+    hit1, p1, crit1 = _hits(stats1, stats2[2])
+    hit2, p2, crit2 = _hits(stats2, stats1[2])
+    # Crits are whole multiples of a normal hit, so a target with constant
+    # incoming damage dies exactly only on multiples of that hit. A
+    # Warrior's damage follows its own health; check just its next hit.
+    unit1 = None if stats1[0] == WARRIOR else hit1(stats1[3])
+    unit2 = None if stats2[0] == WARRIOR else hit2(stats2[3])
+    quantum = HEALTH_QUANTUM
+    memo = {}
+    cut_memo = {}
+    exact = {}  # grid cell -> exact healths keyed apart so far
+
+    def health_key(target, unit, hit, own):
+        cell = round(target / quantum)
+        dealt = hit(own) if unit is None else max(1, round(target / unit)) * unit
+        if not _on_boundary(dealt, target):
+            return cell, None
+        seen = exact.setdefault(cell, [])
+        if target not in seen:
+            if seen and (len(seen) >= MAX_EXACT_HEALTHS or
+                         len(memo) + len(cut_memo) >= MAX_EXACT_STATES):
+                target = min(seen, key=lambda h: abs(h - target))
+            else:
+                seen.append(target)
+        return cell, target
+
+    def attack(hit, chance, crit, own, target):
+        damage = hit(own)
+        if chance:
+            return ((1 - chance, target - damage), (chance, target - crit))
+        return ((1.0, target - damage),)
+
+    # value(h1, h2, turn) = (p_win1, p_win2, expected remaining attacks,
+    # p_truncated, depth) with card 1 to move on odd turns. A result that
+    # never reached the cutoff is the state's own, whatever the turn, and
+    # is shared in `memo` with its depth (the most attacks any line takes);
+    # it is reused wherever that depth still fits before DP_MAX_TURNS. A
+    # truncated result depends on the turn, so `cut_memo` keys it on that.
+    def value(h1, h2, turn):
+        if turn > DP_MAX_TURNS:
+            return (0.0, 0.0, 0.0, 1.0, 0)
+        state = (health_key(h1, unit2, hit2, h2), health_key(h2, unit1, hit1, h1), turn & 1)
+        cached = memo.get(state)
+        if cached is not None and turn + cached[4] - 1 <= DP_MAX_TURNS:
+            return cached
+        cached = cut_memo.get((state, turn))
+        if cached is not None:
+            return cached
+        win1 = win2 = turns = cut = 0.0
+        depth = 1
+        if turn & 1:
+            for prob, new_h2 in attack(hit1, p1, crit1, h1, h2):
+                if new_h2 <= 0:
+                    win1 += prob
+                    turns += prob
+                else:
+                    w1, w2, t, c, d = value(h1, new_h2, turn + 1)
+                    win1 += prob * w1
+                    win2 += prob * w2
+                    turns += prob * (1 + t)
+                    cut += prob * c
+                    depth = max(depth, d + 1)
+        else:
+            for prob, new_h1 in attack(hit2, p2, crit2, h2, h1):
+                if new_h1 <= 0:
+                    win2 += prob
+                    turns += prob
+                else:
+                    w1, w2, t, c, d = value(new_h1, h2, turn + 1)
+                    win1 += prob * w1
+                    win2 += prob * w2
+                    turns += prob * (1 + t)
+                    cut += prob * c
+                    depth = max(depth, d + 1)
+        result = (win1, win2, turns, cut, depth)
+        if cut:
+            cut_memo[(state, turn)] = result
+        else:
+            memo[state] = result
+        return result
+
+    win1, win2, turns, cut, _ = value(stats1[3], stats2[3], 1)
+    return Outcome(win1, win2, max(0.0, 1 - win1 - win2 - cut), turns, None, None, cut)
+
+
+def cache_info():
+    return _solve.cache_info()
+
+
+def clear_cache():
+    _solve.cache_clear()
+
+
+def check_against_simulator(cards, duels=20000, sigmas=5.0, seed=0):
+    """Stochastic pairs where solve() and simulate_matchup disagree.
+
+    Returns (card1, card2, solved win1, simulated win1) for each pair whose
+    gap exceeds `sigmas` standard errors of the simulated rate.
+    """
+    mismatches = []
+    for card1 in cards:
+        for card2 in cards:
+            if is_deterministic(duel_stats(card1), duel_stats(card2)):
+                continue
+            solved = solve(card1, card2).win1
+            simulated = simulate_matchup(card1, card2, duels, seed).win_rate(1)
+            error = math.sqrt(max(solved * (1 - solved), 1 / duels) / duels)
+            if abs(solved - simulated) > sigmas * error:
+                mismatches.append((card1, card2, solved, simulated))
+    return mismatches
+
+
+def main():
+    import argparse
+
+    import cardgame
+    from cardgame import report_db_errors
+
+    parser = argparse.ArgumentParser(description="Check the solver against the simulator")
+    parser.add_argument("--duels", type=int, default=20000)
+    parser.add_argument("--levels", type=int, default=4)
+    args = parser.parse_args()
+
+    errors = []
+    cards = []
+    for template in cardgame.load_cards_from_db(errors=errors):
+        card = template.instantiate()
+        for _ in range(args.levels):
+            cards.append(card)
+            card = card.instantiate()
+            card.upgrade()
+    report_db_errors(errors)
+    mismatches = check_against_simulator(cards, args.duels)
+    for card1, card2, solved, simulated in mismatches:
+        print(f"{card1.name} L{card1.level} vs {card2.name} L{card2.level}: "
+              f"solver {solved:.4f}, simulator {simulated:.4f}")
+    print(f"{len(cards)} cards, {len(mismatches)} mismatches")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The game's modules sit flat at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DB_PATH = os.path.join(ROOT, "db.txt")
@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import cardgame
+import selfplay
+from catalog import CardCatalog
+from conftest import DB_PATH
+from seeds import SeedTree
+import vector_engine
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return CardCatalog(cardgame.load_cards_from_db(DB_PATH))
+
+
+def scalar_games(catalog, policy1, policy2, count):
+    """Winners and round counts of `count` play_games-style games."""
+    winners, rounds = [], []
+    for i in range(count):
+        game = selfplay.new_game(catalog, policy1, policy2, SeedTree(0).child(i))
+        winners.append(game.play())
+        rounds.append(game.round)
+    return np.array(winners), np.array(rounds)
+
+
+@pytest.mark.parametrize("policy1, policy2", [("random", "random"), ("greedy", "greedy")])
+def test_batch_games_match_scalar_games(catalog, policy1, policy2):
+    winners, rounds = scalar_games(catalog, policy1, policy2, 600)
+    batch_winners, batch_rounds = vector_engine.batch_selfplay(
+        catalog, policy1, policy2, 6000, np.random.default_rng(0), batch=1000)
+    # About four standard errors of the scalar sample
+    assert abs((batch_winners == 1).mean() - (winners == 1).mean()) < 0.08
+    assert abs(batch_rounds.mean() - rounds.mean()) < 0.25 * rounds.mean()
+
+
+def test_batch_games_all_finish(catalog):
+    winners, rounds = vector_engine.batch_selfplay(
+        catalog, "greedy", "random", 500, np.random.default_rng(1), batch=64, max_rounds=5)
+    assert set(winners.tolist()) <= {0, 1, 2}
+    assert ((rounds >= 1) & (rounds <= 5)).all()
+
+
+def test_batch_rejects_other_policies(catalog):
+    with pytest.raises(ValueError):
+        vector_engine.batch_selfplay(catalog, "lookahead", "random", 1, np.random.default_rng(0))
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import cardgame
+from cardgame import deal_starting_cards
+from catalog import CardCatalog
+from conftest import DB_PATH
+from player_store import PlayerStore
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return CardCatalog(cardgame.load_cards_from_db(DB_PATH))
+
+
+def profile(player):
+    return (player.name, player.coins,
+            [(type(card).__name__, card.name, card.level, card.attack, card.defense,
+              card.health) for card in player.cards])
+
+
+def dealt_player(store, name, seed):
+    player = store.load(name)
+    deal_starting_cards(player, store.catalog, random.Random(seed))
+    player.cards[0].upgrade()
+    player.cards[-1].health -= 12.5
+    player.coins = 37
+    return player
+
+
+def test_saved_players_load_back(tmp_path, catalog):
+    path = tmp_path / "players.db"
+    with PlayerStore(path, catalog) as store:
+        alice = dealt_player(store, "alice", 0)
+        store.save(alice)
+        expected = profile(alice)
+    with PlayerStore(path, catalog) as store:
+        assert "alice" in store
+        assert "bob" not in store
+        assert profile(store.load("alice")) == expected
+        assert store.load("bob", create=False) is None
+
+
+def test_pending_and_in_flight_rows_are_readable(tmp_path, catalog):
+    with PlayerStore(tmp_path / "players.db", catalog, cache_size=1) as store:
+        alice = dealt_player(store, "alice", 1)
+        store.save(alice)
+        expected = profile(alice)
+        store.load("bob")  # Evicts alice from the cache, so loads read her row
+        assert store.load("alice") is not alice
+        assert profile(store.load("alice")) == expected
+        store.load("bob")
+        store.flush()
+        assert profile(store.load("alice")) == expected
+
+
+def test_reordered_catalog_matches_cards_by_name(tmp_path, catalog):
+    path = tmp_path / "players.db"
+    with PlayerStore(path, catalog) as store:
+        alice = dealt_player(store, "alice", 2)
+        store.save(alice)
+        expected = profile(alice)
+    with PlayerStore(path, CardCatalog(list(reversed(list(catalog))))) as store:
+        assert profile(store.load("alice")) == expected
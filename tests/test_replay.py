@@ -0,0 +1,45 @@
+import pytest
+
+import cardgame
+from catalog import CardCatalog
+from conftest import DB_PATH
+from replay import Replay, Replayer, ReplayRecorder, record_selfplay
+from seeds import SeedTree
+from selfplay import new_game
+from snapshot import catalog_info
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return CardCatalog(cardgame.load_cards_from_db(DB_PATH))
+
+
+def deck_entries(player, index):
+    return [[index[id(card.template)], card.level, card.attack, card.defense,
+             float(card.health)] for card in player.cards]
+
+
+@pytest.mark.parametrize("policy1, policy2, index", [
+    ("greedy", "random", 0), ("random", "random", 1), ("greedy", "greedy", 2)])
+def test_replay_ends_where_the_game_ended(catalog, policy1, policy2, index):
+    game, recorder = record_selfplay(0, index, policy1, policy2, catalog)
+    replayer = Replayer(Replay(recorder.to_bytes()), catalog)
+    state = replayer.final_state()
+    players = (game.player1, game.player2)
+    lookup = catalog_info(catalog)[0]
+    assert state.round == game.rounds_played
+    assert state.coins == [player.coins for player in players]
+    assert state.decks == [deck_entries(player, lookup) for player in players]
+
+
+def test_seeking_matches_replaying(catalog):
+    game = new_game(catalog, "greedy", "greedy", SeedTree(3).child(6))
+    # A short interval, so seeks start from several keyframes
+    recorder = ReplayRecorder(game, catalog, interval=4)
+    game.play()
+    replayer = Replayer(Replay(recorder.to_bytes()), catalog)
+    for round_number in range(game.rounds_played + 1):
+        seeked = replayer.state_at(round_number)
+        replayed = replayer.state_at(round_number, seek=False)
+        assert (seeked.round, seeked.coins, seeked.decks) == \
+            (replayed.round, replayed.coins, replayed.decks)
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+import cardgame
+from catalog import CardCatalog
+from conftest import DB_PATH
+from seeds import SeedTree
+from selfplay import new_game
+from snapshot import fork, restore, snapshot
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return CardCatalog(cardgame.load_cards_from_db(DB_PATH))
+
+
+def midgame(catalog, policy1="greedy", policy2="random", seed=0, rounds=3):
+    """A selfplay game stopped after `rounds` rounds."""
+    game = new_game(catalog, policy1, policy2, SeedTree(seed))
+    game.play(max_rounds=rounds)
+    assert game.player1.cards and game.player2.cards
+    return game
+
+
+def policies(game):
+    return game.player1.policy, game.player2.policy
+
+
+def test_restore_rebuilds_the_same_state(catalog):
+    game = midgame(catalog)
+    data = snapshot(game)
+    restored = restore(data, catalog, policies(game))
+    assert snapshot(restored) == data
+    assert restored.round == game.round
+    for original, copy in zip((game.player1, game.player2), (restored.player1, restored.player2)):
+        assert (copy.name, copy.coins) == (original.name, original.coins)
+        assert [(card.template, card.level, card.attack, card.defense, card.health)
+                for card in copy.cards] == \
+            [(card.template, card.level, card.attack, card.defense, card.health)
+             for card in original.cards]
+
+
+def test_restored_game_plays_on_like_the_original(catalog):
+    game = midgame(catalog, "greedy", "greedy", seed=1)
+    restored = restore(snapshot(game), catalog, policies(game))
+    assert restored.play() == game.play()
+    assert snapshot(restored) == snapshot(game)
+
+
+def test_restore_rejects_another_catalog(catalog):
+    data = snapshot(midgame(catalog))
+    with pytest.raises(ValueError):
+        restore(data, CardCatalog(list(catalog)[1:]))
+
+
+def test_fork_leaves_the_original_untouched(catalog):
+    game = midgame(catalog, seed=2)
+    before = snapshot(game)
+    child = fork(game)
+    assert snapshot(child) == before
+    winner = child.play()
+    assert snapshot(game) == before
+    # Forked dice are copies, so the original then plays the same game
+    assert game.play() == winner
+    assert snapshot(game) == snapshot(child)
+
+
+def test_fork_with_rng_draws_from_it(catalog):
+    game = midgame(catalog, seed=4)
+    before = snapshot(game)
+    fork(game, rng=random.Random(7)).play()
+    assert snapshot(game) == before
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import cardgame
+from cardgame import Game, Guardian, Player, Warrior
+from conftest import DB_PATH
+import solver
+
+
+def battle(card1, card2):
+    """Winner of Game.battle on copies of the two cards."""
+    game = Game(Player("Player 1", []), Player("Player 2", []))
+    return game.battle(card1.instantiate(), card2.instantiate())
+
+
+def random_card(rng, name):
+    card_class = rng.choice((Warrior, Guardian))
+    # A Warrior over 270 health would heal itself; the game never deals one
+    health = rng.randint(1, 90 if card_class is Warrior else 300)
+    return card_class(name, rng.randint(1, 60),
+                      rng.choice((0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6)), health)
+
+
+@pytest.mark.parametrize("stats1, stats2", [
+    ((4, 0.3, 63), (21, 0.3, 65)),  # Card 2's 30th hit kills exactly
+    ((21, 0.3, 65), (4, 0.3, 63)),
+    ((30, 0.3, 60), (30, 0.3, 63)),
+])
+def test_exact_guardian_kills_match_the_game(stats1, stats2):
+    card1, card2 = Guardian("A", *stats1), Guardian("B", *stats2)
+    assert solver.solve(card1, card2).winner == battle(card1, card2)
+
+
+def test_deterministic_pairs_match_the_game():
+    rng = random.Random(0)
+    for _ in range(3000):
+        card1, card2 = random_card(rng, "A"), random_card(rng, "B")
+        assert solver.solve(card1, card2).winner == battle(card1, card2), (card1, card2)
+
+
+def test_stochastic_pairs_match_the_simulator():
+    cards = []
+    for template in cardgame.load_cards_from_db(DB_PATH):
+        card = template.instantiate()
+        cards.append(card)
+        card = card.instantiate()
+        card.upgrade()
+        cards.append(card)
+    assert solver.check_against_simulator(cards, duels=1000) == []
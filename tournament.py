@@ -0,0 +1,307 @@
+"""Self-play tournament between deck-building policies, with Glicko ratings.
+
+Usage: python tournament.py --strategies random greedy lookahead \\
+           --games 200 --workers 8 --output tournament.jsonl [--swiss 5] \\
+           [--profile PREFIX]
+
+Finished batches are appended to --output as JSON lines as soon as they
+complete. Re-running the same command skips every batch already in the
+file, so a killed run resumes where it stopped.
+
+--profile times every game phase in the workers (see profiling.py) and
+writes the merged profile to PREFIX.json and PREFIX.folded.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cardgame
+import profiling
+from catalog import CardCatalog
+from seeds import SeedTree
+from selfplay import POLICIES, play_games
+
+
+INITIAL_RATING = 1500.0
+INITIAL_RD = 350.0
+MIN_RD = 30.0
+# Glicko's c: RD grows by sqrt(c^2 t) over t rating periods, so a player's
+# interval widens again while it sits out batches
+GLICKO_C = 10.0
+GLICKO_Q = math.log(10) / 400
+
+# Per-process card catalog, loaded once by the pool initializer rather than
+# re-read from db.txt for every batch.
+_catalog = None
+
+
+class Glicko:
+    """Glicko-1 ratings; each finished batch is one rating period."""
+
+    def __init__(self, players):
+        self.rating = {p: INITIAL_RATING for p in players}
+        self.rd = {p: INITIAL_RD for p in players}
+        self.period = 0
+        self.last_period = {p: 0 for p in players}  # Period each player last played in
+
+    def _inflate(self, player):
+        """Grow a player's RD for the periods since it last played."""
+        elapsed = self.period - self.last_period[player]
+        self.rd[player] = min(INITIAL_RD,
+                              math.sqrt(self.rd[player] ** 2 + GLICKO_C ** 2 * elapsed))
+        self.last_period[player] = self.period
+
+    @staticmethod
+    def _g(rd):
+        return 1 / math.sqrt(1 + 3 * GLICKO_Q ** 2 * rd ** 2 / math.pi ** 2)
+
+    def _expected(self, player, opponent):
+        g = self._g(self.rd[opponent])
+        return 1 / (1 + 10 ** (-g * (self.rating[player] - self.rating[opponent]) / 400))
+
+    def update(self, player1, player2, results):
+        """Apply a batch of game results (1, 2 or 0 for a draw) between two players."""
+        if not results:
+            return
+        self.period += 1
+        self._inflate(player1)
+        self._inflate(player2)
+        scores = {player1: [], player2: []}
+        for winner in results:
+            score1 = 1.0 if winner == 1 else 0.0 if winner == 2 else 0.5
+            scores[player1].append(score1)
+            scores[player2].append(1 - score1)
+        updated = {}
+        for player, opponent in ((player1, player2), (player2, player1)):
+            g = self._g(self.rd[opponent])
+            expected = self._expected(player, opponent)
+            d2_inv = GLICKO_Q ** 2 * g ** 2 * expected * (1 - expected) * len(results)
+            denom = 1 / self.rd[player] ** 2 + d2_inv
+            delta = sum(score - expected for score in scores[player]) * g
+            updated[player] = (self.rating[player] + GLICKO_Q / denom * delta,
+                               max(MIN_RD, math.sqrt(1 / denom)))
+        for player, (rating, rd) in updated.items():
+            self.rating[player], self.rd[player] = rating, rd
+
+    def interval(self, player, z=1.96):
+        """95% confidence interval of a player's rating."""
+        rating, rd = self.rating[player], self.rd[player]
+        return rating - z * rd, rating + z * rd
+
+    def standings(self):
+        return sorted(self.rating, key=self.rating.get, reverse=True)
+
+
+def round_robin(strategies, games, batch_size):
+    """Batches (batch_id, strategy1, strategy2, games) covering both seatings."""
+    batches = []
+    for i, first in enumerate(strategies):
+        for second in strategies[i + 1:]:
+            for player1, player2 in ((first, second), (second, first)):
+                for start in range(0, games, batch_size):
+                    batch_id = f"rr:{player1}:{player2}:{start}"
+                    batches.append((batch_id, player1, player2, min(batch_size, games - start)))
+    return batches
+
+
+def swiss_pairs(order, played=()):
+    """Pair each unpaired player, top down, with the closest one below.
+
+    Opponents already met (pairs in `played`, as frozensets) are skipped
+    for the next-closest; only when everyone left is a rematch is the
+    closest taken anyway. An odd player out sits the round out.
+    """
+    unpaired = list(order)
+    pairs = []
+    while len(unpaired) > 1:
+        player = unpaired.pop(0)
+        for i, opponent in enumerate(unpaired):
+            if frozenset((player, opponent)) not in played:
+                break
+        else:
+            i = 0
+        pairs.append((player, unpaired.pop(i)))
+    return pairs
+
+
+def swiss_round(round_number, ratings, games, batch_size, played=()):
+    """Pair neighbours in the current standings for one Swiss round."""
+    batches = []
+    for player1, player2 in swiss_pairs(ratings.standings(), played):
+        if round_number % 2:
+            player1, player2 = player2, player1
+        for start in range(0, games, batch_size):
+            batch_id = f"swiss{round_number}:{player1}:{player2}:{start}"
+            batches.append((batch_id, player1, player2, min(batch_size, games - start)))
+    return batches
+
+
+def _init_worker(profile=False):
+    global _catalog
+    # Profile first, so loading the catalog shows up as the "load" phase
+    if profile:
+        profiling.enable_in_worker()
+    _catalog = CardCatalog(cardgame.load_cards_from_db())
+
+
+def _play_batch(batch_id, player1, player2, games, seed):
+    if _catalog is None:
+        _init_worker()
+    started = time.perf_counter()
+    # Game i of a batch is SeedTree(seed).child(batch_id, i), whichever worker plays it
+    results = play_games(games, player1, player2, seed=SeedTree(seed).child(batch_id),
+                         catalog=_catalog, record_each=True)
+    record = {
+        "batch": batch_id,
+        "player1": player1,
+        "player2": player2,
+        "results": results,
+        "worker": os.getpid(),
+        "busy": time.perf_counter() - started,
+    }
+    if profiling.profiler is not None:
+        record["profile"] = profiling.take_snapshot()
+    return record
+
+
+def load_log(path):
+    """Batches already recorded in a results file, keyed by batch id."""
+    records = {}
+    if os.path.exists(path):
+        with open(path) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write can leave a torn last line
+                    continue
+                records[record["batch"]] = record
+    return records
+
+
+def batch_order(batch_id):
+    """Sort key of a batch id: (Swiss round or 0 for the round robin, seating, start).
+
+    Batch ids are strings, and "swiss10" sorts before "swiss2" as text.
+    """
+    kind, player1, player2, start = batch_id.split(":")
+    round_number = 0 if kind == "rr" else int(kind[len("swiss"):])
+    return round_number, player1, player2, int(start)
+
+
+def records_before(records, round_number):
+    """The round-robin batches and those of Swiss rounds before `round_number`.
+
+    A Swiss round is paired from these alone, so a resumed run pairs it
+    as before even when some of its own batches are already recorded.
+    """
+    return {batch_id: record for batch_id, record in records.items()
+            if batch_order(batch_id)[0] < round_number}
+
+
+def rate(strategies, records):
+    """Glicko ratings from recorded batches, in round, seating and start order."""
+    ratings = Glicko(strategies)
+    for batch_id in sorted(records, key=batch_order):
+        record = records[batch_id]
+        ratings.update(record["player1"], record["player2"], record["results"])
+    return ratings
+
+
+class Tournament:
+    def __init__(self, strategies, output, workers=None, seed=0, batch_size=50,
+                 profile=False):
+        self.strategies = list(strategies)
+        self.output = output
+        self.workers = workers
+        self.seed = seed
+        self.batch_size = batch_size
+        self.records = load_log(output)
+        self.games_played = 0
+        self.busy = defaultdict(float)
+        # Merged worker profiles when profiling
+        self.profiler = profiling.Profiler() if profile else None
+
+    def run_batches(self, executor, batches):
+        pending = [b for b in batches if b[0] not in self.records]
+        futures = [executor.submit(_play_batch, *batch, self.seed) for batch in pending]
+        with open(self.output, "a+") as log:
+            # Start on a fresh line after a torn write from a killed run
+            if log.tell():
+                log.seek(log.tell() - 1)
+                if log.read(1) != "\n":
+                    log.write("\n")
+            for future in as_completed(futures):
+                record = future.result()
+                profile = record.pop("profile", None)
+                if profile and self.profiler is not None:
+                    self.profiler.merge(profile)
+                log.write(json.dumps(record) + "\n")
+                log.flush()
+                self.records[record["batch"]] = record
+                self.games_played += len(record["results"])
+                self.busy[record["worker"]] += record["busy"]
+
+    def run(self, games, swiss_rounds=0):
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.profiler is not None,)) as executor:
+            if swiss_rounds:
+                for round_number in range(1, swiss_rounds + 1):
+                    earlier = records_before(self.records, round_number)
+                    ratings = rate(self.strategies, earlier)
+                    played = {frozenset((record["player1"], record["player2"]))
+                              for record in earlier.values()}
+                    self.run_batches(executor, swiss_round(round_number, ratings, games,
+                                                           self.batch_size, played))
+            else:
+                self.run_batches(executor, round_robin(self.strategies, games,
+                                                       self.batch_size))
+        return rate(self.strategies, self.records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play policy tournament")
+    parser.add_argument("--strategies", nargs="+", default=list(POLICIES),
+                        choices=list(POLICIES))
+    parser.add_argument("--games", type=int, default=200,
+                        help="games per pairing and seating (default: 200)")
+    parser.add_argument("--swiss", type=int, default=0, metavar="ROUNDS",
+                        help="play Swiss rounds instead of a round robin")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="tournament.jsonl")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="profile game phases; writes PREFIX.json and PREFIX.folded")
+    args = parser.parse_args()
+
+    tournament = Tournament(args.strategies, args.output, args.workers,
+                            args.seed, args.batch_size, profile=bool(args.profile))
+    resumed = len(tournament.records)
+    started = time.perf_counter()
+    ratings = tournament.run(args.games, args.swiss)
+    wall = time.perf_counter() - started
+
+    if resumed:
+        print(f"Resumed: {resumed} batches were already in {args.output}")
+    print(f"{'strategy':<12} {'rating':>7} {'95% CI':>17}")
+    for strategy in ratings.standings():
+        low, high = ratings.interval(strategy)
+        print(f"{strategy:<12} {ratings.rating[strategy]:7.0f}   [{low:6.0f}, {high:6.0f}]")
+    if tournament.games_played:
+        print(f"\n{tournament.games_played} games in {wall:.2f}s "
+              f"({tournament.games_played / wall:,.0f} games/s)")
+        for worker, busy in sorted(tournament.busy.items()):
+            print(f"  worker {worker}: {busy / wall:.0%} busy")
+    if tournament.profiler is not None:
+        tournament.profiler.write_json(args.profile + ".json")
+        tournament.profiler.write_collapsed(args.profile + ".folded")
+        print("\n" + tournament.profiler.report(limit=12))
+
+
+if __name__ == "__main__":
+    main()
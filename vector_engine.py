@@ -0,0 +1,568 @@
+import numpy as np
+
+from cardgame import STARTING_CARDS
+from policies import CARD_PRICE
+from shop import MAX_COPIES, OFFER_SIZE
+from simulator import WARRIOR, ARCHER, GUARDIAN, ASSASSIN, card_kind
+
+
+class CardArrays:
+    """Struct-of-arrays view of a card pool, one NumPy array per field."""
+
+    FIELDS = ("kind", "attack", "defense", "health", "level",
+              "attack_growth", "defense_growth", "health_growth")
+
+    def __init__(self, names, kind, attack, defense, health, level,
+                 attack_growth, defense_growth, health_growth):
+        self.names = list(names) if names is not None else None
+        self.kind = np.asarray(kind, dtype=np.int8)
+        self.attack = np.asarray(attack, dtype=np.float64)
+        self.defense = np.asarray(defense, dtype=np.float64)
+        self.health = np.asarray(health, dtype=np.float64)
+        self.level = np.asarray(level, dtype=np.int32)
+        self.attack_growth = np.asarray(attack_growth, dtype=np.float64)
+        self.defense_growth = np.asarray(defense_growth, dtype=np.float64)
+        self.health_growth = np.asarray(health_growth, dtype=np.float64)
+
+    @classmethod
+    def from_cards(cls, cards):
+        """Build the arrays from Card objects, e.g. load_cards_from_db()."""
+        cards = list(cards)
+        return cls(
+            [card.name for card in cards],
+            [card_kind(card) for card in cards],
+            [card.attack for card in cards],
+            [card.defense for card in cards],
+            [card.health for card in cards],
+            [card.level for card in cards],
+            [card.attack_growth for card in cards],
+            [card.defense_growth for card in cards],
+            [card.health_growth for card in cards],
+        )
+
+    def __len__(self):
+        return len(self.kind)
+
+    def at_level(self, level):
+        """Return (attack, defense, health) of every card merged up to `level`.
+
+        Applies Card.upgrade once per level above each card's own level,
+        including its rule that defense stops growing once it exceeds 0.9.
+        """
+        attack = self.attack.copy()
+        defense = self.defense.copy()
+        health = self.health.copy()
+        steps = level - self.level
+        for step in range(int(steps.max(initial=0))):
+            grow = steps > step
+            attack += np.where(grow, self.attack_growth, 0)
+            defense += np.where(grow & (defense <= 0.9), self.defense_growth, 0)
+            health += np.where(grow, self.health_growth, 0)
+        return attack, defense, health
+
+
+def hit_profiles(kind, attack, defense, defender_defense):
+    """Vectorized simulator._hits: (warrior, scale, hit, crit_chance, crit_hit).
+
+    Rows of other classes deal the constant `hit`, or `crit_hit` with
+    probability crit_chance. A Warrior's damage follows its own health, so
+    for warrior rows `hit` is the raw attack and attack_damage evaluates the
+    game's expression at each attack.
+    """
+    scale = 1 - defender_defense
+    warrior = kind == WARRIOR
+    hit = np.where(warrior, attack,
+                   np.where(kind == GUARDIAN, defense * 10 * scale, attack * scale))
+    crit_chance = np.select([kind == ARCHER, kind == ASSASSIN], [0.3, 0.2], 0.0)
+    crit_hit = np.select([kind == ARCHER, kind == ASSASSIN],
+                         [attack * 2 * scale, attack * 3 * scale], 0.0)
+    return warrior, scale, hit, crit_chance, crit_hit
+
+
+def attack_damage(profile, own_health, rng):
+    """Damage of one attack per row, rounded as Game.battle rounds it.
+
+    The Warrior's expression, special_ability() * (1 - defense), is
+    evaluated element-wise in the game's order; the linear
+    base - slope * health form rounds differently and can miss exact kills.
+    """
+    warrior, scale, hit, crit_chance, crit_hit = profile
+    damage = np.where(warrior, hit * (1 + (1 - own_health / 90) * 0.5) * scale, hit)
+    crit = rng.random(len(hit)) < crit_chance
+    return np.where(crit, crit_hit, damage)
+
+
+def batch_duel(side1, side2, rng, max_turns=10000):
+    """Resolve many Game.battle-equivalent duels at once.
+
+    side1 and side2 are (kind, attack, defense, health) arrays of equal
+    length; side1 attacks first. Returns (winner, turns, health1, health2)
+    arrays, with winner 1, 2 or 0 (draw / turn limit) as in simulator.run_duel.
+    """
+    kind1, attack1, defense1, health1 = (np.asarray(a) for a in side1)
+    kind2, attack2, defense2, health2 = (np.asarray(a) for a in side2)
+    n = len(kind1)
+    h1 = np.array(health1, dtype=np.float64)
+    h2 = np.array(health2, dtype=np.float64)
+    winner = np.zeros(n, dtype=np.int8)
+    turns = np.zeros(n, dtype=np.int32)
+
+    profile1 = hit_profiles(kind1, attack1, defense1, defense2)
+    profile2 = hit_profiles(kind2, attack2, defense2, defense1)
+
+    # Only unresolved duels are kept in the working arrays; they are
+    # compacted whenever a card falls so later steps touch fewer rows.
+    live = np.flatnonzero((h1 > 0) & (h2 > 0))
+    lh1, lh2 = h1[live], h2[live]
+    lp1 = [a[live] for a in profile1]
+    lp2 = [a[live] for a in profile2]
+
+    turn = 0
+    while live.size and turn < max_turns:
+        for attacker in (1, 2):
+            turn += 1
+            if attacker == 1:
+                lh2 -= attack_damage(lp1, lh1, rng)
+                fallen = lh2 <= 0
+            else:
+                lh1 -= attack_damage(lp2, lh2, rng)
+                fallen = lh1 <= 0
+            if fallen.any():
+                done = live[fallen]
+                winner[done] = attacker
+                turns[done] = turn
+                h1[done] = lh1[fallen]
+                h2[done] = lh2[fallen]
+                keep = ~fallen
+                live = live[keep]
+                lh1, lh2 = lh1[keep], lh2[keep]
+                lp1 = [a[keep] for a in lp1]
+                lp2 = [a[keep] for a in lp2]
+                if not live.size:
+                    break
+
+    # Duels still running hit the turn limit and count as draws
+    turns[live] = turn
+    h1[live] = lh1
+    h2[live] = lh2
+    return winner, turns, h1, h2
+
+
+def level_entries(pool, levels):
+    """Flatten every (card, level) combination into one axis of "entries".
+
+    Entries are laid out level-major: entry e is card e % len(pool) at
+    levels[e // len(pool)]. Returns (kind, attack, defense, health) arrays.
+    """
+    stats = [pool.at_level(level) for level in levels]
+    kind = np.tile(pool.kind, len(stats))
+    attack = np.concatenate([s[0] for s in stats])
+    defense = np.concatenate([s[1] for s in stats])
+    health = np.concatenate([s[2] for s in stats])
+    return kind, attack, defense, health
+
+
+def pair_counts(entries, start, stop, samples, rng, chunk_size=1 << 20):
+    """Duel outcome counts for the flat pair indices start..stop.
+
+    Pair p matches entry p // len(entries) (attacking first) against entry
+    p % len(entries). Returns a (3, stop - start) array of draw, side 1 and
+    side 2 win counts.
+    """
+    kind, attack, defense, health = entries
+    n_entries = len(kind)
+    counts = np.zeros((3, stop - start), dtype=np.int64)
+    pairs_per_chunk = max(1, chunk_size // samples)
+    for chunk in range(start, stop, pairs_per_chunk):
+        pairs = np.arange(chunk, min(chunk + pairs_per_chunk, stop))
+        pairs = np.repeat(pairs, samples)
+        left, right = np.divmod(pairs, n_entries)
+        winner, _, _, _ = batch_duel(
+            (kind[left], attack[left], defense[left], health[left]),
+            (kind[right], attack[right], defense[right], health[right]),
+            rng,
+        )
+        for outcome in (0, 1, 2):
+            counts[outcome] += np.bincount(pairs[winner == outcome] - start,
+                                           minlength=stop - start)
+    return counts
+
+
+def counts_to_matrix(flat, n_cards, n_levels):
+    """Reshape flat per-pair counts to (cards, levels, cards, levels)."""
+    grid = np.asarray(flat).reshape(n_levels, n_cards, n_levels, n_cards)
+    return grid.transpose(1, 0, 3, 2)
+
+
+def matchup_matrix(pool, levels, samples, rng, chunk_size=1 << 20):
+    """Win/draw/loss counts for every (card, level) pair against every other.
+
+    Returns (wins1, wins2, draws) integer arrays of shape
+    (cards, levels, cards, levels), where [i, li, j, lj] counts duels of card
+    i at levels[li] attacking first against card j at levels[lj].
+    """
+    levels = list(levels)
+    entries = level_entries(pool, levels)
+    pair_count = len(entries[0]) ** 2
+    counts = pair_counts(entries, 0, pair_count, samples, rng, chunk_size)
+    return tuple(counts_to_matrix(counts[outcome], len(pool), len(levels))
+                 for outcome in (1, 2, 0))
+
+
+# Whole games, many at once
+
+BATCH_POLICIES = ("random", "greedy")
+PAYOUT = (10, 3)    # Coins for the round winner and loser, as in Game.pay_out
+MAX_ACTIONS = 20    # Actions per turn, as in Game.policy_turn
+_NEVER = np.iinfo(np.int64).max
+
+
+class _Decks:
+    """Every player's deck as (players, slots) arrays; player 2g + s is seat s of game g.
+
+    Each deck is packed into its first `size` slots, whose order means
+    nothing: `added` keeps Deck order (when the card was bought) and
+    `stamp` MergeIndex bucket order (when it last joined its bucket).
+    `bucket` counts each player's cards per (kind, level), as MergeIndex's
+    buckets do, and `ready` how many of those hold a pair, so finding
+    merges never scans the slots.
+    """
+
+    FIELDS = ("card", "kind", "level", "attack", "defense", "health", "power", "added", "stamp")
+    COUNTS = ("bucket", "ready", "size")
+
+    def __init__(self, players, slots=8, levels=8):
+        self.card = np.zeros((players, slots), dtype=np.int64)  # Catalog index
+        self.kind = np.zeros((players, slots), dtype=np.int64)
+        self.level = np.zeros((players, slots), dtype=np.int64)
+        self.attack = np.zeros((players, slots))
+        self.defense = np.zeros((players, slots))
+        self.health = np.zeros((players, slots))
+        self.power = np.zeros((players, slots))
+        self.added = np.zeros((players, slots), dtype=np.int64)
+        self.stamp = np.zeros((players, slots), dtype=np.int64)
+        self.bucket = np.zeros((players, 4, levels), dtype=np.int16)
+        self.ready = np.zeros(players, dtype=np.int16)
+        self.size = np.zeros(players, dtype=np.int64)
+        self.clock = 0
+
+    def live(self, players):
+        """Mask of each player's occupied slots."""
+        return np.arange(self.card.shape[1]) < self.size[players, None]
+
+    def take(self, players):
+        """Keep only these players' rows, in this order.
+
+        Slots are cut to half as many once the biggest deck left fits in a
+        quarter of them, leaving room to grow before add doubles them.
+        """
+        for field in self.FIELDS + self.COUNTS:
+            setattr(self, field, getattr(self, field)[players])
+        slots = self.card.shape[1]
+        if slots > 8 and len(self.size) and 4 * self.size.max() <= slots:
+            for field in self.FIELDS:
+                setattr(self, field, getattr(self, field)[:, :slots // 2].copy())
+
+    def clear(self, players):
+        """Empty these players' decks."""
+        self.bucket[players] = 0
+        self.ready[players] = 0
+        self.size[players] = 0
+
+    def _ticks(self, count):
+        ticks = np.arange(self.clock, self.clock + count)
+        self.clock += count
+        return ticks
+
+    def _count(self, players, kind, level, change):
+        # `players` never repeats within a call, so plain indexing is safe
+        if level.size and level.max() >= self.bucket.shape[2]:
+            self.bucket = np.concatenate([self.bucket, np.zeros_like(self.bucket)], axis=2)
+        old = self.bucket[players, kind, level]
+        self.bucket[players, kind, level] = new = old + change
+        self.ready[players] += (new >= 2).astype(np.int16) - (old >= 2)
+
+    def cells(self, players, slots):
+        """Flat indexes of (player, slot) pairs into the raveled slot arrays.
+
+        One flat index is several times faster to gather and scatter with
+        than a pair of index arrays; every slot array stays C-contiguous.
+        """
+        return players * self.card.shape[1] + slots
+
+    def add(self, players, cards, pool, power):
+        """Give each player in `players` a fresh copy of the catalog card beside it."""
+        if self.size[players].max(initial=0) == self.card.shape[1]:
+            for field in self.FIELDS:
+                array = getattr(self, field)
+                setattr(self, field, np.concatenate([array, np.zeros_like(array)], axis=1))
+        cells = self.cells(players, self.size[players])
+        kind, level = pool.kind[cards], pool.level[cards]
+        ticks = self._ticks(len(players))
+        for field, values in (("card", cards), ("kind", kind), ("level", level),
+                              ("attack", pool.attack[cards]), ("defense", pool.defense[cards]),
+                              ("health", pool.health[cards]), ("power", power[cards]),
+                              ("added", ticks), ("stamp", ticks)):
+            getattr(self, field).reshape(-1)[cells] = values
+        self._count(players, kind, level, 1)
+        self.size[players] += 1
+
+    def discard(self, players, slots):
+        """Drop a card per player; the deck's last card moves into its slot."""
+        cells = self.cells(players, slots)
+        self._count(players, self.kind.reshape(-1)[cells], self.level.reshape(-1)[cells], -1)
+        self.size[players] -= 1
+        last = self.cells(players, self.size[players])
+        for field in self.FIELDS:
+            array = getattr(self, field).reshape(-1)
+            array[cells] = array[last]
+
+    def merge(self, players, slots1, slots2, pool, multipliers):
+        """Card.upgrade the first card of each pair and discard the second, as Player.merge."""
+        cells = self.cells(players, slots1)
+        card, kind, level, attack, defense, health, power, stamp = (
+            getattr(self, field).reshape(-1)
+            for field in ("card", "kind", "level", "attack", "defense", "health", "power", "stamp"))
+        cards, kinds, levels = card[cells], kind[cells], level[cells]
+        self._count(players, kinds, levels, -1)
+        self._count(players, kinds, levels + 1, 1)
+        level[cells] = levels = levels + 1
+        attack[cells] = attacks = attack[cells] + pool.attack_growth[cards]
+        defenses = defense[cells]
+        defense[cells] = defenses = defenses + np.where(defenses <= 0.9, pool.defense_growth[cards], 0)
+        health[cells] += pool.health_growth[cards]
+        attack_multiplier, defense_multiplier = multipliers
+        power[cells] = (attacks * attack_multiplier[cards] +
+                        defenses * defense_multiplier[cards]) * levels
+        stamp[cells] = self._ticks(len(players))  # Rejoins at its bucket's end
+        self.discard(players, slots2)
+
+    def in_bucket(self, players, kind, level):
+        """Stamps of each player's cards in bucket (kind, level); _NEVER elsewhere."""
+        member = (self.live(players) & (self.kind[players] == kind[:, None]) &
+                  (self.level[players] == level[:, None]))
+        return np.where(member, self.stamp[players], _NEVER)
+
+
+def _offers(players, cumulative, names, size, rng):
+    """A ShopSampler.offer per player: `size` cards, no name more than MAX_COPIES times.
+
+    ShopSampler draws each card from the names not yet capped; that is the
+    same as drawing from all cards and skipping draws of capped names, so
+    each row keeps the first MAX_COPIES draws of every name in a run of
+    draws, extended until it holds `size` of them. `cumulative` is None
+    for a uniform catalog.
+    """
+    def draw(rows, count):
+        if cumulative is None:
+            return rng.integers(len(names), size=(rows, count))
+        last = np.searchsorted(cumulative, cumulative[-1])  # Last card with weight
+        return np.minimum(np.searchsorted(cumulative, rng.random((rows, count)) * cumulative[-1],
+                                          side="right"), last)
+
+    offer = np.empty((players, size), dtype=np.int64)
+    pending = np.arange(players)
+    cards = draw(players, size + MAX_COPIES)
+    while pending.size:
+        drawn = names[cards]
+        earlier = np.tri(cards.shape[1], k=-1, dtype=bool)  # earlier[j, i]: draw i came before j
+        kept = ((drawn[:, :, None] == drawn[:, None, :]) & earlier).sum(axis=2) < MAX_COPIES
+        # Usually the first `size` draws all stand; otherwise a stable sort
+        # brings a row's kept draws to the front in draw order
+        direct = kept[:, :size].all(axis=1)
+        offer[pending[direct]] = cards[direct, :size]
+        full = ~direct & (kept.sum(axis=1) >= size)
+        first = np.argsort(~kept[full], axis=1, kind="stable")[:, :size]
+        offer[pending[full]] = np.take_along_axis(cards[full], first, axis=1)
+        short = ~direct & ~full
+        pending = pending[short]
+        cards = np.concatenate([cards[short], draw(pending.size, size)], axis=1)
+    return offer
+
+
+def _nth(counts, n):
+    """Column holding item n (0-based) of each row, counting `counts` items per column."""
+    return (np.cumsum(counts, axis=1) <= n[:, None]).sum(axis=1)
+
+
+def batch_selfplay(cards, policy1, policy2, games, rng, weights=None, max_rounds=200,
+                   batch=1 << 14):
+    """Play `games` whole games of `policy1` against `policy2` at once.
+
+    The same rules as Game.play with selfplay's deal: STARTING_CARDS
+    uniform cards each, turns of up to MAX_ACTIONS market and merge
+    actions, market offers like ShopSampler's (card `weights`, default
+    uniform), a battle per round through batch_duel and the round payout.
+    Policies are named from BATCH_POLICIES and decide as RandomPolicy and
+    GreedyPolicy do, except that GreedyPolicy's pick between equal-level
+    merge buckets of different classes goes to the bucket whose first card
+    has waited longest. Games draw from `rng`, not from SeedTree streams,
+    so they match play_games in distribution rather than game by game.
+    At most `batch` games are in flight at a time.
+
+    Returns (winner, rounds) arrays, winner 1, 2 or 0 as Game.play returns.
+    """
+    for policy in (policy1, policy2):
+        if policy not in BATCH_POLICIES:
+            raise ValueError(f"batch self-play supports {', '.join(BATCH_POLICIES)}, not {policy!r}")
+    cards = list(cards)
+    pool = CardArrays.from_cards(cards)
+    multipliers = (np.array([card.attack_multiplier for card in cards]),
+                   np.array([card.defense_multiplier for card in cards]))
+    power = np.array([card.calculate_power() for card in cards])
+    weights = np.ones(len(cards)) if weights is None else np.asarray(weights, dtype=np.float64)
+    # ShopSampler's fast path: equal weights need no cumulative search
+    cumulative = None if np.all(weights == weights[0]) else np.cumsum(weights)
+    _, names = np.unique([card.name for card in cards], return_inverse=True)
+    size = min(OFFER_SIZE, len(np.unique(names[weights > 0])) * MAX_COPIES)
+
+    in_flight = min(games, batch)
+    decks = _Decks(2 * in_flight)
+    coins = np.zeros(2 * in_flight, dtype=np.int64)
+    greedy = np.tile([policy1 == "greedy", policy2 == "greedy"], in_flight)
+    game_of = np.zeros(2 * in_flight, dtype=np.int64)  # Game of each player row
+    played = np.zeros(2 * in_flight, dtype=np.int64)   # Rounds so far, per player row
+    winner = np.zeros(games, dtype=np.int8)
+    rounds = np.zeros(games, dtype=np.int64)
+    fresh = np.arange(2 * in_flight)  # Rows waiting for a new game
+    started = 0
+
+    while True:
+        # Up to `batch` games are in flight: new games take over the rows of
+        # finished ones, so the tail of rounds with few games left, which
+        # costs the same per round as a full batch, comes once per call
+        if fresh.size:
+            decks.clear(fresh)
+            coins[fresh] = 10  # Player's starting coins
+            game_of[fresh] = started + np.arange(fresh.size) // 2
+            played[fresh] = 0
+            started += fresh.size // 2
+            # selfplay.new_game's deal: STARTING_CARDS uniform picks per player
+            for _ in range(STARTING_CARDS):
+                decks.add(fresh, rng.integers(len(cards), size=fresh.size), pool, power)
+        if not coins.size:
+            break
+
+        played += 1
+        _play_turns(decks, coins, greedy, pool, power, multipliers, cumulative, names, size, rng)
+
+        # Both players pick a card and battle; seat 1 attacks first
+        players = np.arange(len(coins))
+        cells = decks.cells(players, _battle_cards(decks, greedy, rng))
+        fighters = [getattr(decks, field).reshape(-1)[cells]
+                    for field in ("kind", "attack", "defense", "health")]
+        outcome, _, health1, health2 = batch_duel(
+            [field[0::2] for field in fighters], [field[1::2] for field in fighters], rng)
+        health = decks.health.reshape(-1)
+        health[cells[0::2]], health[cells[1::2]] = health1, health2
+        fallen = health[cells] <= 0
+        decks.discard(players[fallen], (cells - players * decks.card.shape[1])[fallen])
+        seat = np.tile([1, 2], len(players) // 2)
+        outcome = np.repeat(outcome, 2)
+        coins += np.where(outcome == seat, PAYOUT[0], np.where(outcome > 0, PAYOUT[1], 0))
+
+        # Games end once a deck is empty, or at the round limit
+        left1, left2 = decks.size[0::2], decks.size[1::2]
+        finished = (left1 == 0) | (left2 == 0) | (played[0::2] >= max_rounds)
+        fresh = fresh[:0]
+        if finished.any():
+            done = game_of[0::2][finished]
+            winner[done] = np.select([left1 > left2, left2 > left1], [1, 2], 0)[finished]
+            rounds[done] = played[0::2][finished]
+            # Rows of finished games start new ones while any are left; the rest go
+            ended = 2 * np.flatnonzero(finished)
+            reused = ended[:games - started]
+            fresh = np.stack([reused, reused + 1], axis=1).reshape(-1)
+            if reused.size < ended.size:
+                keep = np.ones(len(coins), dtype=bool)
+                keep[ended[reused.size:]] = keep[ended[reused.size:] + 1] = False
+                decks.take(keep)
+                coins, greedy, game_of, played = coins[keep], greedy[keep], game_of[keep], played[keep]
+                fresh = np.cumsum(keep)[fresh] - 1  # Where the reused rows moved to
+    return winner, rounds
+
+
+def _play_turns(decks, coins, greedy, pool, power, multipliers, cumulative, names, size, rng):
+    """Game.policy_turn for every player at once.
+
+    The policies never look at the opponent, so both seats act together.
+    """
+    active = np.arange(len(coins))
+    for _ in range(MAX_ACTIONS):
+        if not active.size:
+            return
+        is_greedy = greedy[active]
+        can_buy = coins[active] >= CARD_PRICE
+        can_merge = decks.ready[active] > 0
+
+        # Policy.choose_action for greedy rows, a uniform pick among the legal actions otherwise
+        choice = rng.integers(1 + can_buy + can_merge)
+        buy = np.where(is_greedy, can_buy, can_buy & (choice == 1))
+        merge = np.where(is_greedy, ~can_buy & can_merge, can_merge & (choice == 1 + can_buy))
+
+        if buy.any():
+            players = active[buy]
+            offer = _offers(len(players), cumulative, names, size, rng)
+            picks = np.where(greedy[players], power[offer].argmax(axis=1),
+                             rng.integers(size, size=len(players)))
+            decks.add(players, offer[np.arange(len(players)), picks], pool, power)
+            coins[players] -= CARD_PRICE
+
+        if merge.any():
+            players = active[merge]
+            _merge(decks, players, greedy[players], pool, multipliers, rng)
+
+        active = active[buy | merge]
+
+
+def _merge(decks, players, greedy, pool, multipliers, rng):
+    """Player.merge_cards for each player, with its policy's choose_merge."""
+    pairs = decks.bucket[players] // 2  # Disjoint pairs per bucket, as MergeIndex.pairs()
+    levels = pairs.shape[2]
+    kind = np.empty(len(players), dtype=np.int64)
+    level = np.empty(len(players), dtype=np.int64)
+    rank = np.zeros(len(players), dtype=np.int64)  # Of the pair's first card in its bucket
+
+    # RandomPolicy: a uniform pick among all pairs, as a bucket and a pair in it
+    uniform = ~greedy
+    if uniform.any():
+        flat = pairs[uniform].reshape(-1, 4 * levels)
+        pick = rng.integers(flat.sum(axis=1))
+        bucket = _nth(flat, pick)
+        rows = np.arange(len(flat))
+        pair = pick - (np.cumsum(flat, axis=1)[rows, bucket] - flat[rows, bucket])
+        kind[uniform], level[uniform], rank[uniform] = bucket // levels, bucket % levels, 2 * pair
+
+    # GreedyPolicy: the first pair of the highest-level bucket; between
+    # classes, the bucket whose first card has waited longest
+    if greedy.any():
+        ready = pairs[greedy]
+        highest = levels - 1 - (ready[:, :, ::-1] > 0).any(axis=1).argmax(axis=1)
+        g = players[greedy]
+        waiting = (decks.live(g) & (decks.level[g] == highest[:, None]) &
+                   (ready[np.arange(len(g))[:, None], decks.kind[g], highest[:, None]] > 0))
+        oldest = np.where(waiting, decks.stamp[g], _NEVER).argmin(axis=1)
+        kind[greedy] = decks.kind.reshape(-1)[decks.cells(g, oldest)]
+        level[greedy] = highest
+
+    # Bucket order is stamp order: a pair at rank 0 is the two oldest stamps
+    stamps = decks.in_bucket(players, kind, level)
+    rows = np.arange(len(players))
+    first = stamps.argmin(axis=1)
+    later = rank > 0
+    if later.any():
+        ordered = np.sort(stamps[later], axis=1)
+        first[later] = (stamps[later] == ordered[rows[:later.sum()], rank[later]][:, None]).argmax(axis=1)
+    second = np.where(stamps > stamps[rows, first][:, None], stamps, _NEVER).argmin(axis=1)
+    decks.merge(players, first, second, pool, multipliers)
+
+
+def _battle_cards(decks, greedy, rng):
+    """Each player's battle card slot: Deck.strongest for greedy, uniform for random."""
+    slots = rng.integers(decks.size)
+    if greedy.any():
+        players = np.flatnonzero(greedy)
+        power = np.where(decks.live(players), decks.power[players], -np.inf)
+        strongest = power == power.max(axis=1, keepdims=True)
+        slots[players] = np.where(strongest, decks.added[players], _NEVER).argmin(axis=1)
+    return slots